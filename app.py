@@ -1,9 +1,15 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import functools
 import io
 import time
 
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import formulaman as engine
+from formulaman import INDIAN_STATE_MAPPING, UNMAPPED_SKU
+
 # ==========================================
 # 1. CONFIG & STYLING (MUST BE FIRST)
 # ==========================================
@@ -138,195 +144,374 @@ if not st.session_state["authenticated"]:
 # ==========================================
 # 3. CONSTANTS & INITIALIZATION
 # ==========================================
-# Initialize Global Data Storage for Merging
-if 'master_gstr1_data' not in st.session_state:
-    st.session_state['master_gstr1_data'] = {} 
+# GSTR-1 tax arithmetic: float sums, or exact integer paise rounded per line
+TAX_ARITHMETIC = {
+    "Float": None,
+    "Exact paise (half-up)": 'half-up',
+    "Exact paise (banker's)": 'half-even',
+}
 
-# Initialize Channel Specific Session States
-if 'flipkart_raw_df' not in st.session_state:
-    st.session_state['flipkart_raw_df'] = None
-if 'flipkart_state_map' not in st.session_state:
-    st.session_state['flipkart_state_map'] = {}
-if 'meesho_df' not in st.session_state:
-    st.session_state['meesho_df'] = None
-
-COL_GSTIN = 'Seller GSTIN'
-COL_TAXABLE_VALUE = 'Taxable Value (Final Invoice Amount -Taxes)' 
-COL_ITEM_QUANTITY = 'Item Quantity' 
-COL_IGST = 'IGST Amount' 
-COL_CGST = 'CGST Amount' 
-COL_SGST = 'SGST Amount (Or UTGST as applicable)' 
-COL_BILLING_STATE = "Customer's Billing State" 
-
-FLIPKART_TEMPLATE_CONTENT = """Seller GSTIN,Order ID,Order Item ID,Product Title/Description,FSN,SKU,HSN Code,Event Type,Event Sub Type,Order Type,Fulfilment Type,Order Date,Order Approval Date,Item Quantity,Order Shipped From (State),Warehouse ID,Price before discount,Total Discount,Seller Share,Bank Offer Share,Price after discount (Price before discount-Total discount),Shipping Charges,Final Invoice Amount (Price after discount+Shipping Charges),Type of tax,Taxable Value (Final Invoice Amount -Taxes),CST Rate,CST Amount,VAT Rate,VAT Amount,Luxury Cess Rate,Luxury Cess Amount,IGST Rate,IGST Amount,CGST Rate,CGST Amount,SGST Rate (or UTGST as applicable),SGST Amount (Or UTGST as applicable),TCS IGST Rate,TCS IGST Amount,TCS CGST Rate,TCS CGST Amount,TCS SGST Rate,TCS SGST Amount,Total TCS Deducted,Buyer Invoice ID,Buyer Invoice Date,Buyer Invoice Amount,Customer's Billing Pincode,Customer's Billing State,Customer's Delivery Pincode,Customer's Delivery State,Usual Price,Is Shopsy Order?,TDS Rate,TDS Amount,IRN,Business Name,Business GST Number,Beneficiary Name,IMEI
-Mandatory,,,,,,,,,,,,,Mandatory,,,,,,,,,,,Mandatory,,,,,,,Mandatory,Mandatory,Mandatory,Mandatory,Mandatory,Mandatory,,,,,,,,,,,,Mandatory,,,,,,,,,,,"""
-
-# --- STANDARD STATE MAPPING DICTIONARY ---
-INDIAN_STATE_MAPPING = {
-    "ANDHRA PRADESH": "Andhra Pradesh",
-    "ARUNACHAL PRADESH": "Arunachal Pradesh",
-    "ASSAM": "Assam",
-    "BIHAR": "Bihar",
-    "CHHATTISGARH": "Chhattisgarh",
-    "GOA": "Goa",
-    "GUJARAT": "Gujarat",
-    "HARYANA": "Haryana",
-    "HIMACHAL PRADESH": "Himachal Pradesh",
-    "JAMMU & KASHMIR": "Jammu & Kashmir",
-    "JAMMU AND KASHMIR": "Jammu & Kashmir",
-    "JHARKHAND": "Jharkhand",
-    "KARNATAKA": "Karnataka",
-    "KERALA": "Kerala",
-    "MADHYA PRADESH": "Madhya Pradesh",
-    "MAHARASHTRA": "Maharashtra",
-    "MANIPUR": "Manipur",
-    "MEGHALAYA": "Meghalaya",
-    "MIZORAM": "Mizoram",
-    "NAGALAND": "Nagaland",
-    "ODISHA": "Odisha",
-    "ORISSA": "Odisha",
-    "PUNJAB": "Punjab",
-    "RAJASTHAN": "Rajasthan",
-    "SIKKIM": "Sikkim",
-    "TAMIL NADU": "Tamil Nadu",
-    "TAMILNADU": "Tamil Nadu",
-    "TELANGANA": "Telangana",
-    "TRIPURA": "Tripura",
-    "UTTAR PRADESH": "Uttar Pradesh",
-    "UTTARAKHAND": "Uttarakhand",
-    "WEST BENGAL": "West Bengal",
-    "ANDAMAN & NICOBAR ISLANDS": "Andaman & Nicobar Islands",
-    "ANDAMAN AND NICOBAR ISLANDS": "Andaman & Nicobar Islands",
-    "CHANDIGARH": "Chandigarh",
-    "DADRA & NAGAR HAVELI": "Dadra & Nagar Haveli",
-    "DAMAN & DIU": "Daman & Diu",
-    "DELHI": "Delhi",
-    "NEW DELHI": "Delhi",
-    "LADAKH": "Ladakh",
-    "LAKSHADWEEP": "Lakshadweep",
-    "PUDUCHERRY": "Puducherry",
-    "PONDICHERRY": "Puducherry"
+# Download formats (set in the sidebar): plain CSV, gzip-compressed CSV or a zip
+DOWNLOAD_FORMATS = {
+    "CSV": None,
+    "CSV (gzip)": 'gzip',
+    "ZIP": 'zip',
 }
 
+# Standard state names offered as GST home states
+STATE_NAMES = sorted(set(INDIAN_STATE_MAPPING.values()))
+
+# Running state-wise totals for the Master Merge (updated per channel)
+if 'master_gstr1' not in st.session_state:
+    st.session_state['master_gstr1'] = engine.MasterMerge()
+
+# Intra-/inter-state split rules (home state per seller GSTIN), set on the Configuration page
+if 'tax_split' not in st.session_state:
+    st.session_state['tax_split'] = engine.TaxSplit()
+
+# Initialize Channel Specific Session States
+# Processed channel data lives once per upload content in the shared DATASETS
+# store; a session only keeps its handle (key) plus tiny lookups.
+for key in engine.CHANNELS:
+    if f'{key}_dataset' not in st.session_state:
+        st.session_state[f'{key}_dataset'] = None  # key of the channel's GSTIN x State cube
+        st.session_state[f'{key}_state_map'] = {}
+        st.session_state[f'{key}_gstins'] = []
+
+# Processing runs in background JOBS; a session keeps (job id, dataset key) per slot
+if 'jobs' not in st.session_state:
+    st.session_state['jobs'] = {}
+if 'picklist_result' not in st.session_state:
+    # the last finished consolidation, shown until the next one: (PicklistResult, mapping version or None,
+    # load summary, run summary); not the job itself, whose load results hold every parsed picklist
+    st.session_state['picklist_result'] = None
+
 # ==========================================
-# 4. HELPER FUNCTIONS (FIXED ENCODING)
+# 4. HELPER FUNCTIONS (ENGINE WRAPPERS)
 # ==========================================
-@st.cache_data
-def load_data(file):
-    """Loads CSV/Excel with error handling for encodings."""
-    if file is None: return None
-    file.seek(0)
-    
-    if file.name.endswith('.csv'):
-        # Try default UTF-8 first
-        try:
-            return pd.read_csv(file, skiprows=[1])
-        except UnicodeDecodeError:
-            # If failed, try Latin-1 (Common for Excel CSVs)
-            file.seek(0)
-            return pd.read_csv(file, skiprows=[1], encoding='ISO-8859-1')
-        except Exception:
-            # Last resort
-            file.seek(0)
-            return pd.read_csv(file, skiprows=[1], encoding='cp1252')
-            
+# The processing logic lives in the UI-free `formulaman` package. Uploads are
+# parsed in parallel, and both parsed files and each month's aggregate persist
+# in UPLOAD_CACHE across restarts (keyed by file content), so a period is
+# composed from cached month partitions.
+UPLOAD_CACHE = engine.FrameCache()
+
+@st.cache_resource
+def get_dataset_store():
+    """One DatasetStore per server process, shared by every session."""
+    return engine.DatasetStore()
+
+@st.cache_resource
+def get_mapping_store():
+    """The saved SKU mapping, shared by every session (its index stays in memory)."""
+    return engine.MappingStore()
+
+@st.cache_resource
+def get_metrics():
+    """Stage timings of every processing run on this server (Prometheus file: FORMULAMAN_METRICS_FILE)."""
+    return engine.Metrics()
+
+@st.cache_resource
+def get_job_manager():
+    """Background processing jobs of every session (FORMULAMAN_JOB_WORKERS at a time), timed in METRICS."""
+    return engine.JobManager(get_metrics())
+
+DATASETS = get_dataset_store()
+MAPPINGS = get_mapping_store()
+METRICS = get_metrics()
+JOBS = get_job_manager()
+SESSION_ID = get_script_run_ctx().session_id
+DATASETS.touch(SESSION_ID)
+
+def store_dataset(slot, key, df):
+    """Points this session's `slot` at `key` in DATASETS, releasing what it held before."""
+    old_key = st.session_state[slot]
+    DATASETS.put(SESSION_ID, key, df)
+    if old_key is not None and old_key != key:
+        DATASETS.release(SESSION_ID, old_key)
+    st.session_state[slot] = key
+
+def session_dataset(slot):
+    """This session's dataset in `slot`, or None (also if it expired from DATASETS)."""
+    key = st.session_state[slot]
+    return None if key is None else DATASETS.get(SESSION_ID, key)
+
+def clear_channels():
+    """Drops every channel's processed data and cancels its running job."""
+    for key in engine.CHANNELS:
+        slot = f'{key}_dataset'
+        if st.session_state[slot] is not None:
+            DATASETS.release(SESSION_ID, st.session_state[slot])
+            st.session_state[slot] = None
+        st.session_state[f'{key}_state_map'] = {}
+        st.session_state[f'{key}_gstins'] = []
+        if key in st.session_state['jobs']:
+            JOBS.cancel(st.session_state['jobs'].pop(key)[0])
+
+def reset_gstr1(rounding):
+    """Starts the GSTR-1 period over (totals of different settings must not be mixed)."""
+    clear_channels()  # jobs still running with the old settings are cancelled too
+    st.session_state['master_gstr1'] = engine.MasterMerge(rounding)
+
+def start_job(slot, dataset_key, label, pipeline, func, *args):
+    """
+    Runs `func(*args)` as a background job for this session's `slot`, replacing
+    (cancelling) the slot's previous job. Uploads are copied so the job can read
+    them whatever the page does meanwhile.
+    """
+    if slot in st.session_state['jobs']:
+        JOBS.cancel(st.session_state['jobs'][slot][0])
+    args = [engine.detach_files(a) if isinstance(a, list) else a for a in args]
+    job = JOBS.submit(SESSION_ID, pipeline, func, *args, label=label)
+    st.session_state['jobs'][slot] = (job.id, dataset_key)
+
+def take_job(slot):
+    """
+    (job, dataset key) of this session's job in `slot` once it has finished,
+    taking it off the table; (None, None) while it runs or if there is none.
+    """
+    if slot not in st.session_state['jobs']:
+        return None, None
+    job_id, dataset_key = st.session_state['jobs'][slot]
+    job = JOBS.get(job_id)
+    if job is not None and not job.done:
+        return None, None
+    del st.session_state['jobs'][slot]
+    if job is None:
+        st.warning("The background job was lost (server restarted?); please process again.")
+        return None, None
+    JOBS.discard(job_id)
+    return job, dataset_key
+
+def job_succeeded(job):
+    """Reports a cancelled or failed job; True if its result can be used."""
+    if job.status == engine.CANCELLED:
+        st.warning(f"{job.label}: cancelled.")
+        return False
+    if job.status == engine.FAILED:
+        if isinstance(job.error, engine.FileLoadError):
+            show_load_errors(job.error)
+        else:
+            message = job.error.args[0] if job.error.args else job.error
+            st.error(f"❌ {job.label}: {message}")
+        return False
+    return True
+
+@st.fragment(run_every=1)
+def show_job_progress(slot):
+    """Live progress of this session's job in `slot`, with Cancel; reruns the page once it has finished."""
+    job = JOBS.get(st.session_state['jobs'][slot][0]) if slot in st.session_state['jobs'] else None
+    if job is None or job.done:
+        st.rerun()
+    progress = job.progress()
+    if job.status == engine.QUEUED:
+        text = f"{job.label}: queued behind other jobs on this server"
     else:
-        return pd.read_excel(file, skiprows=[1])
-
-def consolidate_files(file_list):
-    """Combines multiple raw files (Monthly/Quarterly) into one DataFrame."""
-    dfs = []
-    for f in file_list:
-        if f is not None:
-            df = load_data(f)
-            if df is not None:
-                dfs.append(df)
-    if not dfs:
-        return None
-    return pd.concat(dfs, ignore_index=True)
-
-@st.cache_data(show_spinner="Processing Flipkart sales data...")
-def process_flipkart_data(df_raw):
+        text = (f"{job.label}: {progress.stage or 'starting'} · {progress.files_done}/{progress.files} files"
+                f" · {progress.rows:,} rows · {progress.seconds:.0f}s")
+    st.progress(progress.files_done / progress.files if progress.files else 0.0, text=text)
+    if st.button("Cancel", key=f'{slot}_cancel', disabled=job.cancel_requested):
+        JOBS.cancel(job.id)
+
+def process_channel_job(channel, files, returns_files, rounding, tax_split):
+    """Job body: one cached cube per file, composed for the period -> (cube, state map, load report)."""
+    load_report = []
+    partitions = engine.channel_partitions(
+        channel, files, returns_files, cache=UPLOAD_CACHE, report=load_report, rounding=rounding,
+        tax_split=tax_split,
+    )
+    cube, state_map = engine.compose_channel(partitions)
+    return cube, state_map, load_report
+
+def consolidate_job(picklist_files, mapping_files, mapping_hash):
     """
-    Cleans data and maps state names to their FULL Standard Names.
+    Job body: loads the picklists and a changed mapping sheet (`mapping_files`
+    holds it, or is empty) in parallel, saves that sheet as a new mapping
+    version, then consolidates -> (PicklistResult, load results, version or None).
     """
-    df = df_raw.copy()
-    
-    # 1. Convert numeric columns
-    numeric_cols = [COL_TAXABLE_VALUE, COL_ITEM_QUANTITY, COL_IGST, COL_CGST, COL_SGST]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df.fillna(0, inplace=True)
-    
-    # 2. Handle Negative Quantities for Returns
-    negative_tax_mask = df[COL_TAXABLE_VALUE] < 0
-    df.loc[negative_tax_mask, COL_ITEM_QUANTITY] = (
-        df.loc[negative_tax_mask, COL_ITEM_QUANTITY].abs() * -1
+    load_results = engine.load_many(picklist_files + mapping_files, cache=UPLOAD_CACHE)
+    version = None
+    if mapping_files:
+        mapping_result = load_results[-1]
+        if mapping_result.error is not None:
+            raise ValueError(f"Could not read Mapping Sheet ({mapping_result.name}): {mapping_result.error}")
+        version = MAPPINGS.update(mapping_result.value, mapping_hash)
+    loaded = [(idx, r) for idx, r in enumerate(load_results[:len(picklist_files)]) if r.error is None]
+    result = engine.consolidate_picklists([(r.name, r.value) for _, r in loaded], MAPPINGS.index())
+    # positions in the upload list, not among the files that loaded
+    skipped = [(loaded[idx][0], name, missing) for idx, name, missing in result.skipped]
+    return result._replace(skipped=skipped), load_results, version
+
+def show_load_errors(error):
+    """Reports every file that failed in a parallel load."""
+    for r in error.failed:
+        st.error(f"❌ {r.name}: {r.error}")
+
+def show_run_metrics(summary):
+    """Stage timings and totals of one processing run (its Run.summary())."""
+    st.dataframe(
+        pd.DataFrame({'Metric': [name for name, _ in summary],
+                      'Value': [str(value) for _, value in summary]}),
+        use_container_width=True, hide_index=True,
     )
 
-    # 3. Standardize State Names
-    # Clean the input: uppercase, strip spaces
-    df['Clean_Billing_State'] = df[COL_BILLING_STATE].astype(str).str.strip().str.upper()
-    
-    # Map to Full Name using the Dictionary
-    # If a state isn't in the dict, it defaults to Title Case (e.g., "MYSORE" -> "Mysore")
-    df['State_Full_Name'] = df['Clean_Billing_State'].map(INDIAN_STATE_MAPPING).fillna(
-        df['Clean_Billing_State'].str.title()
+def show_picklist_kpis(slots):
+    """Fills the Picklist KPI row from the recorded picklist runs (all sessions)."""
+    last = METRICS.last('picklist')
+    if last is None:
+        for slot, label in zip(slots, ["Avg. Processing Time", "Mapping Accuracy", "Throughput"]):
+            slot.metric(label, "—", "No runs yet", delta_color="off")
+        return
+    average = METRICS.rolling_average('picklist')
+    slots[0].metric(
+        "Avg. Processing Time", f"{average:.2f} sec", f"{last.seconds - average:+.2f}s last run",
+        delta_color="inverse", help=f"Mean of the last {len(METRICS.runs('picklist'))} runs on this server",
     )
-    
-    # Create the map dictionary needed for the display function later
-    state_name_map = df.set_index('Clean_Billing_State')['State_Full_Name'].to_dict()
-    
-    # We use 'Clean_Billing_State' as the Grouping Key to ensure uniqueness,
-    # but the Display Name will be the mapped 'State_Full_Name'
-    df['State_Group'] = df['Clean_Billing_State']
-    
-    return df, state_name_map
-
-@st.cache_data(show_spinner="Processing Meesho data...")
-def process_meesho_data(df_sales_raw, df_returns_raw):
-    """Core logic to process Meesho DataFrame"""
-    COL_M_QTY = 'quantity'
-    COL_M_TAX_VALUE = 'total_taxable_sale_value'
-    COL_M_TAX_AMOUNT = 'tax_amount'
-    COL_M_STATE = 'end_customer_state_new'
-    COLS = [COL_M_QTY, COL_M_TAX_VALUE, COL_M_TAX_AMOUNT]
-
-    # Validate Columns
-    for df in [df_sales_raw, df_returns_raw]:
-        missing = [c for c in COLS + [COL_M_STATE] if c not in df.columns]
-        if missing: raise KeyError(f"Missing columns: {missing}")
-
-    # Process Sales
-    for col in COLS: df_sales_raw[col] = pd.to_numeric(df_sales_raw[col], errors='coerce').fillna(0)
-    
-    # Process Returns (Negative)
-    for col in COLS: 
-        df_returns_raw[col] = pd.to_numeric(df_returns_raw[col], errors='coerce').fillna(0)
-        df_returns_raw[col] = df_returns_raw[col] * -1
-    
-    df_merged = pd.concat([df_sales, df_returns_raw], ignore_index=True)
-    df_merged['State_Clean'] = df_merged[COL_M_STATE].astype(str).str.strip().str.upper()
-    
-    # Tax Logic
-    df_merged['IGST'] = 0.0; df_merged['CGST'] = 0.0; df_merged['SGST'] = 0.0
-    
-    haryana = df_merged['State_Clean'] == 'HARYANA'
-    df_merged.loc[haryana, 'CGST'] = df_merged[COL_M_TAX_AMOUNT] / 2
-    df_merged.loc[haryana, 'SGST'] = df_merged[COL_M_TAX_AMOUNT] / 2
-    df_merged.loc[~haryana, 'IGST'] = df_merged[COL_M_TAX_AMOUNT]
-    
-    # Aggregate
-    final = df_merged.groupby(COL_M_STATE, dropna=True).agg(
-        Total_Qty=(COL_M_QTY, 'sum'),
-        Taxable_Value=(COL_M_TAX_VALUE, 'sum'),
-        IGST=('IGST', 'sum'),
-        CGST=('CGST', 'sum'),
-        SGST=('SGST', 'sum')
-    ).reset_index()
-    
-    final.rename(columns={COL_M_STATE: 'State'}, inplace=True)
-    return final
+    accuracy = last.mapping_accuracy
+    slots[1].metric(
+        "Mapping Accuracy", "—" if accuracy is None else f"{accuracy:.1%}",
+        f"{last.counters.get('unmapped_quantity', 0):,.0f} qty unmapped", delta_color="off",
+        help="Share of the last run's picked quantity that resolved to a Master SKU",
+    )
+    slots[2].metric(
+        "Throughput", f"{last.rows_per_second:,.0f} rows/s",
+        f"{last.rows:,} rows in {last.seconds:.2f}s", delta_color="off",
+    )
+
+def download_report(label, report, file_name, **kwargs):
+    """
+    A download button for a CSV report (a DataFrame, or a callable returning
+    one). The file is only written, in chunks and compressed as chosen in the
+    sidebar, when the button is clicked; the click does not rerun the page.
+    """
+    compression = DOWNLOAD_FORMATS[st.session_state.get('download_format', "CSV")]
+
+    def build():
+        return engine.csv_export(report() if callable(report) else report, file_name, compression)
+
+    st.download_button(label, build, engine.export_name(file_name, compression), engine.MIME_TYPES[compression],
+                       on_click='ignore', **kwargs)
+
+def session_cubes():
+    """{channel name: (cube, state map)} of this session's processed GSTIN x State cubes."""
+    cubes = {}
+    for channel in engine.CHANNELS.values():
+        cube = session_dataset(f'{channel.key}_dataset')
+        if cube is not None:
+            cubes[channel.name] = (cube, st.session_state[f'{channel.key}_state_map'])
+    return cubes
+
+def gstr1_reports(filing_frequency, final_master, cubes, rounding):
+    """
+    (file name, report) of the GSTR-1 zip bundle: the Master GSTR-1, every
+    channel's summary, then every seller GSTIN's Master GSTR-1 and summaries
+    with their index (engine.gstin_reports: one groupby per channel), as the
+    CLI's --per-gstin writes them. Called when the bundle is downloaded.
+    """
+    reports = [(f"Master_GSTR1_{filing_frequency}.csv", final_master)]
+    for name, (cube, state_map) in cubes.items():
+        reports.append((f"{name}/{name}_summary_ALL.csv", functools.partial(engine.summarize_channel, cube, state_map)))
+    return reports + engine.gstin_reports(cubes, filing_frequency, rounding)
+
+def download_gstin_summaries(channel, cube, state_map, filing_frequency):
+    """A zip of every seller GSTIN's summary of one channel and their index (one groupby, built when clicked)."""
+    st.download_button(
+        "⬇️ Download All GSTINs (ZIP)",
+        lambda: engine.zip_bundle(engine.gstin_reports(
+            {channel.name: (cube, state_map)}, filing_frequency, with_masters=False
+        )),
+        f"{channel.key}_gstin_summaries.zip", "application/zip", on_click='ignore', key=f'{channel.key}_gstins_download',
+    )
+
+def show_channel_tab(channel, filing_frequency, rounding, tax_split):
+    """
+    Upload, process and summarize one marketplace (engine.CHANNELS) for the
+    GSTR-1. Reports with seller GSTINs get a GSTIN filter and per-GSTIN
+    downloads; those without (older Meesho exports) show the state-wise view.
+    """
+    key = channel.key
+    separate_returns = channel.sign == engine.SIGN_FILE
+    st.caption(f"{channel.name} GSTR-1 ({filing_frequency} Mode)")
+    col_t, col_u = st.columns([1, 2])
+
+    with col_t:
+        with st.container(border=True):
+            st.write("Template")
+            st.download_button("⬇️ Download Template", engine.template_content(channel), f"{channel.name}_Template.csv",
+                               "text/csv", use_container_width=True, key=f'{key}_template')
+
+    with col_u:
+        with st.container(border=True):
+            st.write(f"Upload Data ({filing_frequency})")
+            files, returns_files = [], []
+            months = [""] if filing_frequency == "Monthly" else [" M1", " M2", " M3"]
+            columns = st.columns(len(months) * (2 if separate_returns else 1))
+            for i, month in enumerate(months):
+                if separate_returns:
+                    f = columns[2 * i].file_uploader(f"Sales{month}", type=['csv', 'xlsx'], key=f'{key}_s{i}')
+                    r = columns[2 * i + 1].file_uploader(f"Returns{month}", type=['csv', 'xlsx'], key=f'{key}_r{i}')
+                    if r: returns_files.append(r)
+                else:
+                    f = columns[i].file_uploader(f"Sales File{month}", type=['csv', 'xlsx'], key=f'{key}_s{i}')
+                if f: files.append(f)
+            dataset_key = engine.channel_dataset_key(channel, files, returns_files, rounding, tax_split)
+
+            if st.button(f"Process {channel.name} Data", key=f'proc_{key}', use_container_width=True):
+                if files:
+                    # 1. Reuse the cube if any session already processed these exact files
+                    cube = DATASETS.get(SESSION_ID, dataset_key)
+                    if cube is not None:
+                        _, _, state_map = engine.normalize_states(cube['State_Group'])
+                        store_dataset(f'{key}_dataset', dataset_key, cube)
+                        st.session_state[f'{key}_state_map'] = state_map
+                        st.session_state[f'{key}_gstins'] = engine.channel_gstins(cube)
+                        st.success("Data processed successfully! Scroll down for reports.")
+                    else:
+                        # 2. One cached cube per file, composed for the period, in the background
+                        start_job(key, dataset_key, f"Processing {channel.name} data", key, process_channel_job,
+                                  channel, files, returns_files, rounding, tax_split)
+                else:
+                    st.warning("Please upload at least one sales file.")
+
+            # 3. Hand a finished job's cube to the session
+            job, job_key = take_job(key)
+            if job is not None and job_succeeded(job):
+                cube, state_map, load_report = job.result
+                store_dataset(f'{key}_dataset', job_key, cube)
+                st.session_state[f'{key}_state_map'] = state_map
+                st.session_state[f'{key}_gstins'] = engine.channel_gstins(cube)
+                st.success("Data processed successfully! Scroll down for reports.")
+                with st.expander("Processing metrics"):
+                    show_run_metrics(job.run.summary())
+                    st.dataframe(engine.load_summary(load_report), use_container_width=True)
+            if key in st.session_state['jobs']:
+                show_job_progress(key)
+
+    cube = session_dataset(f'{key}_dataset')
+    if cube is not None:
+        st.divider()
+        st.subheader(f"{channel.name} Summary & Cards")
+        gstins = st.session_state[f'{key}_gstins']
+        selected_gstin = st.selectbox("Select Seller GSTIN:", ['ALL'] + gstins, key=f'{key}_gstin') if gstins else 'ALL'
+        state_map = st.session_state[f'{key}_state_map']
+        summary_view = engine.summarize_channel(cube, state_map, selected_gstin)
+
+        m1, m2, m3, m4, m5 = st.columns(5)
+        m1.metric("Taxable Value", f"₹ {summary_view['Taxable'].sum():,.0f}")
+        m2.metric("IGST", f"₹ {summary_view['IGST'].sum():,.0f}")
+        m3.metric("CGST", f"₹ {summary_view['CGST'].sum():,.0f}")
+        m4.metric("SGST", f"₹ {summary_view['SGST'].sum():,.0f}")
+        m5.metric("Total Qty", f"{summary_view['Qty'].sum():,.0f}")
+        st.dataframe(summary_view, use_container_width=True)
+
+        # Save to Master Merge (every GSTIN's sales, whichever one is shown)
+        st.session_state['master_gstr1'].set_channel(
+            channel.name, summary_view if selected_gstin == 'ALL' else engine.summarize_channel(cube, state_map)
+        )
+
+        download_report(f"⬇️ Download Summary ({selected_gstin})", summary_view, f"{key}_summary.csv",
+                        key=f'{key}_download')
+        if gstins:
+            download_gstin_summaries(channel, cube, state_map, filing_frequency)
 
 # ==========================================
 # 5. SIDEBAR NAVIGATION
@@ -341,18 +526,30 @@ with st.sidebar:
         ["📋 Listing", "📝 Picklist", "📈 Sales", "📣 Marketing", "💰 Financial", "📦 Inventory", "📑 Reporting", "⚙️ Configuration"],
     )
     
+    st.selectbox("Download format:", list(DOWNLOAD_FORMATS), key='download_format',
+                 help="Reports are written only when a download button is clicked.")
+
     st.markdown("---")
+    usage = DATASETS.session_usage(SESSION_ID)
     st.markdown(f"""
     <div style="background-color: rgba(255,255,255,0.1); padding: 15px; border-radius: 10px;">
         <small style="color: #94a3b8;">System Status</small><br>
         <strong style="color: #4ade80;">● Online</strong><br>
-        <small style="color: #e2e8f0;">User: {st.session_state['user_id']}</small>
+        <small style="color: #e2e8f0;">User: {st.session_state['user_id']}</small><br>
+        <small style="color: #e2e8f0;">Session data: {usage.resident_bytes / 2**20:,.1f} MB in memory, {usage.spilled_bytes / 2**20:,.1f} MB on disk</small>
     </div>
     """, unsafe_allow_html=True)
     st.write("")
     if st.button("Logout", use_container_width=True):
         st.session_state["authenticated"] = False
         st.session_state["user_id"] = ""
+        clear_channels()
+        for job_id, _ in st.session_state['jobs'].values():
+            JOBS.cancel(job_id)
+        st.session_state['jobs'] = {}
+        DATASETS.release(SESSION_ID)
+        st.session_state['master_gstr1'] = engine.MasterMerge(st.session_state['master_gstr1'].rounding)
+        st.session_state['picklist_result'] = None
         st.rerun()
 
 # ==========================================
@@ -364,12 +561,10 @@ if "Picklist" in menu:
     st.markdown('<div class="main-header">Picklist Utility</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">Consolidate orders and map them to Master SKUs.</div>', unsafe_allow_html=True)
 
-    # --- KPI METRICS ---
+    # --- KPI METRICS (measured; refreshed again after a run below) ---
     with st.container():
-        kpi1, kpi2, kpi3 = st.columns(3)
-        kpi1.metric("Avg. Processing Time", "2 sec", "-0.5s")
-        kpi2.metric("Mapping Accuracy", "100%", "Target")
-        kpi3.metric("System Status", "Ready", "Online")
+        kpi_slots = [col.empty() for col in st.columns(3)]
+        show_picklist_kpis(kpi_slots)
 
     st.divider()
     
@@ -396,7 +591,16 @@ if "Picklist" in menu:
         with st.container(border=True):
             st.subheader("2. Upload Mapping Sheet")
             st.caption("Required Headers: **SKU | Size | Color | Master SKU**")
-            mapping_file = st.file_uploader("Mapping Master File (Mandatory)", type=['csv', 'xlsx'], key="mapping_sheet")
+            saved_mapping = MAPPINGS.current()
+            if saved_mapping is None:
+                mapping_label = "Mapping Master File (Mandatory)"
+            else:
+                mapping_label = "Mapping Master File (Optional: only when it changed)"
+                st.caption(
+                    f"Using saved mapping v{saved_mapping.version} "
+                    f"({saved_mapping.rows:,} keys, {pd.Timestamp(saved_mapping.created, unit='s'):%d %b %Y %H:%M} UTC)"
+                )
+            mapping_file = st.file_uploader(mapping_label, type=['csv', 'xlsx'], key="mapping_sheet")
             
         with st.container(border=True):
             st.subheader("3. Action")
@@ -407,113 +611,79 @@ if "Picklist" in menu:
                 # VALIDATION: Check if files exist
                 if not picklist_files:
                     st.error("❌ Please upload at least one Picklist file.")
-                elif not mapping_file:
+                elif not mapping_file and saved_mapping is None:
                     st.error("❌ Please upload the Mapping Sheet.")
                 else:
-                    with st.spinner("Processing files..."):
-                        try:
-                            # --- CONSTANTS FOR EXPECTED HEADERS ---
-                            PL_COLS = ['SKU', 'Color', 'Size', 'Total Quantity']
-                            MAP_COLS = ['SKU', 'Size', 'Color', 'Master SKU']
-                            
-                            # --- 1. PROCESS MAPPING SHEET ---
-                            mapping_df = load_data(mapping_file)
-                            
-                            # Standardize column names (strip spaces, title case)
-                            mapping_df.columns = mapping_df.columns.str.strip()
-                            
-                            # Validate Mapping Headers
-                            missing_map = [c for c in MAP_COLS if c not in mapping_df.columns]
-                            if missing_map:
-                                st.error(f"❌ Mapping Sheet Missing Columns: {missing_map}")
-                                st.stop()
-                            
-                            # Clean Mapping Data for Merge Keys (Strip and Upper)
-                            mapping_df['SKU'] = mapping_df['SKU'].astype(str).str.strip()
-                            mapping_df['Color'] = mapping_df['Color'].astype(str).str.strip().str.upper()
-                            mapping_df['Size'] = mapping_df['Size'].astype(str).str.strip().str.upper()
-                            
-                            # --- 2. PROCESS PICKLIST FILES ---
-                            all_picklist_dfs = []
-                            
-                            for idx, f in enumerate(picklist_files):
-                                df = load_data(f)
-                                df.columns = df.columns.str.strip() # Clean headers
-                                
-                                # Validate Picklist Headers
-                                missing_pl = [c for c in PL_COLS if c not in df.columns]
-                                if missing_pl:
-                                    st.warning(f"⚠️ Skipping File {idx+1} ({f.name}): Missing columns {missing_pl}")
-                                    continue
-                                
-                                # Clean Data for Merge Keys
-                                df['SKU'] = df['SKU'].astype(str).str.strip()
-                                df['Color'] = df['Color'].astype(str).str.strip().str.upper()
-                                df['Size'] = df['Size'].astype(str).str.strip().str.upper()
-                                df['Total Quantity'] = pd.to_numeric(df['Total Quantity'], errors='coerce').fillna(0)
-                                
-                                all_picklist_dfs.append(df)
-                                
-                            if not all_picklist_dfs:
-                                st.error("❌ No valid picklist files to process.")
-                                st.stop()
-                                
-                            # --- 3. MERGE ALL PICKLISTS ---
-                            merged_picklist = pd.concat(all_picklist_dfs, ignore_index=True)
-                            
-                            # Consolidate duplicate rows in raw data first (Group by Keys)
-                            consolidated_raw = merged_picklist.groupby(['SKU', 'Color', 'Size'])['Total Quantity'].sum().reset_index()
-                            
-                            # --- 4. MAP TO MASTER SKU ---
-                            # Merge on 3 Keys: SKU + Color + Size
-                            final_df = pd.merge(
-                                consolidated_raw,
-                                mapping_df,
-                                on=['SKU', 'Color', 'Size'],
-                                how='left'
-                            )
-                            
-                            # Fill unmapped items with "Unknown" or keep original SKU
-                            final_df['Master SKU'] = final_df['Master SKU'].fillna('UNMAPPED_ITEM')
-                            
-                            # --- 5. FINAL GROUP BY MASTER SKU ---
-                            final_output = final_df.groupby('Master SKU')['Total Quantity'].sum().reset_index()
-                            final_output = final_output.sort_values(by='Total Quantity', ascending=False)
-
-                            # --- 6. DISPLAY RESULTS ---
-                            st.success("✅ Consolidation Complete!")
-                            
-                            col_r1, col_r2 = st.columns([2, 1])
-                            
-                            with col_r1:
-                                st.subheader("Final Consolidated Master Picklist")
-                                st.dataframe(final_output, use_container_width=True)
-                            
-                            with col_r2:
-                                st.info("Summary")
-                                st.write(f"**Total Items:** {final_output['Total Quantity'].sum():,.0f}")
-                                st.write(f"**Unique SKUs:** {len(final_output)}")
-                                
-                                # Check for Unmapped
-                                unmapped_count = final_output[final_output['Master SKU'] == 'UNMAPPED_ITEM']['Total Quantity'].sum()
-                                if unmapped_count > 0:
-                                    st.error(f"⚠️ **Unmapped Qty:** {unmapped_count}")
-                                    st.caption("Check 'UNMAPPED_ITEM' in the list. Update mapping sheet.")
-                                else:
-                                    st.success("All items mapped successfully!")
-
-                            # --- 7. DOWNLOAD BUTTON ---
-                            csv = final_output.to_csv(index=False).encode('utf-8')
-                            st.download_button(
-                                label="⬇️ Download Final Master Picklist (CSV)",
-                                data=csv,
-                                file_name="Master_Consolidated_Picklist.csv",
-                                mime="text/csv",
-                                use_container_width=True
-                            )
-                                
-                        except Exception as e:
-                            st.error(f"An unexpected error occurred: {e}")
+                    # --- 1. LOAD, CONSOLIDATE & MAP in the background (picklists + a changed mapping sheet in parallel) ---
+                    # Timed as one 'picklist' run (stages, rows, bytes read, peak memory)
+                    mapping_hash = engine.content_hash(mapping_file) if mapping_file else None
+                    new_mapping = mapping_hash is not None and (
+                        saved_mapping is None or saved_mapping.content_hash != mapping_hash
+                    )
+                    start_job('picklist', None, "Consolidating picklists", 'picklist', consolidate_job,
+                              picklist_files, [mapping_file] if new_mapping else [], mapping_hash)
+
+            job, _ = take_job('picklist')
+            if job is not None and job_succeeded(job):
+                result, load_results, version = job.result
+                st.session_state['picklist_result'] = (
+                    result, version, engine.load_summary(load_results), job.run.summary()
+                )
+            if 'picklist' in st.session_state['jobs']:
+                show_job_progress('picklist')
+
+        # --- 2. DISPLAY RESULTS (of the last consolidation, until the next one) ---
+        if st.session_state['picklist_result'] is not None:
+            (final_output, skipped, unmapped_keys), version, load_table, run_summary = st.session_state['picklist_result']
+            if version is not None:
+                st.info(
+                    f"Mapping saved as v{version.version}: {version.added:,} added, "
+                    f"{version.changed:,} changed, {version.removed:,} removed."
+                )
+            picklist_loads = load_table.iloc[:-1] if version is not None else load_table
+            for idx, r in enumerate(picklist_loads.itertuples()):
+                if pd.notna(r.Error):
+                    st.warning(f"⚠️ Skipping File {idx+1} ({r.File}): {r.Error}")
+            for idx, name, missing_pl in skipped:
+                st.warning(f"⚠️ Skipping File {idx+1} ({name}): Missing columns {missing_pl}")
+
+            st.success("✅ Consolidation Complete!")
+            
+            col_r1, col_r2 = st.columns([2, 1])
+            
+            with col_r1:
+                st.subheader("Final Consolidated Master Picklist")
+                st.dataframe(final_output, use_container_width=True)
+            
+            with col_r2:
+                st.info("Summary")
+                st.write(f"**Total Items:** {final_output['Total Quantity'].sum():,.0f}")
+                st.write(f"**Unique SKUs:** {len(final_output)}")
+                
+                # Check for Unmapped
+                unmapped_count = engine.unmapped_quantity(final_output)
+                if unmapped_count > 0:
+                    st.error(f"⚠️ **Unmapped Qty:** {unmapped_count}")
+                    st.caption(f"Check '{UNMAPPED_SKU}' in the list. Update mapping sheet.")
+                    with st.expander(f"Unmapped SKU / Color / Size ({len(unmapped_keys)})"):
+                        st.dataframe(unmapped_keys, use_container_width=True)
+                else:
+                    st.success("All items mapped successfully!")
+
+            # --- 3. DOWNLOAD BUTTON ---
+            download_report(
+                "⬇️ Download Final Master Picklist",
+                final_output,
+                "Master_Consolidated_Picklist.csv",
+                use_container_width=True
+            )
+            
+            with st.expander("Processing metrics"):
+                show_run_metrics(run_summary)
+                st.dataframe(load_table, use_container_width=True)
+
+    # KPIs from the runs recorded so far (including the one above)
+    show_picklist_kpis(kpi_slots)
 
 # --- REPORTING (GSTR-1 Logic) ---
 elif "Reporting" in menu:
@@ -531,216 +701,25 @@ elif "Reporting" in menu:
         freq_col1, freq_col2 = st.columns([1, 3])
         with freq_col1:
             filing_frequency = st.radio("Frequency:", ["Monthly", "Quarterly"], horizontal=True)
+        with freq_col2:
+            # Defaults to the mode the current totals were built in
+            tax_arithmetic = st.radio(
+                "Tax arithmetic:", list(TAX_ARITHMETIC), horizontal=True,
+                index=list(TAX_ARITHMETIC.values()).index(st.session_state['master_gstr1'].rounding),
+                help="Exact modes round every line to the paisa and add whole paise, so totals match invoice-level rounding.",
+            )
+        rounding = TAX_ARITHMETIC[tax_arithmetic]
+        if st.session_state['master_gstr1'].rounding != rounding:
+            reset_gstr1(rounding)
+        tax_split = st.session_state['tax_split']
         
         st.divider()
         st.markdown("### 2. Marketplace Uploads")
 
-        # Sub Tabs for Marketplaces
-        sub_tab1, sub_tab2, sub_tab3, sub_tab4, sub_tab5, sub_tab6 = st.tabs([
-            "Amazon", "Flipkart", "Meesho", "Myntra", "JioMart", "Ajio"
-        ])
-        
-        # --- FLIPKART LOGIC ---
-        with sub_tab2:
-            st.caption(f"Flipkart GSTR-1 ({filing_frequency} Mode)")
-            col_f1, col_f2 = st.columns([1,2])
-            
-            with col_f1:
-                with st.container(border=True):
-                    st.write("Template")
-                    st.download_button("⬇️ Download Template", FLIPKART_TEMPLATE_CONTENT, "Flipkart_Template.csv", "text/csv", use_container_width=True)
-            
-            with col_f2:
-                with st.container(border=True):
-                    st.write(f"Upload Data ({filing_frequency})")
-                    
-                    files_to_process = []
-                    if filing_frequency == "Monthly":
-                        f = st.file_uploader("Upload Monthly Sales File", type=['csv', 'xlsx'], key='fk_month')
-                        if f: files_to_process.append(f)
-                    else: # Quarterly
-                        c1, c2, c3 = st.columns(3)
-                        f1 = c1.file_uploader("Month 1 File", type=['csv', 'xlsx'], key='fk_q1')
-                        f2 = c2.file_uploader("Month 2 File", type=['csv', 'xlsx'], key='fk_q2')
-                        f3 = c3.file_uploader("Month 3 File", type=['csv', 'xlsx'], key='fk_q3')
-                        if f1: files_to_process.append(f1)
-                        if f2: files_to_process.append(f2)
-                        if f3: files_to_process.append(f3)
-
-                    # PROCESSING BUTTON
-                    if st.button("Process Flipkart Data", key='proc_fk', use_container_width=True):
-                        if files_to_process:
-                            try:
-                                # 1. Consolidate Files
-                                df_raw = consolidate_files(files_to_process)
-                                
-                                # 2. Process Data
-                                df_processed, state_map = process_flipkart_data(df_raw)
-                                
-                                # 3. Save to Session State (So we can filter below without re-uploading)
-                                st.session_state['flipkart_raw_df'] = df_processed
-                                st.session_state['flipkart_state_map'] = state_map
-                                
-                                st.success("Data processed successfully! Scroll down for reports.")
-                                
-                            except Exception as e:
-                                st.error(f"Error: {e}")
-                        else:
-                            st.warning("Please upload at least one file.")
-
-            # --- FLIPKART REPORT VIEW (FILTERING RESTORED) ---
-            # This runs if data exists in Session State, independent of the button click
-            if st.session_state['flipkart_raw_df'] is not None:
-                st.divider()
-                st.subheader("Flipkart Summary & Cards")
-                
-                df_flipkart = st.session_state['flipkart_raw_df']
-                state_map = st.session_state['flipkart_state_map']
-
-                # 1. GSTIN FILTER
-                unique_gstins = df_flipkart[COL_GSTIN].astype(str).unique()
-                valid_gstins = sorted([g for g in unique_gstins if g not in ('0.0', 'nan', '0')])
-                gstin_options = ['ALL'] + valid_gstins
-                
-                selected_gstin = st.selectbox("Select Seller GSTIN:", gstin_options)
-
-                # 2. FILTER DATA
-                if selected_gstin == 'ALL':
-                    filtered_df = df_flipkart.copy()
-                else:
-                    filtered_df = df_flipkart[df_flipkart[COL_GSTIN].astype(str) == selected_gstin].copy()
-
-                # 3. CALCULATE METRICS
-                total_taxable = filtered_df[COL_TAXABLE_VALUE].sum()
-                total_igst = filtered_df[COL_IGST].sum()
-                total_cgst = filtered_df[COL_CGST].sum()
-                total_sgst = filtered_df[COL_SGST].sum()
-                total_qty = filtered_df[COL_ITEM_QUANTITY].sum()
-
-                # 4. DISPLAY CARDS
-                m1, m2, m3, m4, m5 = st.columns(5)
-                m1.metric("Taxable Value", f"₹ {total_taxable:,.0f}")
-                m2.metric("IGST", f"₹ {total_igst:,.0f}")
-                m3.metric("CGST", f"₹ {total_cgst:,.0f}")
-                m4.metric("SGST", f"₹ {total_sgst:,.0f}")
-                m5.metric("Total Qty", f"{total_qty:,.0f}")
-
-                # 5. PREPARE AGGREGATED TABLE FOR DISPLAY
-                summary_view = filtered_df.groupby('State_Group').agg(
-                    Taxable=(COL_TAXABLE_VALUE, 'sum'),
-                    IGST=(COL_IGST, 'sum'),
-                    CGST=(COL_CGST, 'sum'),
-                    SGST=(COL_SGST, 'sum'),
-                    Qty=(COL_ITEM_QUANTITY, 'sum')
-                ).reset_index()
-                
-                # Map to Full Name
-                summary_view['State'] = summary_view['State_Group'].map(state_map)
-                
-                # Reorder cols
-                summary_view = summary_view[['State', 'Taxable', 'IGST', 'CGST', 'SGST', 'Qty']]
-                
-                st.dataframe(summary_view, use_container_width=True)
-
-                # 6. SAVE TO MASTER MERGE
-                st.session_state['master_gstr1_data']['Flipkart'] = summary_view[['State', 'Taxable', 'IGST', 'CGST', 'SGST']]
-                
-                # Download Button
-                csv = summary_view.to_csv(index=False).encode('utf-8')
-                st.download_button(f"⬇️ Download Summary ({selected_gstin})", csv, "flipkart_summary.csv", "text/csv")
-
-
-        # --- MEESHO LOGIC ---
-        with sub_tab3:
-            st.caption(f"Meesho GSTR-1 ({filing_frequency} Mode)")
-            
-            with st.container(border=True):
-                files_sales = []
-                files_returns = []
-                
-                if filing_frequency == "Monthly":
-                    c1, c2 = st.columns(2)
-                    fs = c1.file_uploader("Sales File", type=['csv', 'xlsx'], key='m_sales_m')
-                    fr = c2.file_uploader("Returns File", type=['csv', 'xlsx'], key='m_ret_m')
-                    if fs: files_sales.append(fs)
-                    if fr: files_returns.append(fr)
-                else: # Quarterly
-                    st.write("**Month 1**")
-                    c1, c2 = st.columns(2)
-                    fs1 = c1.file_uploader("Sales M1", key='m_s1'); fr1 = c2.file_uploader("Ret M1", key='m_r1')
-                    
-                    st.write("**Month 2**")
-                    c3, c4 = st.columns(2)
-                    fs2 = c3.file_uploader("Sales M2", key='m_s2'); fr2 = c4.file_uploader("Ret M2", key='m_r2')
-                    
-                    st.write("**Month 3**")
-                    c5, c6 = st.columns(2)
-                    fs3 = c5.file_uploader("Sales M3", key='m_s3'); fr3 = c6.file_uploader("Ret M3", key='m_r3')
-
-                    if fs1: files_sales.append(fs1)
-                    if fr1: files_returns.append(fr1)
-                    if fs2: files_sales.append(fs2)
-                    if fr2: files_returns.append(fr2)
-                    if fs3: files_sales.append(fs3)
-                    if fr3: files_returns.append(fr3)
-                
-                if st.button("Process Meesho Data", key='proc_meesho', use_container_width=True):
-                    if files_sales and files_returns:
-                        try:
-                            # 1. Consolidate Raw Files
-                            df_sales_all = consolidate_files(files_sales)
-                            df_returns_all = consolidate_files(files_returns)
-                            
-                            # 2. Process
-                            meesho_final = process_meesho_data(df_sales_all, df_returns_all)
-                            
-                            # 3. Store in Session State
-                            st.session_state['meesho_df'] = meesho_final
-
-                            # 4. Store for Master Merge
-                            std_meesho = meesho_final.rename(columns={'Taxable_Value': 'Taxable'})
-                            st.session_state['master_gstr1_data']['Meesho'] = std_meesho[['State', 'Taxable', 'IGST', 'CGST', 'SGST']]
-                            
-                            st.success("Meesho Data Processed & Saved for Merge!")
-                            
-                        except Exception as e:
-                            st.error(f"Error: {e}")
-                    else:
-                        st.warning("Upload Sales and Return files.")
-
-            # --- MEESHO REPORT VIEW (VALUE CARDS ADDED) ---
-            if st.session_state['meesho_df'] is not None:
-                st.divider()
-                st.subheader("Meesho Summary & Cards")
-                
-                m_df = st.session_state['meesho_df']
-
-                # 1. CALCULATE METRICS
-                total_taxable = m_df['Taxable_Value'].sum()
-                total_igst = m_df['IGST'].sum()
-                total_cgst = m_df['CGST'].sum()
-                total_sgst = m_df['SGST'].sum()
-                total_qty = m_df['Total_Qty'].sum()
-
-                # 2. DISPLAY CARDS
-                m1, m2, m3, m4, m5 = st.columns(5)
-                m1.metric("Taxable Value", f"₹ {total_taxable:,.0f}")
-                m2.metric("IGST", f"₹ {total_igst:,.0f}")
-                m3.metric("CGST", f"₹ {total_cgst:,.0f}")
-                m4.metric("SGST", f"₹ {total_sgst:,.0f}")
-                m5.metric("Total Qty", f"{total_qty:,.0f}")
-
-                # 3. SHOW DATAFRAME
-                st.dataframe(m_df, use_container_width=True)
-
-                # 4. DOWNLOAD BUTTON
-                csv = m_df.to_csv(index=False).encode('utf-8')
-                st.download_button(f"⬇️ Download Meesho Summary", csv, "meesho_summary.csv", "text/csv")
-
-
-        # --- Placeholders for Others ---
-        for t, n in zip([sub_tab1, sub_tab4, sub_tab5, sub_tab6], ["Amazon", "Myntra", "JioMart", "Ajio"]):
-            with t: st.info(f"{n} integration coming soon.")
+        # One tab per marketplace, all served by the shared channel pipeline (see formulaman.channels)
+        for t, channel in zip(st.tabs([c.name for c in engine.CHANNELS.values()]), engine.CHANNELS.values()):
+            with t:
+                show_channel_tab(channel, filing_frequency, rounding, tax_split)
 
         st.divider()
         
@@ -749,45 +728,33 @@ elif "Reporting" in menu:
         with st.container(border=True):
             st.write("Merge processed data from all channels into a single GSTR-1 CSV.")
             
-            # Show what data is ready
-            ready_channels = list(st.session_state['master_gstr1_data'].keys())
-            if ready_channels:
-                st.success(f"Ready to merge: {', '.join(ready_channels)}")
-                
-                if st.button("🚀 Generate Consolidated GSTR-1 Report", use_container_width=True):
-                    # Combine all dataframes
-                    all_dfs = []
-                    for channel, df in st.session_state['master_gstr1_data'].items():
-                        df['Channel'] = channel # Add source column
-                        all_dfs.append(df)
-                    
-                    if all_dfs:
-                        master_df = pd.concat(all_dfs, ignore_index=True)
-                        
-                        # Group by State to get final totals
-                        final_master = master_df.groupby('State').agg(
-                            Taxable=('Taxable', 'sum'),
-                            IGST=('IGST', 'sum'),
-                            CGST=('CGST', 'sum'),
-                            SGST=('SGST', 'sum')
-                        ).reset_index()
-                        
-                        # Rounding
-                        for c in ['Taxable', 'IGST', 'CGST', 'SGST']:
-                            final_master[c] = final_master[c].round(2)
-
-                        st.subheader("Final Consolidated Summary")
-                        st.dataframe(final_master, use_container_width=True)
-                        
-                        # Download Button
-                        csv = final_master.to_csv(index=False).encode('utf-8')
-                        st.download_button(
-                            label="⬇️ Download Master GSTR-1 CSV",
-                            data=csv,
-                            file_name=f"Master_GSTR1_{filing_frequency}.csv",
-                            mime="text/csv",
-                            use_container_width=True
-                        )
+            # Running totals: each processed channel updates them as it lands
+            master_merge = st.session_state['master_gstr1']
+            if master_merge.channels:
+                st.success(f"Merged channels: {', '.join(master_merge.channels)}")
+                final_master = master_merge.view()
+
+                st.subheader("Final Consolidated Summary")
+                st.dataframe(final_master, use_container_width=True)
+
+                # Download Buttons (the bundle adds every channel's summary and each seller GSTIN's reports)
+                download_report(
+                    "⬇️ Download Master GSTR-1",
+                    final_master,
+                    f"Master_GSTR1_{filing_frequency}.csv",
+                    use_container_width=True
+                )
+                cubes = session_cubes()
+                st.download_button(
+                    label="⬇️ Download All Reports (ZIP)",
+                    data=lambda: engine.zip_bundle(
+                        gstr1_reports(filing_frequency, final_master, cubes, master_merge.rounding)
+                    ),
+                    file_name=f"GSTR1_{filing_frequency}_Reports.zip",
+                    mime="application/zip",
+                    on_click='ignore',
+                    use_container_width=True
+                )
             else:
                 st.info("No data processed yet. Process individual channels above first.")
 
@@ -827,4 +794,54 @@ elif "Inventory" in menu:
 
 elif "Configuration" in menu:
     st.markdown('<div class="main-header">Settings</div>', unsafe_allow_html=True)
-    st.button("Save Settings")
+
+    # --- GST HOME STATES (intra-state CGST + SGST vs IGST, every marketplace) ---
+    tax_split = st.session_state['tax_split']
+    with st.container(border=True):
+        st.subheader("GST Home States")
+        st.caption(
+            "A sale is intra-state (CGST + SGST) when the customer is in the seller's home state: "
+            "the state whose GST code starts the seller GSTIN (06 = Haryana). Override it per GSTIN below."
+        )
+        default_home = st.selectbox(
+            "Home state for reports without a seller GSTIN", STATE_NAMES,
+            index=STATE_NAMES.index(tax_split.default_home_state) if tax_split.default_home_state in STATE_NAMES else 0,
+        )
+        overrides = st.data_editor(
+            pd.DataFrame({'GSTIN': list(tax_split.home_states), 'Home State': list(tax_split.home_states.values())},
+                         dtype=object),
+            num_rows="dynamic", use_container_width=True, key="home_state_overrides",
+            column_config={'Home State': st.column_config.SelectboxColumn(options=STATE_NAMES)},
+        )
+
+    if st.button("Save Settings"):
+        new_split = engine.TaxSplit(default_home, {
+            row['GSTIN']: row['Home State'] for _, row in overrides.iterrows()
+            if isinstance(row['GSTIN'], str) and row['GSTIN'].strip() and isinstance(row['Home State'], str)
+        })
+        if new_split.tag() != tax_split.tag():
+            # Processed GSTR-1 data used the old split: start the period over
+            st.session_state['tax_split'] = new_split
+            reset_gstr1(st.session_state['master_gstr1'].rounding)
+        st.success("Settings saved. Re-process GSTR-1 uploads to apply them.")
+
+    with st.expander("Server Memory (processed datasets per session)"):
+        st.caption(f"Budget: {DATASETS.budget_bytes / 2**20:,.0f} MB in memory; idle sessions spill to disk first.")
+        st.dataframe(DATASETS.usage(), use_container_width=True)
+
+    with st.expander("Background Jobs (all sessions)"):
+        st.caption(f"{JOBS.max_workers} jobs run at a time (set FORMULAMAN_JOB_WORKERS); more are queued.")
+        st.dataframe(JOBS.table(), use_container_width=True, hide_index=True)
+
+    with st.expander("SKU Mapping Versions"):
+        st.caption(f"Stored in {MAPPINGS.path}; upload a new sheet on the Picklist page to update it.")
+        st.dataframe(MAPPINGS.history(), use_container_width=True)
+
+    with st.expander("Processing Metrics (Prometheus)"):
+        if METRICS.textfile:
+            st.caption(f"Rewritten after every run to {METRICS.textfile} (set FORMULAMAN_METRICS_FILE).")
+        else:
+            st.caption("Set FORMULAMAN_METRICS_FILE to have this written to a file after every run.")
+        prometheus_text = METRICS.prometheus()
+        st.code(prometheus_text, language='text')
+        st.download_button("⬇️ Download metrics.prom", prometheus_text, "metrics.prom", "text/plain")
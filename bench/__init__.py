@@ -0,0 +1,7 @@
+"""
+Benchmarks of the formulaman engine on seeded synthetic exports.
+
+``bench.generators`` writes Flipkart, Meesho, picklist and mapping files at
+any scale; ``python -m bench`` times and memory-profiles each processing stage
+and records the results in a JSON history (see bench.run).
+"""
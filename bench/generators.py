@@ -0,0 +1,361 @@
+"""
+Seeded synthetic marketplace exports for benchmarks.
+
+Every generator writes CSVs exactly as the dashboard receives them: the header,
+then one template/description row (skipped by the loaders), then data. The
+Flipkart report is also written as an .xlsx workbook of the same rows. Rows
+are produced and written in chunks of CHUNK_ROWS, so 10M-row files need no
+more memory than 10k-row ones. The same (rows, seed) always gives the same
+bytes, so timings of different commits are comparable. Amounts are drawn in
+whole paise and every column is built and written with pyarrow (no Python
+loop per row), which keeps a 10M-row export to a few minutes.
+"""
+import csv
+import io
+import os
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from formulaman.constants import (
+    COL_BILLING_STATE, COL_CGST, COL_GSTIN, COL_IGST, COL_ITEM_QUANTITY,
+    COL_M_QTY, COL_M_STATE, COL_M_TAX_AMOUNT, COL_M_TAX_VALUE, COL_SGST,
+    COL_TAXABLE_VALUE, FLIPKART_TEMPLATE_CONTENT, INDIAN_STATE_MAPPING,
+)
+
+# Bump when any generator's output changes (part of the data directory name)
+GENERATOR_VERSION = 2
+
+CHUNK_ROWS = 500_000
+
+# Seller registrations: GSTIN -> home state
+SELLER_GSTINS = {
+    '06ABCDE1234F1Z5': 'HARYANA',
+    '07ABCDE1234F1Z3': 'DELHI',
+    '29ABCDE1234F1Z1': 'KARNATAKA',
+}
+
+GST_RATES = np.array([0.05, 0.12, 0.18])
+
+# Billing states as marketplaces spell them: the mapping's own keys, their
+# display names, stray case and padding, plus a few unknown (legacy) names
+BILLING_STATES = np.array(
+    list(INDIAN_STATE_MAPPING)
+    + list(dict.fromkeys(INDIAN_STATE_MAPPING.values()))
+    + ['haryana', ' Delhi', 'tamilnadu ', 'Orissa', 'Mysore', 'Bombay']
+)
+
+FLIPKART_COLUMNS, FLIPKART_TEMPLATE_ROW = csv.reader(io.StringIO(FLIPKART_TEMPLATE_CONTENT))
+
+MEESHO_COLUMNS = [
+    'identifier', 'sup_name', 'gstin', 'sub_order_num', 'order_date', 'hsn_code',
+    COL_M_QTY, 'gst_rate', COL_M_TAX_VALUE, COL_M_TAX_AMOUNT, 'total_invoice_value',
+    COL_M_STATE, 'enrollment_no',
+]
+
+PICKLIST_COLUMNS = ['SKU', 'Color', 'Size', 'Total Quantity']
+MAPPING_COLUMNS = ['SKU', 'Color', 'Size', 'Master SKU']
+MAPPING_COLORS = np.array(['Red', 'Blue', 'Green', 'Black', 'White', 'Navy', 'Pink', 'Grey'])
+MAPPING_SIZES = np.array(['S', 'M', 'L', 'XL', 'XXL', 'Free Size'])
+
+
+def _chunks(rows):
+    """(start, size) of each CHUNK_ROWS slice of `rows`."""
+    for start in range(0, rows, CHUNK_ROWS):
+        yield start, min(CHUNK_ROWS, rows - start)
+
+
+def _text(values, width=0, prefix=''):
+    """Numbers as text, zero-padded to `width` and prefixed ('OD' + '000042')."""
+    text = pc.cast(pa.array(values), pa.string())
+    if width:
+        text = pc.utf8_lpad(text, width, '0')
+    return pc.binary_join_element_wise(prefix, text, '') if prefix else text
+
+
+def _rupees(paise):
+    """int64 paise as rupee text with two decimals ('-12.05')."""
+    paise = np.asarray(paise, dtype=np.int64)
+    whole = np.abs(paise)
+    sign = pa.array(np.where(paise < 0, '-', ''))
+    return pc.binary_join_element_wise(sign, _text(whole // 100), '.', _text(whole % 100, 2), '')
+
+
+def _write(path, columns, second_row, chunks):
+    """
+    Writes header + template row + every chunk ({column: values}) as one CSV.
+
+    Columns a chunk leaves out are blank. Values are written unquoted (real
+    exports are), so a generated value with a comma or quote raises.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    head = io.StringIO()
+    writer = csv.writer(head, lineterminator='\n')
+    writer.writerow(columns)
+    writer.writerow(second_row)
+    options = pa_csv.WriteOptions(include_header=False, quoting_style='none')
+    with open(path, 'wb') as fh:
+        fh.write(head.getvalue().encode('utf-8'))
+        for data in chunks:
+            size = len(next(iter(data.values())))
+            table = pa.table({
+                col: pa.array(data[col]) if col in data else pa.nulls(size, pa.string())
+                for col in columns
+            })
+            pa_csv.write_csv(table, fh, options)
+    return path
+
+
+# The parts of a one-sheet workbook besides the sheet and its shared strings
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="sharedStrings.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _letters(index):
+    """Spreadsheet column letters of a 0-based column index (0 -> 'A', 26 -> 'AA')."""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _write_xlsx(path, columns, second_row, chunks):
+    """
+    Writes the rows _write would write as an .xlsx workbook, laid out as
+    Excel saves one: text in a shared string table, numbers as numbers
+    (columns whose every value is a decimal number), blanks left out.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    strings = {}
+
+    def shared(values):
+        """Shared-string indices (as text) of a string array."""
+        encoded = pc.dictionary_encode(values)
+        ids = [strings.setdefault(v, len(strings)) for v in encoded.dictionary.to_pylist()]
+        return _text(pc.take(pa.array(ids, pa.int64()), encoded.indices))
+
+    def rows(start, data):
+        size = len(next(iter(data.values())))
+        numbers = _text(np.arange(start, start + size))
+        cells = []
+        for i, col in enumerate(columns):
+            if col not in data:
+                continue
+            values = pa.array(data[col])
+            text = _text(values)
+            if pa.types.is_integer(values.type) or pa.types.is_floating(values.type) or pc.all(
+                pc.match_substring_regex(text, r'^-?\d+(\.\d+)?$')
+            ).as_py():
+                head, value = '"><v>', text
+            else:
+                head, value = '" t="s"><v>', shared(text)
+            cell = pc.binary_join_element_wise(f'<c r="{_letters(i)}', numbers, head, value, '</v></c>', '')
+            cells.append(pc.if_else(pc.is_null(values), '', cell))
+        return pc.binary_join_element_wise('<row r="', numbers, '">', *cells, '</row>', '')
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as fh:
+            fh.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            for number, row in ((1, columns), (2, second_row)):
+                texts = {col: pa.array([value]) for col, value in zip(columns, row) if value != ''}
+                fh.write(''.join(rows(number, texts).to_pylist()).encode('utf-8'))
+            start = 3
+            for data in chunks:
+                block = rows(start, data)
+                fh.write(''.join(block.to_pylist()).encode('utf-8'))
+                start += len(block)
+            fh.write(b'</sheetData></worksheet>')
+        zf.writestr('xl/sharedStrings.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            f'uniqueCount="{len(strings)}">'
+            + ''.join(f'<si><t xml:space="preserve">{escape(s)}</t></si>' for s in strings)
+            + '</sst>'
+        ))
+        for name, content in XLSX_PARTS.items():
+            zf.writestr(name, content)
+    return path
+
+
+def _taxes(rng, taxable, intra_state):
+    """(IGST, CGST, SGST) paise per line at a random GST rate."""
+    tax = np.rint(taxable * rng.choice(GST_RATES, len(taxable))).astype(np.int64)
+    half = tax // 2
+    return np.where(intra_state, 0, tax), np.where(intra_state, half, 0), np.where(intra_state, half, 0)
+
+
+def flipkart_report(path, rows, seed=0, writer=_write):
+    """
+    A Flipkart sales report (FLIPKART_TEMPLATE_CONTENT columns) of `rows`
+    lines; `writer=_write_xlsx` writes it as a workbook.
+    """
+    rng = np.random.default_rng(seed)
+    gstins = np.array(list(SELLER_GSTINS))
+    homes = np.array(list(SELLER_GSTINS.values()))
+    clean_states = np.char.upper(np.char.strip(BILLING_STATES))
+
+    def chunks():
+        for start, size in _chunks(rows):
+            seller = rng.integers(0, len(gstins), size)
+            state = rng.integers(0, len(BILLING_STATES), size)
+            # ~8% of lines are returns (negative amounts)
+            returned = rng.random(size) < 0.08
+            taxable = np.rint(rng.lognormal(6, 0.8, size) * 100).astype(np.int64)
+            taxable[returned] *= -1
+            igst, cgst, sgst = _taxes(rng, taxable, clean_states[state] == homes[seller])
+            yield {
+                COL_GSTIN: gstins[seller],
+                'Order ID': _text(np.arange(start, start + size), 12, 'OD'),
+                'SKU': _text(rng.integers(0, 20_000, size), 5, 'SKU-'),
+                'Event Type': np.where(returned, 'Return', 'Sale'),
+                'Order Date': np.full(size, '2024-04-15'),
+                COL_ITEM_QUANTITY: rng.integers(1, 4, size),
+                COL_TAXABLE_VALUE: _rupees(taxable),
+                COL_IGST: _rupees(igst),
+                COL_CGST: _rupees(cgst),
+                COL_SGST: _rupees(sgst),
+                COL_BILLING_STATE: BILLING_STATES[state],
+            }
+
+    return writer(path, FLIPKART_COLUMNS, FLIPKART_TEMPLATE_ROW, chunks())
+
+
+def meesho_report(path, rows, seed=0, returns=False):
+    """A Meesho GST sales (or returns) report of `rows` lines for a Haryana seller."""
+    rng = np.random.default_rng(seed)
+
+    def chunks():
+        for start, size in _chunks(rows):
+            taxable = np.rint(rng.lognormal(5.5, 0.6, size) * 100).astype(np.int64)
+            rate = rng.choice(GST_RATES, size)
+            tax = np.rint(taxable * rate).astype(np.int64)
+            yield {
+                'identifier': np.full(size, 'RETURN' if returns else 'SALE'),
+                'sup_name': np.full(size, 'Formula Man'),
+                'gstin': np.full(size, '06ABCDE1234F1Z5'),
+                'sub_order_num': pc.binary_join_element_wise(
+                    _text(np.arange(start, start + size), 15), '_1', ''
+                ),
+                'order_date': np.full(size, '2024-04-15'),
+                'hsn_code': np.full(size, 6109),
+                COL_M_QTY: rng.integers(1, 3, size),
+                'gst_rate': np.rint(rate * 100).astype(np.int64),
+                COL_M_TAX_VALUE: _rupees(taxable),
+                COL_M_TAX_AMOUNT: _rupees(tax),
+                'total_invoice_value': _rupees(taxable + tax),
+                COL_M_STATE: rng.choice(BILLING_STATES, size),
+            }
+
+    return _write(path, MEESHO_COLUMNS, [''] * len(MEESHO_COLUMNS), chunks())
+
+
+def _mapping_keys(keys, seed):
+    """(SKU, Color, Size, Master SKU) arrays of a mapping with `keys` distinct rows."""
+    rng = np.random.default_rng(seed)
+    # four candidate Color/Size pairs per SKU, of which duplicates are dropped
+    sku = np.repeat(np.arange(keys // 4 + 1), 4)[:keys]
+    color = rng.integers(0, len(MAPPING_COLORS), keys)
+    size = rng.integers(0, len(MAPPING_SIZES), keys)
+    packed = (sku * len(MAPPING_COLORS) + color) * len(MAPPING_SIZES) + size
+    _, first = np.unique(packed, return_index=True)
+    first.sort()
+    master = rng.integers(0, max(keys // 10, 1), len(first))
+    return (
+        _text(sku[first], 6, 'SKU-'), pa.array(MAPPING_COLORS[color[first]]),
+        pa.array(MAPPING_SIZES[size[first]]), _text(master, 6, 'M-'),
+    )
+
+
+def mapping_sheet(path, keys, seed=0):
+    """A mapping sheet of about `keys` distinct SKU/Color/Size rows (~10 per Master SKU)."""
+    columns = dict(zip(MAPPING_COLUMNS, _mapping_keys(keys, seed)))
+    return _write(path, MAPPING_COLUMNS, [''] * len(MAPPING_COLUMNS), [columns])
+
+
+def picklist(path, rows, mapping_keys, seed=0):
+    """
+    A picklist of `rows` lines drawn from the mapping sheet of `mapping_keys`
+    keys (same seed as mapping_sheet), with the spelling noise of real exports
+    (padding, lower case) and ~2% of lines for SKUs the mapping does not know.
+    """
+    rng = np.random.default_rng(seed + 1)
+    sku, color, size_, _ = _mapping_keys(mapping_keys, seed)
+
+    def chunks():
+        for _, size in _chunks(rows):
+            lines = pa.array(rng.integers(0, len(sku), size))
+            noisy = rng.random(size)
+            line_sku = pc.take(sku, lines)
+            line_sku = pc.if_else(noisy < 0.2, pc.binary_join_element_wise(' ', line_sku, ' ', ''), line_sku)
+            line_sku = pc.if_else(rng.random(size) < 0.02, pc.binary_join_element_wise('NEW-', line_sku, ''), line_sku)
+            line_color = pc.take(color, lines)
+            line_color = pc.if_else(noisy > 0.7, pc.binary_join_element_wise(pc.utf8_lower(line_color), ' ', ''), line_color)
+            yield {
+                'SKU': line_sku,
+                'Color': line_color,
+                'Size': pc.take(size_, lines),
+                'Total Quantity': rng.integers(1, 5, size),
+            }
+
+    return _write(path, PICKLIST_COLUMNS, [''] * len(PICKLIST_COLUMNS), chunks())
+
+
+def write_export(export_dir, rows, seed=0):
+    """
+    A full export directory (the layout `python -m formulaman` reads) with
+    `rows` lines per report: one Flipkart report, Meesho sales plus returns
+    (a tenth as many), one picklist and its mapping sheet. The Flipkart report
+    is also written as xlsx/flipkart.xlsx, outside the folders the CLI reads.
+    """
+    join = os.path.join
+    mapping_keys = min(max(rows // 5, 100), 200_000)
+    flipkart_report(join(export_dir, 'flipkart', 'flipkart.csv'), rows, seed)
+    flipkart_report(join(export_dir, 'xlsx', 'flipkart.xlsx'), rows, seed, writer=_write_xlsx)
+    meesho_report(join(export_dir, 'meesho', 'sales', 'sales.csv'), rows, seed + 1)
+    meesho_report(join(export_dir, 'meesho', 'returns', 'returns.csv'), max(rows // 10, 1), seed + 2,
+                  returns=True)
+    mapping_sheet(join(export_dir, 'mapping', 'mapping.csv'), mapping_keys, seed + 3)
+    picklist(join(export_dir, 'picklists', 'picklist.csv'), rows, mapping_keys, seed + 3)
+    return export_dir
@@ -0,0 +1,238 @@
+"""
+Times and memory-profiles the engine on synthetic exports; keeps a JSON history.
+
+For each scale, a seeded export directory (bench.generators.write_export) is
+generated once, its files are parsed up front, and every stage is timed on
+those inputs (best of --repeat runs). Peak memory is measured in one extra run
+under tracemalloc (Python and numpy allocations; Arrow's own buffers are not
+traced). Each run is appended to the history file and compared with the last
+run there of the same scale and seed: a stage more than --tolerance slower or
+heavier is a regression and the exit status is 1. Usage::
+
+    python -m bench [--rows 10000 100000 1000000] [--repeat 3] [--history bench/history.json]
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from formulaman.channels import CHANNELS, channel_schema
+from formulaman.gstr1 import (
+    build_flipkart_cube, meesho_master_frame, merge_master_gstr1, process_flipkart_data,
+    process_meesho_data, summarize_flipkart,
+)
+from formulaman.loaders import load_data
+from formulaman.picklist import consolidate_picklists
+
+from .generators import GENERATOR_VERSION, write_export
+
+SCALES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_SCALES = [10_000, 100_000]
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.json')
+
+STAGES = ['load_data', 'load_data_xlsx', 'process_flipkart_data', 'process_meesho_data',
+          'consolidate_picklists', 'master_merge']
+
+# Changes smaller than these are noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.02
+MIN_REGRESSION_MB = 1.0
+
+
+def export_dir(data_dir, rows, seed):
+    """The generated export for (rows, seed), written on first use."""
+    path = os.path.join(data_dir, f"rows{rows}-seed{seed}-g{GENERATOR_VERSION}")
+    marker = os.path.join(path, '.complete')
+    if not os.path.exists(marker):
+        write_export(path, rows, seed)
+        open(marker, 'w').close()
+    return path
+
+
+def stage_inputs(path):
+    """{stage: zero-argument callable} over the files of one export directory."""
+    join = os.path.join
+    flipkart_file = join(path, 'flipkart', 'flipkart.csv')
+    flipkart_schema = channel_schema(CHANNELS['flipkart'])
+    meesho_schema = channel_schema(CHANNELS['meesho'])
+
+    # Inputs are parsed once here; only load_data itself is timed on the file
+    flipkart = load_data(flipkart_file, schema=flipkart_schema)
+    sales = load_data(join(path, 'meesho', 'sales', 'sales.csv'), schema=meesho_schema)
+    returns = load_data(join(path, 'meesho', 'returns', 'returns.csv'), schema=meesho_schema)
+    picklists = [('picklist.csv', load_data(join(path, 'picklists', 'picklist.csv')))]
+    mapping = load_data(join(path, 'mapping', 'mapping.csv'))
+
+    flipkart_summary = summarize_flipkart(*build_flipkart_cube(flipkart))
+    channel_frames = {
+        'Flipkart': flipkart_summary[['State', 'Taxable', 'IGST', 'CGST', 'SGST']],
+        'Meesho': meesho_master_frame(process_meesho_data(sales, returns)),
+    }
+
+    return {
+        'load_data': lambda: load_data(flipkart_file, schema=flipkart_schema),
+        'load_data_xlsx': lambda: load_data(join(path, 'xlsx', 'flipkart.xlsx'), schema=flipkart_schema),
+        'process_flipkart_data': lambda: process_flipkart_data(flipkart),
+        'process_meesho_data': lambda: process_meesho_data(sales, returns),
+        'consolidate_picklists': lambda: consolidate_picklists(picklists, mapping),
+        'master_merge': lambda: merge_master_gstr1(channel_frames),
+    }
+
+
+def measure(func, repeat):
+    """(best wall time in seconds, peak traced MB) of `func`."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak / 2**20
+
+
+def git_commit():
+    """Short hash of the checked-out commit (None outside a git checkout)."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def write_history(path, history):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(history, fh, indent=1)
+    os.replace(tmp_path, path)
+
+
+def previous_results(history, seed):
+    """{(stage, rows): result} of the latest earlier run of each stage and scale."""
+    previous = {}
+    for run in history:
+        if run.get('seed') == seed:
+            for result in run['results']:
+                previous[(result['stage'], result['rows'])] = result
+    return previous
+
+
+def compare(results, previous, tolerance):
+    """Results as a table with the previous run's figures; plus the regressions."""
+    rows = []
+    regressions = []
+    for result in results:
+        prev = previous.get((result['stage'], result['rows']))
+        slower = heavier = False
+        if prev is not None:
+            slower = (result['seconds'] > prev['seconds'] * (1 + tolerance)
+                      and result['seconds'] - prev['seconds'] > MIN_REGRESSION_SECONDS)
+            heavier = (result['peak_mb'] > prev['peak_mb'] * (1 + tolerance)
+                       and result['peak_mb'] - prev['peak_mb'] > MIN_REGRESSION_MB)
+        if slower or heavier:
+            regressions.append(result)
+        rows.append({
+            'Stage': result['stage'],
+            'Rows': result['rows'],
+            'Seconds': result['seconds'],
+            'Previous': None if prev is None else prev['seconds'],
+            'Peak MB': result['peak_mb'],
+            'Previous MB': None if prev is None else prev['peak_mb'],
+            'Regression': 'time' if slower else 'memory' if heavier else '',
+        })
+    return pd.DataFrame(rows), regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='bench',
+        description="Benchmark the formulaman engine on synthetic marketplace exports.",
+    )
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help=f"lines per report, e.g. {' '.join(map(str, SCALES))} "
+                             "(default: %(default)s)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                        help="stages to run (default: all)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timed runs per stage; the best one counts (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="generator seed (default: %(default)s)")
+    parser.add_argument('--data-dir',
+                        help="keep generated exports here and reuse them (default: a temporary directory)")
+    parser.add_argument('--history', default=DEFAULT_HISTORY,
+                        help="JSON file the results are appended to (default: %(default)s)")
+    parser.add_argument('--no-history', action='store_true',
+                        help="compare with the history but do not record this run")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="slow-down / memory growth over the previous run that counts "
+                             "as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='formulaman-bench-') as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        results = []
+        for rows in args.rows:
+            print(f"Generating {rows:,} rows...", file=sys.stderr)
+            stages = stage_inputs(export_dir(data_dir, rows, args.seed))
+            for stage in args.stages:
+                seconds, peak_mb = measure(stages[stage], args.repeat)
+                results.append({
+                    'stage': stage, 'rows': rows,
+                    'seconds': round(seconds, 6), 'peak_mb': round(peak_mb, 3),
+                })
+                print(f"  {stage}: {seconds:.3f} s, {peak_mb:.1f} MB", file=sys.stderr)
+            del stages
+            gc.collect()
+
+    history = read_history(args.history)
+    table, regressions = compare(results, previous_results(history, args.seed), args.tolerance)
+    print(table.to_string(index=False))
+
+    if not args.no_history:
+        history.append({
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'pyarrow': pa.__version__,
+            'machine': platform.platform(),
+            'cpus': os.cpu_count(),
+            'results': results,
+        })
+        write_history(args.history, history)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%} against the previous run",
+              file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,45 @@
+"""
+Formula Man processing engine.
+
+Pure pandas code shared by the Streamlit dashboard (``app.py``) and the
+command-line batch mode (``python -m formulaman``). Nothing in this package
+imports streamlit or plotly.
+"""
+from .cache import FrameCache, content_hash, upload_key  # noqa: F401
+from .channels import (  # noqa: F401
+    CHANNELS, SIGN_AMOUNT, SIGN_FILE, SPLIT_HOME_STATE, SPLIT_REPORTED, Channel,
+    channel_schema, channel_tag, required_columns, template_content,
+)
+from .constants import *  # noqa: F401,F403
+from .exports import (  # noqa: F401
+    COMPRESSIONS, EXPORT_CHUNK_ROWS, MIME_TYPES, csv_export, export_name, write_csv, write_export,
+    zip_bundle,
+)
+from .gstr1 import (  # noqa: F401
+    AGGREGATE_VERSION, CUBE_KEYS, CUBE_VALUES, SUMMARY_COLS, MasterMerge, aggregate_flipkart,
+    aggregate_lines, aggregate_meesho, build_flipkart_cube, channel_cube, channel_dataset_key,
+    channel_gstins, channel_lines, channel_master_frame, channel_partitions, combine_meesho,
+    compose_channel, compose_flipkart, flipkart_dataset_key, flipkart_gstins, flipkart_partitions,
+    gstin_index, gstin_reports, meesho_dataset_key, meesho_master_frame, meesho_partitions,
+    merge_master_by_gstin, merge_master_gstr1, process_flipkart_data, process_meesho_data,
+    stream_channel_data, stream_flipkart_data, summarize_channel, summarize_flipkart,
+    summarize_gstins,
+)
+from .jobs import (  # noqa: F401
+    CANCELLED, DONE, FAILED, QUEUED, RUNNING, Job, JobManager, JobProgress,
+)
+from .loaders import (  # noqa: F401
+    PARSER_VERSION, FileLoadError, FileResult, apply_schema, consolidate_files,
+    consolidate_groups, detach_files, detect_encoding, file_size, iter_chunks, load_data,
+    load_many, load_summary, map_files, parse_file, schema_tag,
+)
+from .mapping import MappingStore, MappingVersion  # noqa: F401
+from .metrics import STAGES, Metrics, Run, RunCancelled, count, stage  # noqa: F401
+from .money import ROUNDING_MODES, from_paise, split_paise, to_paise  # noqa: F401
+from .picklist import (  # noqa: F401
+    MappingIndex, PicklistConsolidator, PicklistResult, consolidate_picklists,
+    normalize_keys, prepare_mapping, unmapped_quantity,
+)
+from .states import normalize_states  # noqa: F401
+from .store import DatasetStore, frame_nbytes  # noqa: F401
+from .taxsplit import DEFAULT_HOME_STATE, TaxSplit, standard_state_name  # noqa: F401
@@ -0,0 +1,151 @@
+"""Persistent on-disk cache of parsed uploads (Feather files, LRU size limit)."""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # cache silently disabled without pyarrow
+    pa = feather = None
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'FORMULAMAN_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'formulaman')
+)
+DEFAULT_CACHE_MAX_MB = int(os.environ.get('FORMULAMAN_CACHE_MAX_MB', '2048'))
+
+HASH_BLOCK = 1 << 20
+
+# Digests of uploads that carry a unique `file_id` (Streamlit's UploadedFile),
+# so the same upload is hashed once, not on every rerun
+UPLOAD_DIGESTS_MAX = 1024
+_upload_digests = OrderedDict()
+_upload_digests_lock = threading.Lock()
+
+
+def content_hash(file):
+    """
+    Hex digest of an uploaded file's (or path's) bytes.
+
+    Uploads with a `file_id` are hashed once; later calls are a dictionary
+    lookup, so reruns cost nothing however large the file.
+    """
+    file_id = getattr(file, 'file_id', None)
+    if file_id is None:
+        return _hash_bytes(file)
+    with _upload_digests_lock:
+        digest = _upload_digests.get(file_id)
+        if digest is not None:
+            _upload_digests.move_to_end(file_id)
+            return digest
+    digest = _hash_bytes(file)
+    with _upload_digests_lock:
+        _upload_digests[file_id] = digest
+        while len(_upload_digests) > UPLOAD_DIGESTS_MAX:
+            _upload_digests.popitem(last=False)
+    return digest
+
+
+def _hash_bytes(file):
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as fh:
+            for block in iter(lambda: fh.read(HASH_BLOCK), b''):
+                digest.update(block)
+    elif hasattr(file, 'getbuffer'):
+        digest.update(file.getbuffer())
+    else:
+        file.seek(0)
+        for block in iter(lambda: file.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def upload_key(*file_lists):
+    """Hash identifying a set of uploads by content (file order and grouping matter)."""
+    digest = hashlib.blake2b(digest_size=20)
+    for file_list in file_lists:
+        for f in file_list:
+            if f is not None:
+                digest.update(content_hash(f).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+class FrameCache:
+    """
+    Stores DataFrames as Feather files named by key, evicting the least recently
+    used files once the directory grows past `max_mb`.
+
+    Reads are memory-mapped. Writes go through a temp file and an atomic rename,
+    so several worker processes can share one directory.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_mb=DEFAULT_CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+
+    @property
+    def enabled(self):
+        return feather is not None and self.max_bytes > 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.feather")
+
+    def get(self, key):
+        """Cached DataFrame for `key`, or None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            table = feather.read_table(path, memory_map=True)
+            os.utime(path)  # mark as recently used
+        except (OSError, pa.ArrowException):
+            return None
+        return table.to_pandas()
+
+    def put(self, key, df):
+        """Stores `df` under `key`; frames Arrow cannot represent are skipped."""
+        if not self.enabled or df is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            feather.write_feather(df, tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, ValueError, TypeError, pa.ArrowException):
+            # e.g. object columns mixing numbers and text
+            os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits in max_mb."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.feather'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Removes every cached entry."""
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(('.feather', '.tmp')):
+                    os.remove(entry.path)
@@ -0,0 +1,125 @@
+"""
+Marketplace adapters: what each channel's GST sales report looks like.
+
+A Channel only declares its report's columns, how returns are signed and how
+the tax is split; gstr1 runs every channel through the same load -> normalize
+-> aggregate pipeline, so each one gets caching, streaming and parallel files
+without code of its own. A new marketplace is one more CHANNELS entry.
+"""
+import hashlib
+from collections import namedtuple
+
+from .constants import (
+    COL_BILLING_STATE, COL_CGST, COL_GSTIN, COL_IGST, COL_ITEM_QUANTITY,
+    COL_M_GSTIN, COL_M_QTY, COL_M_STATE, COL_M_TAX_AMOUNT, COL_M_TAX_VALUE, COL_SGST,
+    COL_TAXABLE_VALUE, FLIPKART_TEMPLATE_CONTENT,
+)
+
+# Sign rules: how returns show up
+SIGN_AMOUNT = 'amount'  # returns are lines with a negative taxable value (quantity is made negative)
+SIGN_FILE = 'file'      # returns come as separate reports with positive amounts (all negated)
+
+# Tax-split rules
+SPLIT_HOME_STATE = 'home-state'  # re-split each line's total tax by the seller's home state (TaxSplit)
+SPLIT_REPORTED = 'reported'      # keep the report's IGST; the rest of the tax is CGST + SGST
+
+# `columns` maps the canonical fields to the report's headers: 'state'
+# (customer's state), 'qty' and 'taxable' are required, 'gstin' (seller
+# GSTIN) is used when present, 'igst' is needed by SPLIT_REPORTED. `tax`
+# lists the tax columns summed into each line's total tax.
+Channel = namedtuple('Channel', ['key', 'name', 'columns', 'tax', 'sign', 'split', 'template'])
+
+
+def channel_schema(channel):
+    """
+    The ingestion schema (see loaders.parse_file) of a channel's columns:
+    GSTIN and state as 'category' (low-cardinality text kept as integer
+    codes), quantities and amounts as 'number'. Amounts stay float64, since
+    float32 keeps ~7 significant digits, too few for a lakh-rupee invoice.
+    """
+    schema = {}
+    for field, col in channel.columns.items():
+        schema[col] = 'category' if field in ('gstin', 'state') else 'number'
+    for col in channel.tax:
+        schema[col] = 'number'
+    return schema
+
+
+def channel_tag(channel):
+    """Short stable id of an adapter's rules, for cache keys."""
+    rules = repr((sorted(channel.columns.items()), channel.tax, channel.sign, channel.split))
+    return hashlib.blake2b(rules.encode(), digest_size=4).hexdigest()
+
+
+def required_columns(channel):
+    """Report columns a channel cannot do without (the seller GSTIN is optional)."""
+    return [col for field, col in channel.columns.items() if field != 'gstin'] + [
+        col for col in channel.tax if col not in channel.columns.values()
+    ]
+
+
+def template_content(channel):
+    """Upload template: the report header, then the row of 'Mandatory' flags the loaders skip."""
+    if channel.template is not None:
+        return channel.template
+    header = list(dict.fromkeys(list(channel.columns.values()) + list(channel.tax)))
+    required = set(required_columns(channel))
+    flags = ['Mandatory' if col in required else '' for col in header]
+    return ','.join(header) + '\n' + ','.join(flags)
+
+
+def _channel(key, name, columns, tax, sign=SIGN_AMOUNT, split=SPLIT_HOME_STATE, template=None):
+    return Channel(key, name, columns, tuple(tax), sign, split, template)
+
+
+FLIPKART = _channel(
+    'flipkart', 'Flipkart',
+    {'gstin': COL_GSTIN, 'state': COL_BILLING_STATE, 'qty': COL_ITEM_QUANTITY,
+     'taxable': COL_TAXABLE_VALUE},
+    [COL_IGST, COL_CGST, COL_SGST],
+    template=FLIPKART_TEMPLATE_CONTENT,
+)
+
+MEESHO = _channel(
+    'meesho', 'Meesho',
+    {'gstin': COL_M_GSTIN, 'state': COL_M_STATE, 'qty': COL_M_QTY, 'taxable': COL_M_TAX_VALUE},
+    [COL_M_TAX_AMOUNT],
+    sign=SIGN_FILE,
+)
+
+# Amazon's Merchant Tax Report: refunds are negative lines, and Amazon has
+# already split the tax by the ship-from registration of each line
+AMAZON = _channel(
+    'amazon', 'Amazon',
+    {'gstin': 'Seller Gstin', 'state': 'Ship To State', 'qty': 'Quantity',
+     'taxable': 'Tax Exclusive Gross', 'igst': 'Igst Tax'},
+    ['Igst Tax', 'Cgst Tax', 'Sgst Tax', 'Utgst Tax'],
+    split=SPLIT_REPORTED,
+)
+
+# Myntra and Ajio report forward and return shipments separately
+MYNTRA = _channel(
+    'myntra', 'Myntra',
+    {'gstin': 'seller_gstin', 'state': 'customer_delivery_state', 'qty': 'quantity',
+     'taxable': 'taxable_amount'},
+    ['igst_amount', 'cgst_amount', 'sgst_amount'],
+    sign=SIGN_FILE,
+)
+
+JIOMART = _channel(
+    'jiomart', 'JioMart',
+    {'gstin': 'Seller GSTIN', 'state': 'Customer Billing State', 'qty': 'Quantity',
+     'taxable': 'Taxable Value'},
+    ['IGST Amount', 'CGST Amount', 'SGST Amount'],
+)
+
+AJIO = _channel(
+    'ajio', 'Ajio',
+    {'gstin': 'Seller GSTIN', 'state': 'Ship To State', 'qty': 'Quantity',
+     'taxable': 'Taxable Value'},
+    ['IGST Amount', 'CGST Amount', 'SGST/UTGST Amount'],
+    sign=SIGN_FILE,
+)
+
+# In the dashboard's tab order
+CHANNELS = {c.key: c for c in (AMAZON, FLIPKART, MEESHO, MYNTRA, JIOMART, AJIO)}
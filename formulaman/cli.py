@@ -0,0 +1,254 @@
+"""
+Command-line batch mode: build Master GSTR-1 and Master Picklist CSVs without the UI.
+
+Each export directory is laid out as::
+
+    <export_dir>/
+        flipkart/          Flipkart sales reports (one per month)
+        meesho/sales/      Meesho sales reports
+        meesho/returns/    Meesho returns reports
+        amazon/, jiomart/  Amazon / JioMart reports (returns are negative lines)
+        myntra/, ajio/     sales/ and returns/ reports, as for Meesho
+        picklists/         Picklists (SKU | Color | Size | Total Quantity)
+        mapping/           Mapping sheet (SKU | Size | Color | Master SKU)
+
+Missing folders are skipped. Picklist keys with no Master SKU are also listed
+in Unmapped_Picklist_SKUs.csv. With --per-gstin, every seller GSTIN also gets
+gstins/<GSTIN>/ with its Master GSTR-1 and one summary per channel, all from
+one aggregation per channel, indexed in GSTIN_Index.csv. Usage::
+
+    python -m formulaman EXPORT_DIR [EXPORT_DIR ...] [--out-dir DIR] [--frequency Quarterly] [--stream]
+                        [--rounding half-up] [--home-state Haryana] [--gstin-state GSTIN=STATE]
+                        [--metrics-file PATH] [--compression gzip|zip] [--per-gstin]
+"""
+import argparse
+import os
+import sys
+
+from .cache import FrameCache, content_hash
+from .channels import CHANNELS, SIGN_FILE
+from .exports import export_name, write_export
+from .gstr1 import (
+    STREAM_CHUNKSIZE, channel_master_frame, channel_partitions, compose_channel, gstin_reports,
+    merge_master_gstr1, stream_channel_data,
+)
+from .loaders import FileLoadError, load_many
+from .mapping import MappingStore
+from .metrics import DEFAULT_TEXTFILE, Metrics
+from .money import ROUNDING_MODES
+from .picklist import consolidate_picklists
+from .taxsplit import DEFAULT_HOME_STATE, TaxSplit
+
+EXPORT_EXTENSIONS = ('.csv', '.xlsx')
+
+
+def list_exports(folder):
+    """Sorted CSV/Excel files in `folder` (empty if it does not exist)."""
+    if not os.path.isdir(folder):
+        return []
+    return [
+        os.path.join(folder, name) for name in sorted(os.listdir(folder))
+        if name.lower().endswith(EXPORT_EXTENSIONS)
+    ]
+
+
+def write_report(df, out_dir, file_name, compression=None):
+    """Writes `df` to `out_dir` as the CSV `file_name` (gzip / zip compressed if asked); returns the path."""
+    path = os.path.join(out_dir, export_name(file_name, compression))
+    with open(path, 'wb') as fh:
+        write_export(df, fh, file_name, compression)
+    return path
+
+
+def build_channel_cubes(export_dir, stream=False, chunksize=STREAM_CHUNKSIZE, cache=None,
+                        rounding=None, tax_split=None):
+    """
+    Processes every channel found in `export_dir`: {channel name: (cube, state map)}.
+
+    `rounding` ('half-up' / 'half-even') switches to exact integer-paise sums;
+    `tax_split` (a TaxSplit) sets the sellers' home states.
+    """
+    cubes = {}
+    for channel in CHANNELS.values():
+        # Channels with separate returns reports keep them in returns/ (sales in sales/)
+        folder = os.path.join(export_dir, channel.key)
+        if channel.sign == SIGN_FILE:
+            files = list_exports(os.path.join(folder, 'sales'))
+            returns_files = list_exports(os.path.join(folder, 'returns'))
+        else:
+            files, returns_files = list_exports(folder), []
+        if not files and not returns_files:
+            continue
+        if stream:
+            cube, state_map = stream_channel_data(channel, files, returns_files, chunksize, rounding=rounding,
+                                                  tax_split=tax_split)
+        else:
+            cube, state_map = compose_channel(channel_partitions(
+                channel, files, returns_files, cache=cache, rounding=rounding, tax_split=tax_split
+            ))
+        if cube is not None:
+            cubes[channel.name] = (cube, state_map)
+    return cubes
+
+
+def merge_channel_cubes(cubes, rounding=None):
+    """The Master GSTR-1 table of build_channel_cubes' result (None if it is empty)."""
+    return merge_master_gstr1(
+        {name: channel_master_frame(cube, state_map) for name, (cube, state_map) in cubes.items()}, rounding
+    )
+
+
+def build_master_gstr1(export_dir, stream=False, chunksize=STREAM_CHUNKSIZE, cache=None,
+                       rounding=None, tax_split=None):
+    """Processes every channel found in `export_dir` into the Master GSTR-1 table (see build_channel_cubes)."""
+    cubes = build_channel_cubes(export_dir, stream, chunksize, cache, rounding, tax_split)
+    return merge_channel_cubes(cubes, rounding)
+
+
+def write_gstin_reports(cubes, out_dir, frequency, rounding=None, compression=None):
+    """
+    Writes every seller GSTIN's Master GSTR-1 and channel summaries under
+    `out_dir`/gstins/<GSTIN>/, plus GSTIN_Index.csv; returns the paths written.
+    """
+    written = []
+    for file_name, df in gstin_reports(cubes, frequency, rounding):
+        if file_name == 'GSTIN_Index.csv':
+            df['File'] = [export_name(name, compression) for name in df['File']]
+        folder = os.path.join(out_dir, os.path.dirname(file_name))
+        os.makedirs(folder, exist_ok=True)
+        written.append(write_report(df, folder, os.path.basename(file_name), compression))
+    return written
+
+
+def build_master_picklist(export_dir, cache=None, mappings=None):
+    """
+    Consolidates the picklists in `export_dir`; returns a PicklistResult (or None).
+
+    With a MappingStore, the export's mapping sheet (if any, and if it changed)
+    is saved as a new version and the saved mapping is used.
+    """
+    picklist_files = list_exports(os.path.join(export_dir, 'picklists'))
+    mapping_files = list_exports(os.path.join(export_dir, 'mapping'))[:1]
+    if mappings is not None:
+        current = mappings.current()
+        mapping_hash = content_hash(mapping_files[0]) if mapping_files else None
+        if current is not None and mapping_hash in (None, current.content_hash):
+            mapping_files = []
+        elif current is None and not mapping_files:
+            return None
+    if not picklist_files or (mappings is None and not mapping_files):
+        return None
+
+    # Picklists and the mapping sheet are parsed together in parallel
+    results = load_many(picklist_files + mapping_files, cache=cache)
+    failed = [r for r in results if r.error is not None]
+    if failed:
+        raise FileLoadError(failed)
+    picklists = [(r.name, r.value) for r in results[:len(picklist_files)]]
+    if mappings is None:
+        return consolidate_picklists(picklists, results[-1].value)
+    if mapping_files:
+        mappings.update(results[-1].value, mapping_hash)
+    return consolidate_picklists(picklists, mappings.index())
+
+
+def run(export_dir, out_dir, frequency, stream=False, chunksize=STREAM_CHUNKSIZE, cache=None,
+        mappings=None, rounding=None, metrics=None, tax_split=None, compression=None, per_gstin=False):
+    """
+    Writes the master CSVs for one export directory; returns the paths written.
+
+    Each pipeline is recorded as a 'gstr1' / 'picklist' run of `metrics`;
+    with `compression` ('gzip' / 'zip') each CSV is written compressed, and
+    `per_gstin` adds the reports of write_gstin_reports.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if metrics is None:
+        metrics = Metrics(textfile=None)
+    written = []
+
+    with metrics.run('gstr1'):
+        cubes = build_channel_cubes(export_dir, stream, chunksize, cache, rounding, tax_split)
+        final_master = merge_channel_cubes(cubes, rounding)
+        if final_master is not None:
+            written.append(write_report(final_master, out_dir, f"Master_GSTR1_{frequency}.csv", compression))
+        if per_gstin and cubes:
+            written += write_gstin_reports(cubes, out_dir, frequency, rounding, compression)
+
+    with metrics.run('picklist'):
+        picklist = build_master_picklist(export_dir, cache, mappings)
+        if picklist is not None:
+            for idx, name, missing in picklist.skipped:
+                print(f"Skipping picklist {idx+1} ({name}): Missing columns {missing}", file=sys.stderr)
+            written.append(write_report(picklist.output, out_dir, "Master_Consolidated_Picklist.csv", compression))
+            if len(picklist.unmapped):
+                written.append(write_report(picklist.unmapped, out_dir, "Unmapped_Picklist_SKUs.csv", compression))
+
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='formulaman',
+        description="Build Master GSTR-1 and Master Picklist CSVs from marketplace exports.",
+    )
+    parser.add_argument('export_dirs', nargs='+', metavar='EXPORT_DIR',
+                        help="directory of marketplace exports (see module docs for layout)")
+    parser.add_argument('--out-dir',
+                        help="where to write the CSVs (default: each EXPORT_DIR)")
+    parser.add_argument('--frequency', choices=['Monthly', 'Quarterly'], default='Monthly',
+                        help="filing frequency used in the GSTR-1 file name")
+    parser.add_argument('--stream', action='store_true',
+                        help="read marketplace reports in chunks (flat memory for very large files)")
+    parser.add_argument('--chunksize', type=int, default=STREAM_CHUNKSIZE,
+                        help="rows per chunk in --stream mode (default: %(default)s)")
+    parser.add_argument('--cache-dir',
+                        help="keep parsed uploads here (Feather) so re-runs skip parsing")
+    parser.add_argument('--cache-max-mb', type=int, default=2048,
+                        help="size limit of --cache-dir before old entries are evicted")
+    parser.add_argument('--mapping-db',
+                        help="saved SKU mapping (SQLite): updated from mapping/ when that sheet "
+                             "changed, used when an export has no mapping/ folder")
+    parser.add_argument('--rounding', choices=ROUNDING_MODES,
+                        help="sum taxes exactly in integer paise, rounding each line half-up "
+                             "(GST invoice rule) or half-even (default: float sums)")
+    parser.add_argument('--home-state', default=DEFAULT_HOME_STATE,
+                        help="seller home state for lines without a seller GSTIN (default: %(default)s); "
+                             "otherwise it is the state of the GSTIN's first two digits")
+    parser.add_argument('--gstin-state', action='append', default=[], metavar='GSTIN=STATE',
+                        help="home state of one seller GSTIN, overriding its state code (repeatable)")
+    parser.add_argument('--metrics-file', default=DEFAULT_TEXTFILE,
+                        help="write stage timings, rows, bytes read and peak memory here in the "
+                             "Prometheus text format (default: $FORMULAMAN_METRICS_FILE, if set)")
+    parser.add_argument('--compression', choices=['gzip', 'zip'],
+                        help="write each CSV compressed (.csv.gz, or a .zip holding the .csv)")
+    parser.add_argument('--per-gstin', action='store_true',
+                        help="also write every seller GSTIN's Master GSTR-1 and channel summaries "
+                             "(gstins/<GSTIN>/) and GSTIN_Index.csv")
+    args = parser.parse_args(argv)
+
+    cache = FrameCache(args.cache_dir, args.cache_max_mb) if args.cache_dir else None
+    mappings = MappingStore(args.mapping_db) if args.mapping_db else None
+    metrics = Metrics(textfile=args.metrics_file)
+    try:
+        home_states = dict(item.split('=', 1) for item in args.gstin_state)
+    except ValueError:
+        parser.error("--gstin-state expects GSTIN=STATE")
+    tax_split = TaxSplit(args.home_state, home_states)
+
+    status = 0
+    for export_dir in args.export_dirs:
+        out_dir = args.out_dir or export_dir
+        if args.out_dir and len(args.export_dirs) > 1:
+            out_dir = os.path.join(args.out_dir, os.path.basename(os.path.normpath(export_dir)))
+        try:
+            written = run(export_dir, out_dir, args.frequency, args.stream, args.chunksize, cache, mappings,
+                          args.rounding, metrics, tax_split, args.compression, args.per_gstin)
+        except Exception as e:
+            print(f"{export_dir}: Error: {e}", file=sys.stderr)
+            status = 1
+            continue
+        if not written:
+            print(f"{export_dir}: no marketplace exports found", file=sys.stderr)
+        for path in written:
+            print(path)
+    return status
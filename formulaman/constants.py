@@ -0,0 +1,117 @@
+"""Column names, templates and lookup tables shared by the UI and the engine."""
+
+# --- FLIPKART SALES REPORT COLUMNS ---
+COL_GSTIN = 'Seller GSTIN'
+COL_TAXABLE_VALUE = 'Taxable Value (Final Invoice Amount -Taxes)'
+COL_ITEM_QUANTITY = 'Item Quantity'
+COL_IGST = 'IGST Amount'
+COL_CGST = 'CGST Amount'
+COL_SGST = 'SGST Amount (Or UTGST as applicable)'
+COL_BILLING_STATE = "Customer's Billing State"
+
+FLIPKART_TEMPLATE_CONTENT = """Seller GSTIN,Order ID,Order Item ID,Product Title/Description,FSN,SKU,HSN Code,Event Type,Event Sub Type,Order Type,Fulfilment Type,Order Date,Order Approval Date,Item Quantity,Order Shipped From (State),Warehouse ID,Price before discount,Total Discount,Seller Share,Bank Offer Share,Price after discount (Price before discount-Total discount),Shipping Charges,Final Invoice Amount (Price after discount+Shipping Charges),Type of tax,Taxable Value (Final Invoice Amount -Taxes),CST Rate,CST Amount,VAT Rate,VAT Amount,Luxury Cess Rate,Luxury Cess Amount,IGST Rate,IGST Amount,CGST Rate,CGST Amount,SGST Rate (or UTGST as applicable),SGST Amount (Or UTGST as applicable),TCS IGST Rate,TCS IGST Amount,TCS CGST Rate,TCS CGST Amount,TCS SGST Rate,TCS SGST Amount,Total TCS Deducted,Buyer Invoice ID,Buyer Invoice Date,Buyer Invoice Amount,Customer's Billing Pincode,Customer's Billing State,Customer's Delivery Pincode,Customer's Delivery State,Usual Price,Is Shopsy Order?,TDS Rate,TDS Amount,IRN,Business Name,Business GST Number,Beneficiary Name,IMEI
+Mandatory,,,,,,,,,,,,,Mandatory,,,,,,,,,,,Mandatory,,,,,,,Mandatory,Mandatory,Mandatory,Mandatory,Mandatory,Mandatory,,,,,,,,,,,,Mandatory,,,,,,,,,,,"""
+
+# --- MEESHO GST REPORT COLUMNS ---
+COL_M_QTY = 'quantity'
+COL_M_TAX_VALUE = 'total_taxable_sale_value'
+COL_M_TAX_AMOUNT = 'tax_amount'
+COL_M_STATE = 'end_customer_state_new'
+COL_M_GSTIN = 'gstin'  # supplier (seller) GSTIN
+
+# --- MASTER MERGE (GSTR-1) COLUMNS ---
+MASTER_COLS = ['State', 'Taxable', 'IGST', 'CGST', 'SGST']
+
+# --- PICKLIST / MAPPING SHEET COLUMNS ---
+PL_COLS = ['SKU', 'Color', 'Size', 'Total Quantity']
+MAP_COLS = ['SKU', 'Size', 'Color', 'Master SKU']
+UNMAPPED_SKU = 'UNMAPPED_ITEM'
+
+# --- STANDARD STATE MAPPING DICTIONARY ---
+INDIAN_STATE_MAPPING = {
+    "ANDHRA PRADESH": "Andhra Pradesh",
+    "ARUNACHAL PRADESH": "Arunachal Pradesh",
+    "ASSAM": "Assam",
+    "BIHAR": "Bihar",
+    "CHHATTISGARH": "Chhattisgarh",
+    "GOA": "Goa",
+    "GUJARAT": "Gujarat",
+    "HARYANA": "Haryana",
+    "HIMACHAL PRADESH": "Himachal Pradesh",
+    "JAMMU & KASHMIR": "Jammu & Kashmir",
+    "JAMMU AND KASHMIR": "Jammu & Kashmir",
+    "JHARKHAND": "Jharkhand",
+    "KARNATAKA": "Karnataka",
+    "KERALA": "Kerala",
+    "MADHYA PRADESH": "Madhya Pradesh",
+    "MAHARASHTRA": "Maharashtra",
+    "MANIPUR": "Manipur",
+    "MEGHALAYA": "Meghalaya",
+    "MIZORAM": "Mizoram",
+    "NAGALAND": "Nagaland",
+    "ODISHA": "Odisha",
+    "ORISSA": "Odisha",
+    "PUNJAB": "Punjab",
+    "RAJASTHAN": "Rajasthan",
+    "SIKKIM": "Sikkim",
+    "TAMIL NADU": "Tamil Nadu",
+    "TAMILNADU": "Tamil Nadu",
+    "TELANGANA": "Telangana",
+    "TRIPURA": "Tripura",
+    "UTTAR PRADESH": "Uttar Pradesh",
+    "UTTARAKHAND": "Uttarakhand",
+    "WEST BENGAL": "West Bengal",
+    "ANDAMAN & NICOBAR ISLANDS": "Andaman & Nicobar Islands",
+    "ANDAMAN AND NICOBAR ISLANDS": "Andaman & Nicobar Islands",
+    "CHANDIGARH": "Chandigarh",
+    "DADRA & NAGAR HAVELI": "Dadra & Nagar Haveli",
+    "DAMAN & DIU": "Daman & Diu",
+    "DELHI": "Delhi",
+    "NEW DELHI": "Delhi",
+    "LADAKH": "Ladakh",
+    "LAKSHADWEEP": "Lakshadweep",
+    "PUDUCHERRY": "Puducherry",
+    "PONDICHERRY": "Puducherry"
+}
+
+# --- GST STATE CODES (first two digits of a GSTIN) ---
+GST_STATE_CODES = {
+    '01': "Jammu & Kashmir",
+    '02': "Himachal Pradesh",
+    '03': "Punjab",
+    '04': "Chandigarh",
+    '05': "Uttarakhand",
+    '06': "Haryana",
+    '07': "Delhi",
+    '08': "Rajasthan",
+    '09': "Uttar Pradesh",
+    '10': "Bihar",
+    '11': "Sikkim",
+    '12': "Arunachal Pradesh",
+    '13': "Nagaland",
+    '14': "Manipur",
+    '15': "Mizoram",
+    '16': "Tripura",
+    '17': "Meghalaya",
+    '18': "Assam",
+    '19': "West Bengal",
+    '20': "Jharkhand",
+    '21': "Odisha",
+    '22': "Chhattisgarh",
+    '23': "Madhya Pradesh",
+    '24': "Gujarat",
+    '25': "Daman & Diu",
+    '26': "Dadra & Nagar Haveli",
+    '27': "Maharashtra",
+    '28': "Andhra Pradesh",
+    '29': "Karnataka",
+    '30': "Goa",
+    '31': "Lakshadweep",
+    '32': "Kerala",
+    '33': "Tamil Nadu",
+    '34': "Puducherry",
+    '35': "Andaman & Nicobar Islands",
+    '36': "Telangana",
+    '37': "Andhra Pradesh",
+    '38': "Ladakh",
+}
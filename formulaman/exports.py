@@ -0,0 +1,79 @@
+"""
+Report downloads: CSVs written a chunk of rows at a time, optionally gzip- or
+zip-compressed, and one zip bundle holding several reports.
+
+The CSV text of a report is never held whole: rows go through a text wrapper
+straight into the (compressing) output. The dashboard passes these functions
+to st.download_button as callables, so a report is only written when its
+button is clicked, not on every rerun.
+"""
+import gzip
+import io
+import zipfile
+
+from .metrics import stage
+
+# Rows serialized per to_csv call
+EXPORT_CHUNK_ROWS = 50_000
+
+COMPRESSIONS = (None, 'gzip', 'zip')
+MIME_TYPES = {None: 'text/csv', 'gzip': 'application/gzip', 'zip': 'application/zip'}
+
+
+def write_csv(df, fh, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Writes `df` as CSV (no index, UTF-8) to the binary file `fh`, `chunk_rows` rows at a time."""
+    text = io.TextIOWrapper(fh, encoding='utf-8', newline='', write_through=True)
+    try:
+        if len(df) == 0:
+            df.to_csv(text, index=False)
+        for start in range(0, len(df), chunk_rows):
+            df.iloc[start:start + chunk_rows].to_csv(text, index=False, header=start == 0)
+    finally:
+        text.detach()  # leaves `fh` open for the caller
+
+
+def export_name(file_name, compression=None):
+    """The download name of `file_name` ('report.csv') under `compression`."""
+    if compression == 'gzip':
+        return f"{file_name}.gz"
+    if compression == 'zip':
+        return f"{file_name.rsplit('.', 1)[0]}.zip"
+    return file_name
+
+
+def write_export(df, fh, file_name, compression=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Writes `df` to the binary file `fh` as the CSV `file_name`, compressed as asked."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}; expected one of {COMPRESSIONS}")
+    with stage('export'):
+        if compression == 'gzip':
+            # mtime=0: the same report always compresses to the same bytes
+            with gzip.GzipFile(file_name, 'wb', fileobj=fh, mtime=0) as gz:
+                write_csv(df, gz, chunk_rows)
+        elif compression == 'zip':
+            with zipfile.ZipFile(fh, 'w', zipfile.ZIP_DEFLATED) as zf, zf.open(file_name, 'w') as member:
+                write_csv(df, member, chunk_rows)
+        else:
+            write_csv(df, fh, chunk_rows)
+
+
+def csv_export(df, file_name, compression=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """The bytes of the download `file_name` of `df` (see write_export)."""
+    buffer = io.BytesIO()
+    write_export(df, buffer, file_name, compression, chunk_rows)
+    return buffer.getvalue()
+
+
+def zip_bundle(reports, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    The bytes of one zip holding several CSV reports. `reports` is a list of
+    (file name, DataFrame or a callable returning one); callables are only
+    called while their file is written, so one report is built at a time.
+    """
+    buffer = io.BytesIO()
+    with stage('export'), zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for file_name, report in reports:
+            df = report() if callable(report) else report
+            with zf.open(file_name, 'w') as member:
+                write_csv(df, member, chunk_rows)
+    return buffer.getvalue()
@@ -0,0 +1,621 @@
+"""GSTR-1 state-wise summaries for every marketplace channel, plus the Master Merge."""
+import functools
+
+import numpy as np
+import pandas as pd
+
+from .cache import content_hash, upload_key
+from .channels import (
+    FLIPKART, MEESHO, SIGN_AMOUNT, SPLIT_REPORTED, channel_schema, channel_tag, required_columns,
+)
+from .constants import COL_GSTIN, MASTER_COLS
+from .loaders import PARSER_VERSION, FileLoadError, iter_chunks, load_data, map_files
+from .metrics import count, stage
+from .money import from_paise, split_paise, to_paise
+from .states import normalize_states
+from .taxsplit import TaxSplit
+
+# Rows per chunk in streaming mode (~10 narrow columns, so a few tens of MB)
+STREAM_CHUNKSIZE = 250_000
+
+# Every channel aggregates to one row per (Seller GSTIN, State_Group): its "cube"
+CUBE_KEYS = [COL_GSTIN, 'State_Group']
+CUBE_VALUES = ['Taxable', 'IGST', 'CGST', 'SGST', 'Qty']
+# Canonical line values; 'Intra' (CGST + SGST) is halved only after summing
+LINE_VALUES = ['Taxable', 'IGST', 'Intra', 'Qty']
+
+MEESHO_SUMMARY_VALUES = ['Total_Qty', 'Taxable_Value', 'IGST', 'CGST', 'SGST']
+# Columns of a channel's state-wise summary (summarize_channel)
+SUMMARY_COLS = ['State', 'Taxable', 'IGST', 'CGST', 'SGST', 'Qty']
+# How a missing Seller GSTIN reads once turned into text
+_NO_GSTIN = ('0.0', 'nan', '0')
+
+# Bump when a per-file aggregate changes shape or meaning (drops cached partitions)
+AGGREGATE_VERSION = 3
+
+# Every processor takes `rounding`: None sums rupee floats (rounded to 2 decimals
+# only at the end); a money.ROUNDING_MODES name rounds each line to whole paise
+# and sums int64 paise, so totals are exact. Aggregates come back in rupees
+# either way (in exact mode they are whole paise / 100).
+#
+# They also take `tax_split`, the TaxSplit deciding which lines are intra-state
+# (CGST + SGST) from the seller GSTIN's home state; None uses TaxSplit().
+
+
+# ==========================================
+# CHANNEL PIPELINE
+# ==========================================
+def _signed_numbers(values, negate=False):
+    """
+    A value column as a numpy array of numbers (gaps -> 0), negated for returns.
+
+    The input is only read: the array is the column's own data unless gaps or
+    signs change, in which case it is allocated exactly once.
+    """
+    numbers = pd.to_numeric(values, errors='coerce')
+    if not isinstance(numbers.dtype, np.dtype):  # nullable / Arrow-backed numbers
+        numbers = numbers.astype(np.float64)
+    numbers = numbers.to_numpy()
+    signed = np.negative(numbers) if negate else numbers
+    if signed.dtype.kind == 'f':
+        missing = np.isnan(signed)
+        if missing.any():
+            if signed is numbers:
+                signed = numbers.copy()
+            signed[missing] = 0
+    return signed
+
+
+def _amounts(values, negate=False, rounding=None):
+    """An amount column as _signed_numbers, or (with `rounding`) as int64 paise per line."""
+    if rounding is None:
+        return _signed_numbers(values, negate)
+    paise = to_paise(pd.to_numeric(values, errors='coerce'), rounding)
+    if negate:
+        np.negative(paise, out=paise)
+    return paise
+
+
+def _key_codes(values):
+    """(integer codes, text keys) of a key column; gaps become the key '0'."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # schema columns and normalize_states results: the codes are the keys
+        codes, keys = values.array.codes, values.cat.categories.astype(str)
+    else:
+        codes, keys = pd.factorize(values)
+        keys = pd.Index(keys).astype(str)
+    if not keys.is_unique:  # e.g. 6 and '6'
+        key_of, keys = pd.factorize(keys)
+        codes = np.where(codes >= 0, key_of[codes], -1)
+    missing = codes < 0
+    if missing.any():
+        if '0' not in keys:
+            keys = keys.append(pd.Index(['0']))
+        codes = np.where(missing, keys.get_loc('0'), codes)
+    return codes, keys
+
+
+@stage('normalize')
+def channel_lines(channel, df_raw, returns=False, rounding=None, tax_split=None):
+    """
+    One report of `channel` as canonical lines; returns (lines, state_name_map).
+
+    `lines` holds the CUBE_KEYS as categoricals (missing values as '0') and
+    the signed LINE_VALUES; with `rounding`, amounts are int64 paise. A
+    `returns` report is negated as a whole. The input is not modified or
+    copied: each value column is read once into a numpy array.
+    """
+    missing = [c for c in required_columns(channel) if c not in df_raw.columns]
+    if missing: raise KeyError(f"Missing columns: {missing}")
+    columns = channel.columns
+    seller_gstins = df_raw[columns['gstin']] if columns.get('gstin') in df_raw.columns else None
+
+    # 1. Numbers, signed in the same step; lines with a negative taxable value
+    #    are returns too (SIGN_AMOUNT), so their quantity turns negative
+    qty = _signed_numbers(df_raw[columns['qty']], returns)
+    taxable = _amounts(df_raw[columns['taxable']], returns, rounding)
+    tax = functools.reduce(np.add, [_amounts(df_raw[col], returns, rounding) for col in channel.tax])
+    if channel.sign == SIGN_AMOUNT:
+        returned = taxable < 0
+        if returned.any():
+            qty = np.where(returned, -np.abs(qty), qty)
+
+    # 2. Standardize State Names (shared normalizer): 'State_Group' is the clean
+    #    upper-case key, state_name_map gives its full standard name
+    state_group, state_name, state_name_map = normalize_states(df_raw[columns['state']])
+
+    # 3. Intra- vs inter-state: the report's own IGST, or the seller's home
+    #    state (shared TaxSplit rules)
+    if channel.split == SPLIT_REPORTED:
+        igst = _amounts(df_raw[columns['igst']], returns, rounding)
+        intra = tax - igst
+    else:
+        igst, intra = (tax_split or TaxSplit()).split(tax, state_name, seller_gstins)
+
+    # 4. Integer-coded keys
+    if seller_gstins is None:
+        gstin_codes, gstins = np.zeros(len(df_raw), dtype=np.intp), pd.Index(['0'])
+    else:
+        gstin_codes, gstins = _key_codes(seller_gstins)
+    state_codes, states = _key_codes(state_group)
+    if '0' in states:
+        state_name_map.setdefault('0', '0')
+
+    lines = pd.DataFrame({
+        COL_GSTIN: pd.Categorical.from_codes(gstin_codes, gstins),
+        'State_Group': pd.Categorical.from_codes(state_codes, states),
+        'Taxable': taxable,
+        'IGST': igst,
+        'Intra': intra,
+        'Qty': qty,
+    }, index=df_raw.index, copy=False)
+    return lines, state_name_map
+
+
+@stage('aggregate')
+def aggregate_lines(lines):
+    """
+    Sums canonical lines per (Seller GSTIN, State_Group).
+
+    Amounts stay as summed (paise with `rounding`) and Intra unsplit, so
+    partial sums can be folded further; _finish_cube turns them into a cube.
+    """
+    gstin, state = lines[COL_GSTIN].array, lines['State_Group'].array
+    n_states = len(state.categories)
+    if len(gstin.categories) == 1:
+        # one seller (most reports): the state codes are the groups, nothing to hash
+        sums = lines[LINE_VALUES].groupby(state, observed=True).sum()
+        groups = sums.index.codes.astype(np.int64)
+    else:
+        # one int64 key per line instead of a two-level groupby
+        key = gstin.codes.astype(np.int64)
+        key *= n_states
+        key += state.codes
+        sums = lines[LINE_VALUES].groupby(key).sum()
+        groups = sums.index.to_numpy()
+    cube = pd.DataFrame({
+        COL_GSTIN: np.asarray(gstin.categories)[groups // n_states],
+        'State_Group': np.asarray(state.categories)[groups % n_states],
+    })
+    for col in LINE_VALUES:
+        cube[col] = sums[col].to_numpy()
+    return cube
+
+
+def _finish_cube(cube, rounding):
+    """
+    Splits each row's intra-state tax into CGST / SGST halves and, in exact
+    mode, turns paise back into rupees (exact halves, split per aggregate row
+    so odd paise do not pile up line by line).
+    """
+    if cube is None:
+        return None
+    intra = cube.pop('Intra')
+    if rounding is None:
+        cube['CGST'] = cube['SGST'] = intra / 2
+    else:
+        cube['CGST'], cube['SGST'] = split_paise(intra.to_numpy())
+        for col in CUBE_VALUES[:4]:
+            cube[col] = from_paise(cube[col])
+    return cube[CUBE_KEYS + CUBE_VALUES]
+
+
+def channel_cube(channel, df_raw, returns=False, rounding=None, tax_split=None):
+    """
+    channel_lines + aggregate_lines in one call: returns (cube, state_name_map).
+
+    Lets the line-level frame go, so callers that cache the result only hold
+    the small aggregate.
+    """
+    lines, state_name_map = channel_lines(channel, df_raw, returns, rounding, tax_split)
+    return _finish_cube(aggregate_lines(lines), rounding), state_name_map
+
+
+@stage('merge')
+def _fold_cube(cube, part):
+    """Adds one partial aggregate into the running one."""
+    if cube is None:
+        return part
+    if part is None:
+        return cube
+    return pd.concat([cube, part], ignore_index=True).groupby(
+        CUBE_KEYS, dropna=False, observed=True
+    ).sum().reset_index()
+
+
+def _stream_file(channel, file, chunksize, returns=False, rounding=None, tax_split=None):
+    """Folds one file chunk by chunk; returns (cube, state_name_map)."""
+    cube = None
+    state_name_map = {}
+    for chunk in iter_chunks(file, chunksize, channel_schema(channel)):
+        count('rows', len(chunk))
+        lines, chunk_map = channel_lines(channel, chunk, returns, rounding, tax_split)
+        cube = _fold_cube(cube, aggregate_lines(lines))
+        state_name_map.update(chunk_map)
+    return _finish_cube(cube, rounding), state_name_map
+
+
+def stream_channel_data(channel, files, returns_files=(), chunksize=STREAM_CHUNKSIZE, max_workers=None,
+                        rounding=None, tax_split=None):
+    """
+    Low-memory alternative to loading whole reports.
+
+    Reads only the channel's columns, `chunksize` rows at a time, and folds
+    every chunk into the (Seller GSTIN, State_Group) cube, so peak memory is
+    about one chunk per worker however many months go in. Files are streamed
+    in parallel (see map_files); raises FileLoadError if any fail. Returns
+    (cube, state_name_map); the cube is None if nothing was read.
+    """
+    results = []
+    for file_list, returns in ((files, False), (returns_files, True)):
+        results += map_files(
+            functools.partial(_stream_file, channel, chunksize=chunksize, returns=returns, rounding=rounding,
+                              tax_split=tax_split),
+            [f for f in file_list if f is not None], max_workers,
+        )
+    failed = [r for r in results if r.error is not None]
+    if failed:
+        raise FileLoadError(failed)
+
+    cube = None
+    state_name_map = {}
+    for r in results:
+        file_cube, file_map = r.value
+        cube = _fold_cube(cube, file_cube)
+        state_name_map.update(file_map)
+    return cube, state_name_map
+
+
+def channel_gstins(cube):
+    """Sorted Seller GSTINs present in a cube."""
+    unique_gstins = cube[COL_GSTIN].astype(str).unique()
+    return sorted([g for g in unique_gstins if g not in _NO_GSTIN])
+
+
+@stage('aggregate')
+def summarize_channel(cube, state_map, gstin='ALL'):
+    """State-wise Taxable/IGST/CGST/SGST/Qty for one Seller GSTIN (or ALL)."""
+    if gstin != 'ALL':
+        cube = cube[cube[COL_GSTIN] == gstin]
+
+    summary_view = cube.groupby('State_Group', observed=True)[CUBE_VALUES].sum().reset_index()
+
+    # Map to Full Name
+    summary_view['State'] = summary_view['State_Group'].map(state_map)
+
+    # Reorder cols
+    return summary_view[SUMMARY_COLS]
+
+
+def channel_master_frame(cube, state_map):
+    """A cube's state-wise totals in the Master Merge column layout."""
+    return summarize_channel(cube, state_map)[MASTER_COLS]
+
+
+# ==========================================
+# PER-GSTIN FAN-OUT
+# ==========================================
+# Every seller GSTIN's summaries at once: one groupby over a cube instead of
+# one summarize_channel per GSTIN, each of which scans and regroups it all.
+@stage('aggregate')
+def summarize_gstins(cube, state_map):
+    """
+    {Seller GSTIN: state-wise summary} for every GSTIN in a cube (sorted as
+    channel_gstins), each the same table as summarize_channel(cube, state_map, gstin).
+    """
+    grouped = cube.groupby(CUBE_KEYS, observed=True)[CUBE_VALUES].sum().reset_index()
+    grouped['State'] = grouped['State_Group'].map(state_map)
+    grouped = grouped[SUMMARY_COLS + [COL_GSTIN]]
+    summaries = {}
+    for gstin, rows in sorted(grouped.groupby(grouped[COL_GSTIN].astype(str)).indices.items()):
+        if gstin not in _NO_GSTIN:
+            summaries[gstin] = grouped.iloc[rows, :len(SUMMARY_COLS)].reset_index(drop=True)
+    return summaries
+
+
+def merge_master_by_gstin(channel_summaries, rounding=None):
+    """
+    {Seller GSTIN: Master GSTR-1 table} from {channel: summarize_gstins(...)}:
+    each GSTIN's channels merged as merge_master_gstr1 merges them all.
+    """
+    by_gstin = {}
+    for channel, summaries in channel_summaries.items():
+        for gstin, summary in summaries.items():
+            by_gstin.setdefault(gstin, {})[channel] = summary
+    return {gstin: merge_master_gstr1(frames, rounding) for gstin, frames in sorted(by_gstin.items())}
+
+
+def gstin_index(channel_summaries, masters=None):
+    """
+    One row per (GSTIN, channel) with its number of states and totals, plus
+    an 'All channels' row per GSTIN that has a Master GSTR-1 in `masters`.
+    """
+    gstins = sorted({gstin for summaries in channel_summaries.values() for gstin in summaries})
+    rows = []
+    for gstin in gstins:
+        channels = [(channel, summaries[gstin]) for channel, summaries in channel_summaries.items()
+                    if gstin in summaries]
+        for channel, summary in channels:
+            rows.append([gstin, channel, len(summary)] + [summary[col].sum() for col in CUBE_VALUES])
+        if masters is not None and gstin in masters:
+            master = masters[gstin]
+            rows.append([gstin, 'All channels', len(master)] + [master[col].sum() for col in MASTER_VALUES]
+                        + [sum(summary['Qty'].sum() for _, summary in channels)])
+    index = pd.DataFrame(rows, columns=['GSTIN', 'Channel', 'States'] + CUBE_VALUES)
+    index[CUBE_VALUES[:4]] = index[CUBE_VALUES[:4]].round(2)
+    return index
+
+
+def gstin_reports(cubes, frequency, rounding=None, with_masters=True):
+    """
+    Every seller GSTIN's reports from {channel name: (cube, state map)}, one
+    groupby per channel: [(file name, DataFrame)] with gstins/<GSTIN>/
+    Master_GSTR1_<frequency>.csv (unless not `with_masters`) and
+    <channel>_summary.csv per GSTIN, then GSTIN_Index.csv (gstin_index plus
+    each row's file).
+    """
+    channel_summaries = {name: summarize_gstins(cube, state_map) for name, (cube, state_map) in cubes.items()}
+    masters = merge_master_by_gstin(channel_summaries, rounding) if with_masters else None
+    gstins = sorted({gstin for summaries in channel_summaries.values() for gstin in summaries})
+    reports = []
+    files = {}  # (GSTIN, channel or 'All channels') -> file name
+    for gstin in gstins:
+        if with_masters:
+            files[gstin, 'All channels'] = f"gstins/{gstin}/Master_GSTR1_{frequency}.csv"
+            reports.append((files[gstin, 'All channels'], masters[gstin]))
+        for name, summaries in channel_summaries.items():
+            if gstin in summaries:
+                files[gstin, name] = f"gstins/{gstin}/{name}_summary.csv"
+                reports.append((files[gstin, name], summaries[gstin]))
+    index = gstin_index(channel_summaries, masters)
+    index['File'] = [files[key] for key in zip(index['GSTIN'], index['Channel'])]
+    return reports + [('GSTIN_Index.csv', index)]
+
+
+# ==========================================
+# MONTH PARTITIONS
+# ==========================================
+# Each uploaded file (one month) is aggregated on its own and the cube is
+# cached by file content, so a quarter is composed from three small partitions:
+# replacing one month re-processes only that month, and a Monthly filing of the
+# same file reuses the Quarterly partition (and vice versa).
+def _processor_tag(channel, returns, rounding, tax_split):
+    """What a partition depends on besides the input bytes: code versions, adapter, settings."""
+    split_tag = 'reported' if channel.split == SPLIT_REPORTED else (tax_split or TaxSplit()).tag()
+    return (
+        f"{channel.key}{'_returns' if returns else ''}-v{AGGREGATE_VERSION}-p{PARSER_VERSION}-"
+        f"{channel_tag(channel)}-{rounding or 'float'}-{split_tag}"
+    )
+
+
+def _partition(channel, returns, file, cache=None, rounding=None, tax_split=None):
+    """The cube of one file, read back from `cache` when this file was seen before."""
+    key = f"{_processor_tag(channel, returns, rounding, tax_split)}-{content_hash(file)}"
+    with stage('load'):
+        part = cache.get(key) if cache is not None and cache.enabled else None
+    if part is not None:
+        part.attrs['cached'] = True
+        return part
+
+    df = load_data(file, cache, channel_schema(channel))
+    part, _ = channel_cube(channel, df, returns, rounding, tax_split)
+    part.attrs.update(rows=len(df), columns=len(df.columns), encoding=df.attrs.get('encoding', 'xlsx'))
+    if cache is not None:
+        with stage('load'):
+            cache.put(key, part)
+    return part
+
+
+def _partitions(channel, returns, files, cache, report, max_workers, rounding, tax_split):
+    results = map_files(
+        functools.partial(_partition, channel, returns, cache=cache, rounding=rounding, tax_split=tax_split),
+        [f for f in files if f is not None], max_workers,
+    )
+    if report is not None:
+        report.extend(results)
+    failed = [r for r in results if r.error is not None]
+    if failed:
+        raise FileLoadError(failed)
+    count('rows', sum(r.value.attrs.get('rows', 0) for r in results))
+    return [r.value for r in results]
+
+
+def channel_partitions(channel, files, returns_files=(), cache=None, report=None, max_workers=None,
+                       rounding=None, tax_split=None):
+    """One cube per report (sales `files`, then `returns_files`), in parallel; see compose_channel."""
+    return (
+        _partitions(channel, False, files, cache, report, max_workers, rounding, tax_split)
+        + _partitions(channel, True, returns_files, cache, report, max_workers, rounding, tax_split)
+    )
+
+
+def compose_channel(partitions):
+    """Folds per-file cubes into (cube, state_name_map); no partitions make an empty cube."""
+    cube = functools.reduce(_fold_cube, partitions, None)
+    if cube is None:
+        return pd.DataFrame({col: pd.Series(dtype=object if col in CUBE_KEYS else float)
+                             for col in CUBE_KEYS + CUBE_VALUES}), {}
+    _, _, state_name_map = normalize_states(cube['State_Group'])
+    return cube, state_name_map
+
+
+def channel_dataset_key(channel, files, returns_files=(), rounding=None, tax_split=None):
+    """
+    Cache key of a channel's processed uploads: upload content hashes plus
+    the processor versions and settings. Upload hashes are memoized (see
+    content_hash), so the key costs the same for 1k and 10M-row files.
+    """
+    return f"{_processor_tag(channel, False, rounding, tax_split)}-{upload_key(files, returns_files)}"
+
+
+# ==========================================
+# FLIPKART
+# ==========================================
+# The Flipkart and Meesho entry points below are the channel pipeline with
+# their adapters (channels.FLIPKART / channels.MEESHO) filled in.
+def process_flipkart_data(df_raw, rounding=None, tax_split=None):
+    """Flipkart report lines in canonical form; returns (lines, state_name_map), see channel_lines."""
+    return channel_lines(FLIPKART, df_raw, rounding=rounding, tax_split=tax_split)
+
+
+def aggregate_flipkart(lines, rounding=None):
+    """Collapses processed lines to the (Seller GSTIN, State_Group) cube."""
+    return _finish_cube(aggregate_lines(lines), rounding)
+
+
+def build_flipkart_cube(df_raw, rounding=None, tax_split=None):
+    """process_flipkart_data + aggregate_flipkart in one call; returns (cube, state_name_map)."""
+    return channel_cube(FLIPKART, df_raw, rounding=rounding, tax_split=tax_split)
+
+
+def stream_flipkart_data(file_list, chunksize=STREAM_CHUNKSIZE, max_workers=None, rounding=None,
+                         tax_split=None):
+    """Streams Flipkart reports into (cube, state_name_map); see stream_channel_data."""
+    return stream_channel_data(FLIPKART, file_list, (), chunksize, max_workers, rounding, tax_split)
+
+
+def flipkart_partitions(file_list, cache=None, report=None, max_workers=None, rounding=None,
+                        tax_split=None):
+    """One (Seller GSTIN, State_Group) aggregate per file, in parallel; see compose_flipkart."""
+    return channel_partitions(FLIPKART, file_list, (), cache, report, max_workers, rounding, tax_split)
+
+
+def flipkart_dataset_key(file_list, rounding=None, tax_split=None):
+    """Cache key of the Flipkart cube of `file_list`; see channel_dataset_key."""
+    return channel_dataset_key(FLIPKART, file_list, (), rounding, tax_split)
+
+
+compose_flipkart = compose_channel
+flipkart_gstins = channel_gstins
+summarize_flipkart = summarize_channel
+
+
+# ==========================================
+# MEESHO
+# ==========================================
+def _meesho_summary(cubes):
+    """Meesho's state-wise summary (by standard state name) of per-file cubes."""
+    cube = pd.concat(cubes, ignore_index=True)
+    _, state_name, _ = normalize_states(cube['State_Group'])
+    summary = cube.groupby(state_name.array, observed=True)[CUBE_VALUES].sum()
+    summary = summary.rename(columns={'Taxable': 'Taxable_Value', 'Qty': 'Total_Qty'})
+    summary = summary.rename_axis('State').reset_index()
+    summary['State'] = summary['State'].astype(str)
+    return summary[['State'] + MEESHO_SUMMARY_VALUES]
+
+
+def aggregate_meesho(df_raw, returns=False, rounding=None, tax_split=None):
+    """State-wise Meesho totals of one sales (or returns, negated) frame."""
+    return _meesho_summary([channel_cube(MEESHO, df_raw, returns, rounding, tax_split)[0]])
+
+
+@stage('merge')
+def combine_meesho(parts):
+    """Adds per-file Meesho cubes (see meesho_partitions) into one state-wise summary."""
+    return _meesho_summary(parts)
+
+
+def process_meesho_data(df_sales_raw, df_returns_raw, rounding=None, tax_split=None):
+    """Core logic to process Meesho DataFrame"""
+    return combine_meesho([
+        channel_cube(MEESHO, df_sales_raw, rounding=rounding, tax_split=tax_split)[0],
+        channel_cube(MEESHO, df_returns_raw, returns=True, rounding=rounding, tax_split=tax_split)[0],
+    ])
+
+
+def meesho_master_frame(meesho_final):
+    """Meesho summary in the Master Merge column layout."""
+    return meesho_final.rename(columns={'Taxable_Value': 'Taxable'})[MASTER_COLS]
+
+
+def meesho_partitions(files_sales, files_returns, cache=None, report=None, max_workers=None,
+                      rounding=None, tax_split=None):
+    """One cube per sales / returns file; see combine_meesho."""
+    return channel_partitions(MEESHO, files_sales, files_returns, cache, report, max_workers, rounding,
+                              tax_split)
+
+
+def meesho_dataset_key(files_sales, files_returns, rounding=None, tax_split=None):
+    """Cache key of the combined Meesho summary; see channel_dataset_key."""
+    return channel_dataset_key(MEESHO, files_sales, files_returns, rounding, tax_split)
+
+
+# ==========================================
+# MASTER MERGE
+# ==========================================
+MASTER_VALUES = [c for c in MASTER_COLS if c != 'State']
+
+
+class MasterMerge:
+    """
+    Running state-wise GSTR-1 totals across channels.
+
+    Each channel's contribution is kept per state, so reprocessing one channel
+    subtracts its old contribution and adds the new one without regrouping the
+    others; view() is current after every update. Input frames are not modified.
+    With `rounding`, contributions are held as whole paise, so any number of
+    updates leaves the totals exact.
+    """
+
+    def __init__(self, rounding=None):
+        self.rounding = rounding
+        self._channels = {}
+        self._totals = pd.DataFrame(columns=MASTER_VALUES, index=pd.Index([], name='State'), dtype=float)
+        self._sources = pd.Series(0, index=self._totals.index, dtype='int64')  # channels per state
+
+    @property
+    def channels(self):
+        return list(self._channels)
+
+    @stage('merge')
+    def set_channel(self, channel, df):
+        """Replaces `channel`'s contribution; returns False if it was unchanged."""
+        part = df.groupby('State', observed=True)[MASTER_VALUES].sum()
+        part.index = part.index.astype(str)
+        if self.rounding is not None:
+            # whole paise held in float64: integer-exact up to 2**53 paise
+            part = pd.DataFrame(
+                {col: to_paise(part[col], self.rounding) for col in MASTER_VALUES}, index=part.index, dtype=float
+            )
+        old = self._channels.get(channel)
+        if old is not None and old.equals(part):
+            return False
+        if old is not None:
+            self._apply(old, -1)
+        self._apply(part, 1)
+        self._channels[channel] = part
+        return True
+
+    def remove_channel(self, channel):
+        """Takes `channel`'s contribution out of the totals (if it was merged)."""
+        old = self._channels.pop(channel, None)
+        if old is not None:
+            self._apply(old, -1)
+
+    def _apply(self, part, sign):
+        self._totals = self._totals.add(part * sign, fill_value=0)
+        self._sources = self._sources.add(pd.Series(sign, index=part.index), fill_value=0).astype('int64')
+        # States no channel reports any more leave the view
+        kept = self._sources[self._sources > 0].index
+        self._totals = self._totals.loc[kept]
+        self._sources = self._sources.loc[kept]
+
+    @stage('merge')
+    def view(self):
+        """The consolidated table: one row per State, amounts rounded to 2 decimals."""
+        totals = self._totals.sort_index()
+        if self.rounding is not None:
+            totals = pd.DataFrame(
+                {col: from_paise(totals[col].astype('int64')) for col in MASTER_VALUES}, index=totals.index
+            )
+        return totals.round(2).reset_index()[MASTER_COLS]
+
+
+def merge_master_gstr1(channel_frames, rounding=None):
+    """Combines {channel: state summary} into one state-wise GSTR-1 table."""
+    if not channel_frames:
+        return None
+    merge = MasterMerge(rounding)
+    for channel, df in channel_frames.items():
+        merge.set_channel(channel, df)
+    return merge.view()
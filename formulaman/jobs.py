@@ -0,0 +1,166 @@
+"""
+Background processing jobs: a local worker pool and a job table shared by all UI sessions.
+
+A job runs one processing function in a worker thread, inside its own
+metrics run (see metrics), so its progress is that run's live state: the
+stage it is in, files parsed and rows read. Cancelling a job cancels the
+run, which stops the work at its next stage or count (a file already being
+parsed in a worker process is finished first). Sessions keep only job ids
+and take the result off the table once the job has finished.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from .metrics import Metrics, RunCancelled
+
+# Jobs processed at the same time (more are queued)
+DEFAULT_JOB_WORKERS = int(os.environ.get('FORMULAMAN_JOB_WORKERS', '2'))
+# Finished jobs kept for their sessions to pick up (oldest dropped first)
+MAX_FINISHED_JOBS = 50
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+JobProgress = namedtuple('JobProgress', ['stage', 'files_done', 'files', 'rows', 'seconds'])
+
+
+class Job:
+    """
+    One submitted function call. `status` moves from QUEUED to RUNNING to one
+    of DONE (`result` is set), FAILED (`error`) or CANCELLED; `run` is its
+    metrics Run once it started.
+    """
+
+    def __init__(self, job_id, owner, pipeline, label):
+        self.id = job_id
+        self.owner = owner
+        self.pipeline = pipeline
+        self.label = label
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.run = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+    def progress(self):
+        """What the job has got through so far (a JobProgress)."""
+        run = self.run
+        counters = {} if run is None else dict(run.counters)
+        end = self.finished or time.time()
+        return JobProgress(
+            None if run is None else run.current_stage,
+            counters.get('files_done', 0),
+            counters.get('files', 0),
+            counters.get('rows', 0),
+            0.0 if self.started is None else end - self.started,
+        )
+
+
+class JobManager:
+    """
+    Runs jobs on `max_workers` threads, each as a run of `metrics`, and keeps
+    the table of jobs by id. Thread-safe.
+    """
+
+    def __init__(self, metrics=None, max_workers=DEFAULT_JOB_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.metrics = metrics if metrics is not None else Metrics(textfile=None)
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix='formulaman-job')
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner, pipeline, func, *args, label=None, **kwargs):
+        """Queues `func(*args, **kwargs)` as a `pipeline` run for `owner` (a session id); returns the Job."""
+        with self._lock:
+            job = Job(next(self._ids), owner, pipeline, label or pipeline)
+            self._jobs[job.id] = job
+        self._pool.submit(self._work, job, func, args, kwargs)
+        return job
+
+    def _work(self, job, func, args, kwargs):
+        with self._lock:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+                return
+            job.status = RUNNING
+            job.started = time.time()
+        try:
+            with self.metrics.run(job.pipeline) as run:
+                job.run = run
+                if job.cancel_requested:
+                    run.cancel()
+                result = func(*args, **kwargs)
+        except RunCancelled:
+            status = CANCELLED
+        except Exception as e:
+            job.error = e
+            status = CANCELLED if job.cancel_requested else FAILED
+        else:
+            job.result = result
+            status = DONE
+        with self._lock:
+            self._finish(job, status)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        finished = [j for j in self._jobs.values() if j.done]
+        for old in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[old.id]
+
+    def cancel(self, job_id):
+        """Asks a queued or running job to stop; returns False if it already finished."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            job.cancel_requested = True
+            run = job.run
+        if run is not None:
+            run.cancel()
+        return True
+
+    def get(self, job_id):
+        """The Job with `job_id`, or None (unknown, or dropped after finishing)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id):
+        """Takes a finished job off the table (its session has its result)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.done:
+                del self._jobs[job_id]
+
+    def jobs(self, owner=None):
+        """Jobs on the table (of `owner` only, if given), oldest first."""
+        with self._lock:
+            return [j for j in self._jobs.values() if owner is None or j.owner == owner]
+
+    def table(self):
+        """The job table for display: one row per job with its progress."""
+        rows = []
+        for job in self.jobs():
+            progress = job.progress()
+            rows.append({
+                'Job': job.id, 'Session': str(job.owner)[:8], 'Pipeline': job.pipeline, 'Label': job.label,
+                'Status': job.status, 'Stage': progress.stage, 'Files': f"{progress.files_done}/{progress.files}",
+                'Rows': progress.rows, 'Seconds': round(progress.seconds, 1),
+            })
+        return pd.DataFrame(rows, columns=['Job', 'Session', 'Pipeline', 'Label', 'Status', 'Stage', 'Files',
+                                           'Rows', 'Seconds'])
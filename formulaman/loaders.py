@@ -0,0 +1,372 @@
+"""Reading marketplace exports (CSV/Excel) into DataFrames."""
+import codecs
+import functools
+import hashlib
+import io
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from .cache import content_hash
+from .metrics import count, stage, worker_context
+from .xlsx import iter_frames, read_xlsx
+
+# Bump whenever load_data returns something different for the same bytes;
+# it is part of every FrameCache key, so old entries are simply never hit.
+PARSER_VERSION = 5
+
+# Bytes inspected to pick a CSV's encoding before the (single) parse
+ENCODING_SAMPLE_BYTES = 1 << 20
+# Encoding of CSVs that are not valid UTF-8 (decodes any byte)
+FALLBACK_ENCODING = 'ISO-8859-1'
+
+# Outcome of running a function over one file: `value` on success, else `error`
+FileResult = namedtuple('FileResult', ['name', 'value', 'error'])
+
+
+class FileLoadError(ValueError):
+    """One or more files failed to load; `failed` holds their FileResults."""
+
+    def __init__(self, failed):
+        self.failed = failed
+        super().__init__("; ".join(f"{r.name}: {r.error}" for r in failed))
+
+
+class NamedBytesIO(io.BytesIO):
+    """In-memory upload with a file name, picklable for worker processes."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+    def __reduce__(self):
+        return (NamedBytesIO, (self.name, self.getvalue()))
+
+
+def load_data(file, cache=None, schema=None):
+    """
+    Loads CSV/Excel with error handling for encodings.
+
+    Accepts an uploaded file object or a path on disk, and optionally a schema
+    (e.g. channel_schema(CHANNELS['flipkart']), see parse_file). With a
+    FrameCache, files already seen (same bytes, schema and PARSER_VERSION) are
+    read back from disk instead of being parsed again.
+    """
+    if file is None: return None
+    if cache is None or not cache.enabled:
+        return parse_file(file, schema)
+
+    with stage('load'):
+        key = f"upload-v{PARSER_VERSION}-{schema_tag(schema)}-{content_hash(file)}"
+        df = cache.get(key)
+    if df is None:
+        df = parse_file(file, schema)
+        with stage('load'):
+            cache.put(key, df)
+    else:
+        df.attrs['cached'] = True
+    return df
+
+
+def detect_encoding(file):
+    """
+    Picks a CSV's encoding from its first ENCODING_SAMPLE_BYTES.
+
+    UTF-8 (with or without BOM) if the sample decodes as UTF-8, otherwise
+    Latin-1, which accepts any byte (typical of CSVs saved from Excel). The
+    guess can be wrong past the sample; readers fall back to FALLBACK_ENCODING
+    when the file turns out not to decode.
+    """
+    file.seek(0)
+    sample = file.read(ENCODING_SAMPLE_BYTES)
+    file.seek(0)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False: a multi-byte character cut off by the sample is fine
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+def schema_tag(schema):
+    """Short stable id of a schema, for cache keys ('all' without one)."""
+    if schema is None:
+        return 'all'
+    return hashlib.blake2b(repr(sorted(schema.items())).encode(), digest_size=4).hexdigest()
+
+
+def _read_options(schema):
+    """read_csv / read_excel arguments projecting and typing a schema's columns."""
+    if schema is None:
+        return {}
+    return {
+        'usecols': lambda col: col in schema,
+        'dtype': {col: 'category' for col, kind in schema.items() if kind == 'category'},
+    }
+
+
+def _read_excel(file, schema):
+    """The first sheet of a workbook (calamine if installed, else openpyxl; see xlsx)."""
+    options = _read_options(schema)
+    return apply_schema(read_xlsx(file, options.get('usecols'), options.get('dtype')), schema)
+
+
+def apply_schema(df, schema):
+    """
+    Coerces a schema's 'number' columns that did not parse as numbers, and
+    makes its 'category' columns categorical if the reader did not (in place).
+    """
+    if schema is not None:
+        for col, kind in schema.items():
+            if col not in df.columns:
+                continue
+            if kind == 'number' and not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+            elif kind == 'category' and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+    return df
+
+
+def parse_file(file, schema=None):
+    """
+    Parses one CSV/Excel export (no caching).
+
+    CSVs are decoded strictly in the sniffed encoding; if a byte past the
+    sample does not decode, the file is parsed again as FALLBACK_ENCODING, so
+    no character is silently replaced. The encoding used is recorded in
+    `df.attrs['encoding']`. Excel workbooks are read by xlsx.read_xlsx
+    (calamine if installed, else openpyxl). With a schema, only its
+    columns are read, already typed; columns it lists but the file lacks are
+    simply absent, so processors still report them as missing.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as fh:
+            return parse_file(fh, schema)
+    file.seek(0)
+
+    with stage('parse'):
+        if str(file.name).lower().endswith('.csv'):
+            encoding = detect_encoding(file)
+            try:
+                df = pd.read_csv(file, skiprows=[1], encoding=encoding, **_read_options(schema))
+            except UnicodeDecodeError:
+                encoding = FALLBACK_ENCODING
+                file.seek(0)
+                df = pd.read_csv(file, skiprows=[1], encoding=encoding, **_read_options(schema))
+            df.attrs['encoding'] = encoding
+            return apply_schema(df, schema)
+
+        else:
+            return _read_excel(file, schema)
+
+
+def iter_chunks(file, chunksize, schema=None):
+    """
+    Yields a CSV in DataFrames of at most `chunksize` rows (typed by `schema`).
+
+    The encoding is sniffed as in parse_file; if a later chunk does not
+    decode, reading resumes as FALLBACK_ENCODING after the rows already
+    yielded (each chunk's `attrs['encoding']` says which was used). Excel
+    workbooks are chunked too (see xlsx.iter_frames).
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as fh:
+            yield from iter_chunks(fh, chunksize, schema)
+        return
+    file.seek(0)
+
+    if str(file.name).lower().endswith('.csv'):
+        encoding = detect_encoding(file)
+        done = 0
+        try:
+            for chunk in _csv_chunks(file, chunksize, schema, encoding, done):
+                done += len(chunk)
+                yield chunk
+        except UnicodeDecodeError:
+            file.seek(0)
+            yield from _csv_chunks(file, chunksize, schema, FALLBACK_ENCODING, done)
+    else:
+        for chunk in iter_frames(file, chunksize, _read_options(schema).get('usecols')):
+            yield apply_schema(chunk, schema)
+
+
+def _csv_chunks(file, chunksize, schema, encoding, skip):
+    """CSV chunks decoded as `encoding`, starting after the first `skip` data rows."""
+    # line 1 is the description row under the header; data starts at line 2
+    skiprows = [1] if not skip else lambda line: 1 <= line <= skip + 1
+    with pd.read_csv(file, skiprows=skiprows, chunksize=chunksize, encoding=encoding,
+                     **_read_options(schema)) as reader:
+        for chunk in reader:
+            chunk.attrs['encoding'] = encoding
+            yield apply_schema(chunk, schema)
+
+
+def file_name(file):
+    """Display name of an uploaded file or path."""
+    return os.path.basename(str(getattr(file, 'name', file)))
+
+
+def file_size(file):
+    """Size in bytes of a path or an open/uploaded file."""
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+    if hasattr(file, 'getbuffer'):
+        return file.getbuffer().nbytes
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END)
+    file.seek(position)
+    return size
+
+
+def _is_csv(file):
+    return file_name(file).lower().endswith('.csv')
+
+
+def _portable(file):
+    """Paths pass through; open/uploaded files become picklable NamedBytesIO."""
+    if isinstance(file, (str, os.PathLike)):
+        return file
+    file.seek(0)
+    data = file.getvalue() if hasattr(file, 'getvalue') else file.read()
+    return NamedBytesIO(file_name(file), data)
+
+
+def detach_files(files):
+    """
+    Copies of open/uploaded files (paths pass through) for another thread to
+    read while the caller keeps using the originals, e.g. background jobs.
+    """
+    detached = []
+    for f in files:
+        if f is not None and not isinstance(f, (str, os.PathLike)):
+            copy = _portable(f)
+            if getattr(f, 'file_id', None) is not None:
+                copy.file_id = f.file_id  # cache.content_hash stays a lookup
+            f = copy
+        detached.append(f)
+    return detached
+
+
+def _call(func, file):
+    try:
+        return FileResult(file_name(file), func(file), None)
+    except Exception as e:
+        return FileResult(file_name(file), None, e)
+
+
+def map_files(func, files, max_workers=None, use_processes=None):
+    """
+    Runs `func(file)` over `files` concurrently; returns FileResults in input order.
+
+    CSV parsing releases the GIL, so threads are enough; Excel parsing is
+    mostly Python, so batches with Excel files go to a process pool unless `use_processes` says
+    otherwise. A failing file is reported in its own FileResult and does not
+    stop the others. The files' sizes count as 'bytes_read' of the active
+    metrics run, and the files as 'files' / 'files_done' (progress); worker
+    threads report to that run too.
+    """
+    files = [f for f in files if f is not None]
+    count('bytes_read', sum(file_size(f) for f in files))
+    count('files', len(files))
+    if max_workers is None:
+        max_workers = min(len(files), os.cpu_count() or 1)
+    if max_workers <= 1 or len(files) <= 1:
+        return _collect(_call(func, f) for f in files)
+
+    if use_processes is None:
+        use_processes = not all(_is_csv(f) for f in files)
+    task = functools.partial(_call, func)
+    if use_processes:
+        files = [_portable(f) for f in files]
+        try:
+            with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                return _collect(pool.map(task, files))
+        except BrokenProcessPool:
+            # Workers could not start (e.g. the main module cannot be re-imported
+            # from an interactive session); fall back to threads.
+            pass
+    contexts = [worker_context() for _ in files]
+    with ThreadPoolExecutor(max_workers) as pool:
+        return _collect(pool.map(lambda context, f: context.run(task, f), contexts, files))
+
+
+def _collect(results):
+    """
+    FileResults in order, each counted as 'files_done' as it arrives. If the
+    run is cancelled meanwhile, files not started yet are never started.
+    """
+    collected = []
+    try:
+        for result in results:
+            count('files_done')
+            collected.append(result)
+    finally:
+        results.close()  # Executor.map cancels its pending calls
+    return collected
+
+
+def load_many(files, max_workers=None, use_processes=None, cache=None):
+    """Parses several uploads at once; returns FileResults (value = DataFrame) in order."""
+    results = map_files(functools.partial(load_data, cache=cache), files, max_workers, use_processes)
+    count('rows', sum(len(r.value) for r in results if r.value is not None))
+    return results
+
+
+def load_summary(results):
+    """
+    Per-file load metrics (rows, columns, encoding, cache hit) for display.
+
+    For per-file aggregates, rows/columns are those of the source file (attrs).
+    """
+    rows = []
+    for r in results:
+        df = r.value
+        rows.append({
+            'File': r.name,
+            'Rows': None if df is None else df.attrs.get('rows', len(df)),
+            'Columns': None if df is None else df.attrs.get('columns', len(df.columns)),
+            'Encoding': None if df is None else df.attrs.get('encoding', 'xlsx'),
+            'Cached': None if df is None else df.attrs.get('cached', False),
+            'Error': None if r.error is None else str(r.error),
+        })
+    return pd.DataFrame(rows, columns=['File', 'Rows', 'Columns', 'Encoding', 'Cached', 'Error'])
+
+
+def consolidate_groups(*file_lists, max_workers=None, use_processes=None, cache=None, report=None):
+    """
+    Combines each list of raw files into one DataFrame (None for an empty list).
+
+    All files of all lists are parsed in a single parallel batch, so e.g. Meesho
+    sales and returns load together; raises FileLoadError naming every file that
+    failed. If `report` is a list, the per-file FileResults are appended to it.
+    """
+    files = [f for file_list in file_lists for f in file_list if f is not None]
+    results = load_many(files, max_workers, use_processes, cache)
+    if report is not None:
+        report.extend(results)
+    failed = [r for r in results if r.error is not None]
+    if failed:
+        raise FileLoadError(failed)
+
+    frames = []
+    start = 0
+    for file_list in file_lists:
+        n = sum(f is not None for f in file_list)
+        dfs = [r.value for r in results[start:start + n] if r.value is not None]
+        frames.append(pd.concat(dfs, ignore_index=True) if dfs else None)
+        start += n
+    return frames
+
+
+def consolidate_files(file_list, max_workers=None, use_processes=None, cache=None, report=None):
+    """Combines multiple raw files (Monthly/Quarterly) into one DataFrame, parsed in parallel."""
+    return consolidate_groups(
+        file_list, max_workers=max_workers, use_processes=use_processes, cache=cache,
+        report=report,
+    )[0]
@@ -0,0 +1,144 @@
+"""Persistent, versioned SKU mapping (SQLite) reused across picklist runs."""
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing
+
+import pandas as pd
+
+from .picklist import KEY_COLS, MappingIndex, prepare_mapping
+
+DEFAULT_MAPPING_DB = os.environ.get(
+    'FORMULAMAN_MAPPING_DB',
+    os.path.join(os.path.expanduser('~'), '.cache', 'formulaman', 'mapping.sqlite'),
+)
+
+MappingVersion = namedtuple(
+    'MappingVersion', ['version', 'content_hash', 'created', 'rows', 'added', 'changed', 'removed']
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mapping (
+    sku TEXT, color TEXT, size TEXT, master_sku,
+    PRIMARY KEY (sku, color, size)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS versions (
+    version INTEGER PRIMARY KEY, content_hash TEXT, created REAL,
+    rows INTEGER, added INTEGER, changed INTEGER, removed INTEGER
+);
+"""
+
+
+def _rows(df, cols):
+    """DataFrame columns as tuples of plain Python values (sqlite3 rejects numpy scalars)."""
+    return list(zip(*(df[c].astype(object).where(df[c].notna(), None).tolist() for c in cols)))
+
+
+class MappingStore:
+    """
+    The mapping sheet compiled into an SQLite table keyed by (SKU, Color, Size).
+
+    Every upload of a different sheet becomes a new version: only the added,
+    changed and removed keys are written. The compiled MappingIndex of the
+    current version is kept in memory, so picklist runs after the first skip
+    both the upload and the database. Thread-safe.
+    """
+
+    def __init__(self, path=DEFAULT_MAPPING_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = None
+        self._index_version = None
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def current(self):
+        """MappingVersion of the stored mapping, or None if nothing was stored yet."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM versions ORDER BY version DESC LIMIT 1').fetchone()
+        return MappingVersion(*row) if row else None
+
+    def history(self):
+        """All versions, newest first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT * FROM versions ORDER BY version DESC').fetchall()
+        history = pd.DataFrame(rows, columns=MappingVersion._fields)
+        history['created'] = pd.to_datetime(history['created'], unit='s')
+        return history
+
+    def _read(self, conn):
+        return pd.read_sql_query(
+            'SELECT sku AS "SKU", color AS "Color", size AS "Size", master_sku AS "Master SKU" FROM mapping',
+            conn,
+        )
+
+    def update(self, mapping_df, content_hash):
+        """
+        Applies a mapping sheet as the new version (a no-op if `content_hash`
+        is already current). Raises KeyError if required headers are missing.
+        Returns the MappingVersion now current.
+        """
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM versions ORDER BY version DESC LIMIT 1').fetchone()
+            if row and row[1] == content_hash:
+                return MappingVersion(*row)
+
+            # 1. Clean the sheet; one Master SKU per key (first listed wins).
+            #    Blank keys can never match a picklist line and are left out.
+            new = prepare_mapping(mapping_df)
+            new = new.dropna(subset=KEY_COLS + ['Master SKU']).drop_duplicates(KEY_COLS)
+            new = new[KEY_COLS + ['Master SKU']].reset_index(drop=True)
+
+            # 2. Diff against the stored mapping
+            diff = self._read(conn).merge(
+                new, on=KEY_COLS, how='outer', suffixes=('_old', ''), indicator=True
+            )
+            added = diff[diff['_merge'] == 'right_only']
+            removed = diff[diff['_merge'] == 'left_only']
+            both = diff[diff['_merge'] == 'both']
+            changed = both[both['Master SKU'].astype(str) != both['Master SKU_old'].astype(str)]
+
+            # 3. Write only the difference, in one transaction
+            with conn:
+                conn.executemany(
+                    'DELETE FROM mapping WHERE sku = ? AND color = ? AND size = ?',
+                    _rows(removed, KEY_COLS),
+                )
+                conn.executemany(
+                    'INSERT INTO mapping (sku, color, size, master_sku) VALUES (?, ?, ?, ?)',
+                    _rows(added, KEY_COLS + ['Master SKU']),
+                )
+                conn.executemany(
+                    'UPDATE mapping SET master_sku = ? WHERE sku = ? AND color = ? AND size = ?',
+                    _rows(changed, ['Master SKU'] + KEY_COLS),
+                )
+                counts = (len(new), len(added), len(changed), len(removed))
+                created = time.time()
+                cursor = conn.execute(
+                    'INSERT INTO versions (content_hash, created, rows, added, changed, removed) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (content_hash, created) + counts,
+                )
+                version = MappingVersion(cursor.lastrowid, content_hash, created, *counts)
+
+            self._index = MappingIndex.from_prepared(new)
+            self._index_version = version.version
+            return version
+
+    def index(self):
+        """MappingIndex of the current version (built from the database once), or None."""
+        with self._lock:
+            current = self.current()
+            if current is None:
+                return None
+            if self._index_version != current.version:
+                with closing(self._connect()) as conn:
+                    self._index = MappingIndex.from_prepared(self._read(conn))
+                self._index_version = current.version
+            return self._index
@@ -0,0 +1,369 @@
+"""
+Pipeline instrumentation: stage timers, counters, rolling KPIs, Prometheus text.
+
+A run is opened with `Metrics.run(pipeline)`; engine code inside it marks its
+stages with `stage('normalize')` (a context manager or decorator) and its
+counts with `count('rows', n)`. Both are no-ops when no run is active, so
+instrumented functions cost nothing extra when called on their own. Stage
+times are self times: a stage nested in another is not counted twice. The
+active run follows the context (contextvars); map_files carries it into its
+worker threads, but not into worker processes. A run can be cancelled from
+another thread (Run.cancel): its next stage or count then raises
+RunCancelled, which is how background jobs (see jobs) are stopped.
+"""
+import contextlib
+import contextvars
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):  # not on Windows: peak memory is simply not reported
+    _PAGE_SIZE = None
+
+# Stages the pipelines report (a run may use any subset, in any order)
+STAGES = ('load', 'parse', 'normalize', 'merge', 'aggregate', 'export')
+
+# Recent runs per pipeline kept for the rolling KPIs
+ROLLING_WINDOW = 20
+
+# Seconds between resident-memory samples while a run is open
+RSS_SAMPLE_SECONDS = 0.05
+
+DEFAULT_TEXTFILE = os.environ.get('FORMULAMAN_METRICS_FILE')
+
+log = logging.getLogger(__name__)
+
+_active_run = contextvars.ContextVar('formulaman_run', default=None)
+# [seconds spent in nested stages] of the innermost open stage
+_open_stage = contextvars.ContextVar('formulaman_stage', default=None)
+
+
+class RunCancelled(Exception):
+    """Raised by stage() / count() inside a run that was cancelled."""
+
+
+def _current_rss():
+    """Resident memory of this process now, in bytes (None without /proc, e.g. on macOS)."""
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open('/proc/self/statm', 'rb') as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RssSampler:
+    """
+    Highest resident memory seen between start() and stop(), sampled every
+    `interval` seconds on a daemon thread. Unlike ru_maxrss (the process's
+    all-time high) it starts from the memory in use when the run opens;
+    spikes shorter than the interval can be missed.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak = _current_rss()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.peak is not None:
+            self._thread = threading.Thread(target=self._sample, name='formulaman-rss', daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            self._update()
+
+    def _update(self):
+        rss = _current_rss()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def stop(self):
+        """Stops sampling; returns the peak in bytes (None if unknown)."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._update()
+        return self.peak
+
+
+class Run:
+    """
+    One pipeline run: wall time per stage, counters, rows, bytes read and the
+    process's peak resident memory while the run was open. Runs that overlap
+    share the process, so each one's peak includes the others. Stages that
+    repeat (one per file) add up, as do stages run in worker threads.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.started = time.time()
+        self.seconds = None
+        self.failed = False
+        self.stages = {}
+        self.counters = {}
+        self.peak_rss = None
+        self.current_stage = None  # last stage entered, for progress displays
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """Stops the run at its next stage or count (safe from any thread)."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raises RunCancelled if the run was cancelled."""
+        if self._cancelled.is_set():
+            raise RunCancelled(f"{self.pipeline} run cancelled")
+
+    def add_time(self, stage_name, seconds):
+        with self._lock:
+            self.stages[stage_name] = self.stages.get(stage_name, 0.0) + seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def rows(self):
+        return self.counters.get('rows', 0)
+
+    @property
+    def bytes_read(self):
+        return self.counters.get('bytes_read', 0)
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else None
+
+    @property
+    def mapping_accuracy(self):
+        """Share of the quantity that resolved to a Master SKU (picklist runs), or None."""
+        quantity = self.counters.get('quantity')
+        if not quantity:
+            return None
+        return 1 - self.counters.get('unmapped_quantity', 0) / quantity
+
+    def summary(self):
+        """Stage timings and run totals as (name, value) pairs for display."""
+        rows = [(f"{name} (s)", round(seconds, 3)) for name, seconds in self.stages.items()]
+        rows += [
+            ('total (s)', round(self.seconds or 0.0, 3)),
+            ('rows', self.rows),
+            ('rows / s', None if self.rows_per_second is None else round(self.rows_per_second)),
+            ('bytes read', self.bytes_read),
+            ('peak memory (MB)', None if self.peak_rss is None else round(self.peak_rss / 2**20, 1)),
+        ]
+        return rows
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Times the block as stage `name` of the active run (a no-op outside one)."""
+    run = _active_run.get()
+    if run is None:
+        yield
+        return
+    run.check()
+    run.current_stage = name
+    nested = [0.0]
+    token = _open_stage.set(nested)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _open_stage.reset(token)
+        parent = _open_stage.get()
+        if parent is not None:
+            parent[0] += elapsed
+        run.add_time(name, max(elapsed - nested[0], 0.0))
+
+
+def count(name, value=1):
+    """Adds `value` to counter `name` of the active run (a no-op outside one)."""
+    run = _active_run.get()
+    if run is not None:
+        run.check()
+        run.count(name, value)
+
+
+def worker_context():
+    """A copy of the current context for one worker thread: same run, no open stage."""
+    context = contextvars.copy_context()
+    context.run(_open_stage.set, None)
+    return context
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    """A sample value in full precision (counts without a decimal point)."""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metrics:
+    """
+    Recorded runs of every pipeline: the last ROLLING_WINDOW per pipeline for
+    KPIs, plus totals since start for Prometheus counters. Thread-safe; with a
+    `textfile`, the Prometheus rendering is rewritten after every run (for
+    node_exporter's textfile collector); a failed write is logged, never
+    raised into the run.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW, textfile=DEFAULT_TEXTFILE):
+        self.window = window
+        self.textfile = textfile
+        self._recent = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # one textfile write at a time
+
+    @contextlib.contextmanager
+    def run(self, pipeline):
+        """Opens a Run for `pipeline`; it is recorded when the block exits (even on error)."""
+        run = Run(pipeline)
+        token = _active_run.set(run)
+        sampler = _RssSampler().start()
+        start = time.perf_counter()
+        try:
+            yield run
+        except BaseException:
+            run.failed = True
+            raise
+        finally:
+            _active_run.reset(token)
+            run.seconds = time.perf_counter() - start
+            run.peak_rss = sampler.stop()
+            self.record(run)
+
+    def record(self, run):
+        with self._lock:
+            totals = self._totals.setdefault(run.pipeline, {
+                'runs_ok': 0, 'runs_failed': 0, 'seconds': 0.0, 'stages': {}, 'counters': {},
+            })
+            totals['runs_failed' if run.failed else 'runs_ok'] += 1
+            totals['seconds'] += run.seconds
+            for name, seconds in run.stages.items():
+                totals['stages'][name] = totals['stages'].get(name, 0.0) + seconds
+            for name, value in run.counters.items():
+                totals['counters'][name] = totals['counters'].get(name, 0) + value
+            if not run.failed:
+                self._recent.setdefault(run.pipeline, deque(maxlen=self.window)).append(run)
+        if self.textfile:
+            try:
+                self.write_prometheus(self.textfile)
+            except OSError as e:
+                log.warning("Could not write metrics to %s: %s", self.textfile, e)
+
+    def runs(self, pipeline):
+        """Recent successful runs of `pipeline`, oldest first."""
+        with self._lock:
+            return list(self._recent.get(pipeline, ()))
+
+    def last(self, pipeline):
+        runs = self.runs(pipeline)
+        return runs[-1] if runs else None
+
+    def rolling_average(self, pipeline):
+        """Mean wall time (s) of the recent successful runs of `pipeline`, or None."""
+        runs = self.runs(pipeline)
+        return sum(r.seconds for r in runs) / len(runs) if runs else None
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            totals = {p: dict(t, stages=dict(t['stages']), counters=dict(t['counters']))
+                      for p, t in self._totals.items()}
+            last = {p: runs[-1] for p, runs in self._recent.items() if runs}
+            averages = {p: sum(r.seconds for r in runs) / len(runs)
+                        for p, runs in self._recent.items() if runs}
+
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            if not samples:
+                return
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_label(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {_number(value)}")
+
+        family('formulaman_runs_total', 'counter', "Pipeline runs since start.", [
+            ({'pipeline': p, 'status': status}, t[f'runs_{status}'])
+            for p, t in totals.items() for status in ('ok', 'failed')
+        ])
+        family('formulaman_run_seconds_total', 'counter', "Wall time of all runs.", [
+            ({'pipeline': p}, t['seconds']) for p, t in totals.items()
+        ])
+        family('formulaman_stage_seconds_total', 'counter', "Time per stage (summed over worker threads).", [
+            ({'pipeline': p, 'stage': s}, seconds)
+            for p, t in totals.items() for s, seconds in t['stages'].items()
+        ])
+        family('formulaman_rows_total', 'counter', "Rows read.", [
+            ({'pipeline': p}, t['counters'].get('rows', 0)) for p, t in totals.items()
+        ])
+        family('formulaman_read_bytes_total', 'counter', "Bytes of input files read.", [
+            ({'pipeline': p}, t['counters'].get('bytes_read', 0)) for p, t in totals.items()
+        ])
+        family('formulaman_events_total', 'counter', "Other per-run counters.", [
+            ({'pipeline': p, 'name': name}, value)
+            for p, t in totals.items() for name, value in t['counters'].items()
+            if name not in ('rows', 'bytes_read')
+        ])
+        family('formulaman_run_seconds_rolling_avg', 'gauge',
+               f"Mean wall time of the last {self.window} successful runs.", [
+                   ({'pipeline': p}, seconds) for p, seconds in averages.items()
+               ])
+        family('formulaman_last_run_seconds', 'gauge', "Wall time of the last successful run.", [
+            ({'pipeline': p}, r.seconds) for p, r in last.items()
+        ])
+        family('formulaman_last_run_rows_per_second', 'gauge', "Throughput of the last successful run.", [
+            ({'pipeline': p}, r.rows_per_second) for p, r in last.items() if r.rows_per_second is not None
+        ])
+        family('formulaman_last_run_peak_rss_bytes', 'gauge', "Peak resident memory during the last successful run.", [
+            ({'pipeline': p}, r.peak_rss) for p, r in last.items() if r.peak_rss is not None
+        ])
+        family('formulaman_mapping_accuracy_ratio', 'gauge',
+               "Share of picklist quantity mapped to a Master SKU in the last run.", [
+                   ({'pipeline': p}, r.mapping_accuracy) for p, r in last.items()
+                   if r.mapping_accuracy is not None
+               ])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Writes prometheus() to `path` atomically (readers never see half a
+        file). Writes from this object are serialized, each rendered under the
+        lock, so the file always ends up with the latest totals.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._write_lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                    fh.write(self.prometheus())
+                os.chmod(tmp_path, 0o644)  # mkstemp files are private; the collector has to read it
+                os.replace(tmp_path, path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+                raise
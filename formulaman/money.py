@@ -0,0 +1,57 @@
+"""Exact money arithmetic in integer paise (1 rupee = 100 paise)."""
+import numpy as np
+
+# Line-level rounding rules for rupee amounts -> paise:
+# 'half-up'   halves away from zero (the commercial / GST invoice rule),
+# 'half-even' halves to the even paisa (banker's rounding).
+ROUNDING_MODES = ('half-up', 'half-even')
+
+# How close (in paise) a scaled amount must be to x.5 to count as a half
+_HALF_TOLERANCE = 1e-6
+
+
+def to_paise(values, rounding='half-up'):
+    """
+    Rupee amounts as int64 paise, each rounded on its own (missing -> 0).
+
+    Fully vectorized, a few in-place passes per column. Halves are detected
+    with a 1e-6 paisa tolerance so binary float noise
+    (1.005 * 100 == 100.49999999999999) does not decide which way they round.
+    """
+    scaled = np.multiply(np.asarray(values, dtype=np.float64), 100)
+    missing = np.isnan(scaled)
+    if missing.any():
+        scaled[missing] = 0
+    if rounding == 'half-up':
+        rounded = np.copysign(0.5 + _HALF_TOLERANCE, scaled)
+        rounded += scaled
+        np.trunc(rounded, out=rounded)
+    elif rounding == 'half-even':
+        rounded = np.rint(scaled)
+        # near-halves that rint sent the wrong way because of float noise
+        offset = scaled - rounded
+        tie = np.abs(np.abs(offset) - 0.5) < _HALF_TOLERANCE
+        if tie.any():
+            lower = np.floor(scaled[tie] + _HALF_TOLERANCE)
+            rounded[tie] = np.where(lower % 2 == 0, lower, lower + 1)
+    else:
+        raise ValueError(f"Unknown rounding mode: {rounding!r} (expected one of {ROUNDING_MODES})")
+    return rounded.astype(np.int64)
+
+
+def from_paise(paise):
+    """int64 paise back to rupees (float64, exact to the paisa)."""
+    return np.asarray(paise, dtype=np.int64) / 100
+
+
+def split_paise(paise):
+    """
+    Splits tax amounts into two exact halves (e.g. CGST, SGST) that add back up.
+
+    An odd paisa goes to the first half; signs are kept, so a return splits
+    as the mirror image of its sale. Split totals rather than lines, or the
+    odd paise pile up on one side.
+    """
+    paise = np.asarray(paise, dtype=np.int64)
+    second = np.sign(paise) * (np.abs(paise) // 2)
+    return paise - second, second
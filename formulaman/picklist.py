@@ -0,0 +1,263 @@
+"""Picklist consolidation: merge picklists and map them to Master SKUs."""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .constants import MAP_COLS, PL_COLS, UNMAPPED_SKU
+from .metrics import count, stage
+
+KEY_COLS = ['SKU', 'Color', 'Size']
+
+# output: Master SKU totals (largest first, unmapped lines under UNMAPPED_SKU)
+# skipped: (index, name, missing_columns) per picklist that was not used
+# unmapped: SKU/Color/Size keys with no Master SKU and their quantities
+PicklistResult = namedtuple('PicklistResult', ['output', 'skipped', 'unmapped'])
+
+
+def _mapping_columns(mapping_df):
+    """Mapping sheet with stripped headers; raises KeyError if required ones are missing."""
+    mapping_df = mapping_df.copy()
+
+    # Standardize column names (strip spaces)
+    mapping_df.columns = mapping_df.columns.str.strip()
+
+    # Validate Mapping Headers
+    missing_map = [c for c in MAP_COLS if c not in mapping_df.columns]
+    if missing_map:
+        raise KeyError(f"Mapping Sheet Missing Columns: {missing_map}")
+    return mapping_df
+
+
+@stage('normalize')
+def prepare_mapping(mapping_df):
+    """Validates the mapping sheet and cleans its merge keys."""
+    mapping_df = _mapping_columns(mapping_df)
+
+    # Clean Mapping Data for Merge Keys (Strip and Upper), kept as Arrow strings
+    for col in KEY_COLS:
+        keys = pc.utf8_trim_whitespace(_arrow_strings(mapping_df[col]))
+        if col != 'SKU':
+            keys = pc.utf8_upper(keys)
+        mapping_df[col] = pd.Series(pd.arrays.ArrowStringArray(keys), index=mapping_df.index)
+    return mapping_df
+
+
+def _arrow_strings(values):
+    """A column as a pyarrow string array (numbers as their str(), missing as null)."""
+    strings = pa.array(pd.Series(values).astype('string[pyarrow]').array)
+    if isinstance(strings, pa.ChunkedArray):
+        strings = strings.combine_chunks()
+    return strings
+
+
+def _dictionary(values):
+    """
+    A column's per-row codes (-1 = missing) and distinct values (pyarrow strings),
+    hashing each row once: with pyarrow's own kernel for Arrow-backed strings,
+    else with pandas (only the distinct values are then converted).
+    """
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.StringDtype) and values.dtype.storage == 'pyarrow':
+        encoded = pc.dictionary_encode(_arrow_strings(values))
+        return pc.fill_null(encoded.indices, -1).to_numpy(), encoded.dictionary
+    codes, uniques = pd.factorize(values)
+    return codes, _arrow_strings(uniques)
+
+
+@stage('normalize')
+def normalize_keys(values, upper):
+    """
+    Strips (and upper-cases) a key column with pyarrow compute kernels.
+
+    The column is dictionary-encoded first and only its distinct values are
+    cleaned. Returns (codes, keys): int64 per-row codes (-1 = missing) into
+    `keys`, the distinct cleaned values (a pyarrow string array).
+    """
+    codes, distinct = _dictionary(values)
+    keys = pc.utf8_trim_whitespace(distinct)
+    if upper:
+        keys = pc.utf8_upper(keys)
+    # different raw spellings can clean to the same key; a trailing -1 keeps
+    # missing (-1) codes missing
+    merged = pc.dictionary_encode(keys)
+    clean_of_raw = np.append(merged.indices.to_numpy().astype(np.int64), -1)
+    return clean_of_raw[codes], merged.dictionary
+
+
+def _key_strings(keys, codes):
+    """Per-row key values (missing where the code is -1) as a pandas Series."""
+    return keys.take(pa.array(codes, mask=codes < 0)).to_pandas()
+
+
+class MappingIndex:
+    """
+    (SKU, Color, Size) -> Master SKU lookup, built once from the mapping sheet.
+
+    Each key column is normalized and dictionary-encoded on Arrow strings
+    (normalize_keys) and the three codes are packed into one int64, so a lookup
+    is a single integer hash probe per picklist line. A key listed more than
+    once maps to its first Master SKU.
+    """
+
+    def __init__(self, mapping_df, prepared=False):
+        if not prepared:
+            mapping_df = _mapping_columns(mapping_df)
+        mapping_df = mapping_df[mapping_df['Master SKU'].notna()]
+
+        # key_values: the distinct cleaned keys of each column (pyarrow arrays)
+        self.key_values = []
+        codes = []
+        for col in KEY_COLS:
+            col_codes, col_keys = normalize_keys(mapping_df[col], upper=(col != 'SKU'))
+            codes.append(col_codes)
+            self.key_values.append(col_keys)
+
+        composite = self._pack(*codes)
+        master_codes, self.masters = pd.factorize(mapping_df['Master SKU'])
+        first = ~pd.Series(composite).duplicated().to_numpy()
+        self._keys = pd.Index(composite[first])
+        self._master_of_key = master_codes[first]
+
+    @classmethod
+    def from_prepared(cls, mapping_df):
+        """Index of a mapping already cleaned by prepare_mapping (e.g. a stored one)."""
+        return cls(mapping_df, prepared=True)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _pack(self, sku, color, size):
+        n_color = len(self.key_values[1]) + 1
+        n_size = len(self.key_values[2]) + 1
+        return (sku * n_color + color) * n_size + size
+
+    @stage('merge')
+    def lookup(self, sku_codes, color_codes, size_codes):
+        """Master SKU position per line (-1 = unmapped), given codes into key_values."""
+        missing = (sku_codes < 0) | (color_codes < 0) | (size_codes < 0)
+        positions = self._keys.get_indexer(self._pack(sku_codes, color_codes, size_codes))
+        masters = np.where(positions >= 0, self._master_of_key[positions], -1)
+        masters[missing] = -1
+        return masters
+
+
+class PicklistConsolidator:
+    """
+    Streams picklists through a MappingIndex, adding each line's quantity
+    straight into its Master SKU total (one pass, no intermediate merge).
+    """
+
+    def __init__(self, mapping):
+        self.index = mapping if isinstance(mapping, MappingIndex) else MappingIndex(mapping)
+        self._totals = np.zeros(len(self.index.masters))
+        self._lines = np.zeros(len(self.index.masters), dtype=np.int64)
+        self._unmapped = []
+        self._integral = True
+
+    def add(self, df):
+        """Adds one picklist; raises KeyError if it lacks the required headers."""
+        df = df.rename(columns=lambda c: c.strip() if isinstance(c, str) else c) # Clean headers
+        missing_pl = [c for c in PL_COLS if c not in df.columns]
+        if missing_pl:
+            raise KeyError(missing_pl)
+
+        qty = pd.to_numeric(df['Total Quantity'], errors='coerce')
+        self._integral &= pd.api.types.is_integer_dtype(qty)
+        qty = qty.fillna(0).to_numpy(dtype=np.float64)
+
+        # Clean each key column on its distinct values, then translate them to
+        # the mapping sheet's codes (-1 if the value never occurs there)
+        local = []
+        codes = []
+        for col, values in zip(KEY_COLS, self.index.key_values):
+            col_codes, col_keys = normalize_keys(df[col], upper=(col != 'SKU'))
+            local.append((col_codes, col_keys))
+            with stage('merge'):
+                translated = pc.fill_null(pc.index_in(col_keys, value_set=values), -1).to_numpy()
+                # a trailing -1 so that missing (-1) codes stay -1
+                codes.append(np.append(translated, -1).astype(np.int64)[col_codes])
+
+        masters = self.index.lookup(*codes)
+        mapped = masters >= 0
+        n = len(self._totals)
+        with stage('aggregate'):
+            self._totals += np.bincount(masters[mapped], weights=qty[mapped], minlength=n)
+            self._lines += np.bincount(masters[mapped], minlength=n)
+
+            if not mapped.all():
+                unmapped = ~mapped
+                self._unmapped.append(pd.DataFrame({
+                    col: _key_strings(col_keys, col_codes[unmapped])
+                    for col, (col_codes, col_keys) in zip(KEY_COLS, local)
+                } | {'Total Quantity': qty[unmapped]}))
+
+    @stage('aggregate')
+    def unmapped(self):
+        """Unmapped SKU/Color/Size keys with their total quantity (largest first)."""
+        if not self._unmapped:
+            return pd.DataFrame(columns=KEY_COLS + ['Total Quantity'])
+        unmapped = pd.concat(self._unmapped, ignore_index=True).groupby(
+            KEY_COLS, dropna=False
+        )['Total Quantity'].sum().reset_index()
+        unmapped = unmapped.sort_values(by='Total Quantity', ascending=False, ignore_index=True)
+        if self._integral:
+            unmapped['Total Quantity'] = unmapped['Total Quantity'].astype(np.int64)
+        return unmapped
+
+    @stage('aggregate')
+    def output(self, unmapped=None):
+        """Master SKU totals, largest first; unmapped lines are pooled under UNMAPPED_SKU."""
+        used = self._lines > 0
+        final_output = pd.DataFrame({
+            'Master SKU': self.index.masters[used],
+            'Total Quantity': self._totals[used],
+        })
+        if unmapped is None:
+            unmapped = self.unmapped()
+        if len(unmapped):
+            final_output.loc[len(final_output)] = [UNMAPPED_SKU, unmapped['Total Quantity'].sum()]
+        if self._integral:
+            final_output['Total Quantity'] = final_output['Total Quantity'].astype(np.int64)
+        # Ties keep Master SKU order
+        final_output = final_output.sort_values(by='Master SKU', ignore_index=True)
+        return final_output.sort_values(by='Total Quantity', ascending=False)
+
+
+def consolidate_picklists(picklists, mapping_df):
+    """
+    Merges picklists and maps them to Master SKUs.
+
+    `picklists` is a list of (name, DataFrame) pairs; `mapping_df` is the mapping
+    sheet or an already built MappingIndex. Picklists missing required headers
+    are skipped. Returns a PicklistResult; the picklist lines, their quantity
+    and the unmapped quantity are counted in the active metrics run.
+    """
+    consolidator = PicklistConsolidator(mapping_df)
+
+    skipped = []
+    added = 0
+    for idx, (name, df) in enumerate(picklists):
+        try:
+            consolidator.add(df)
+        except KeyError as e:
+            skipped.append((idx, name, e.args[0]))
+            continue
+        added += 1
+        count('picklist_lines', len(df))
+
+    if not added:
+        raise ValueError("No valid picklist files to process.")
+
+    unmapped = consolidator.unmapped()
+    output = consolidator.output(unmapped)
+    count('quantity', output['Total Quantity'].sum())
+    count('unmapped_quantity', unmapped['Total Quantity'].sum())
+    return PicklistResult(output, skipped, unmapped)
+
+
+def unmapped_quantity(final_output):
+    """Total quantity that did not resolve to a Master SKU."""
+    return final_output[final_output['Master SKU'] == UNMAPPED_SKU]['Total Quantity'].sum()
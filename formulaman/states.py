@@ -0,0 +1,45 @@
+"""State name normalization shared by every marketplace processor."""
+import numpy as np
+import pandas as pd
+
+from .constants import INDIAN_STATE_MAPPING
+
+
+def normalize_states(values):
+    """
+    Normalizes a column of raw state names.
+
+    Returns (state_group, state_name, state_name_map):
+    - state_group: the cleaned key (stripped, upper-cased) as a categorical,
+    - state_name: the full standard name as a categorical; states missing from
+      INDIAN_STATE_MAPPING fall back to Title Case (e.g. "MYSORE" -> "Mysore"),
+    - state_name_map: {state_group: state_name} for the keys present.
+
+    The string work runs once per distinct spelling, not once per row; rows
+    only carry integer codes. Missing values stay missing.
+    """
+    values = pd.Series(values)
+    raw_codes, raw_uniques = pd.factorize(values)
+
+    # 1. Clean each distinct raw spelling, then collapse spellings that clean
+    #    to the same key (" delhi", "DELHI ")
+    clean_uniques = pd.Index(raw_uniques).astype(str).str.strip().str.upper()
+    clean_of_raw, clean_keys = pd.factorize(clean_uniques, sort=True)
+
+    # 2. Full name per clean key
+    full_names = pd.Index(clean_keys).map(INDIAN_STATE_MAPPING)
+    full_names = full_names.where(full_names.notna(), pd.Index(clean_keys).str.title())
+    full_of_clean, full_keys = pd.factorize(full_names, sort=True)
+
+    # 3. Broadcast back to rows through the codes (-1 = missing)
+    clean_codes = np.where(raw_codes >= 0, clean_of_raw[raw_codes], -1)
+    full_codes = np.where(clean_codes >= 0, full_of_clean[clean_codes], -1)
+
+    state_group = pd.Series(
+        pd.Categorical.from_codes(clean_codes, categories=clean_keys), index=values.index
+    )
+    state_name = pd.Series(
+        pd.Categorical.from_codes(full_codes, categories=full_keys), index=values.index
+    )
+    state_name_map = dict(zip(clean_keys, full_names))
+    return state_group, state_name, state_name_map
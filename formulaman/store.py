@@ -0,0 +1,179 @@
+"""Process-wide store of processed datasets shared by UI sessions."""
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+DEFAULT_BUDGET_MB = int(os.environ.get('FORMULAMAN_MEMORY_BUDGET_MB', '1024'))
+DEFAULT_SPILL_DIR = os.environ.get(
+    'FORMULAMAN_SPILL_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'formulaman', 'spill'),
+)
+# Sessions untouched this long lose their datasets (browser tab closed etc.)
+DEFAULT_MAX_IDLE_SECONDS = 4 * 60 * 60
+
+SessionUsage = namedtuple('SessionUsage', ['datasets', 'resident_bytes', 'spilled_bytes', 'shared_bytes'])
+
+
+class _Entry:
+    __slots__ = ('frame', 'path', 'nbytes', 'sessions')
+
+    def __init__(self, frame, nbytes):
+        self.frame = frame
+        self.path = None
+        self.nbytes = nbytes
+        self.sessions = set()
+
+
+def frame_nbytes(df):
+    """Deep memory footprint of a DataFrame in bytes."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class DatasetStore:
+    """
+    Holds processed DataFrames once per content key, however many sessions use them.
+
+    Sessions keep only the key (a handle) and call get() when rendering. When
+    the resident total passes `budget_mb`, datasets of the sessions idle the
+    longest are spilled to `spill_dir` and read back on the next get().
+    Datasets no session refers to any more are dropped. Thread-safe.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, spill_dir=DEFAULT_SPILL_DIR,
+                 max_idle_seconds=DEFAULT_MAX_IDLE_SECONDS):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.spill_dir = spill_dir
+        self.max_idle_seconds = max_idle_seconds
+        self._entries = {}
+        self._last_active = {}
+        self._lock = threading.RLock()
+
+    # --- handles ---
+    def has(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, session_id, key, df):
+        """Registers `df` under `key` for `session_id` (reusing an existing copy)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(df, frame_nbytes(df))
+            entry.sessions.add(session_id)
+            self.touch(session_id)
+            self._enforce_budget()
+        return key
+
+    def get(self, session_id, key):
+        """The dataset behind `key` (read back from disk if spilled), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.sessions.add(session_id)
+            self.touch(session_id)
+            if entry.frame is None:
+                entry.frame = pd.read_pickle(entry.path)
+                self._remove_spill(entry)
+                self._enforce_budget(keep=key)
+            return entry.frame
+
+    def release(self, session_id, key=None):
+        """Drops one handle (or all handles) of a session."""
+        with self._lock:
+            keys = [key] if key is not None else list(self._entries)
+            for k in keys:
+                entry = self._entries.get(k)
+                if entry is None:
+                    continue
+                entry.sessions.discard(session_id)
+                if not entry.sessions:
+                    self._drop(k)
+            if key is None:
+                self._last_active.pop(session_id, None)
+
+    def touch(self, session_id):
+        """Marks a session as active now; expires sessions idle too long."""
+        with self._lock:
+            now = time.monotonic()
+            self._last_active[session_id] = now
+            for sid, last in list(self._last_active.items()):
+                if now - last > self.max_idle_seconds:
+                    self.release(sid)
+
+    # --- memory management ---
+    def _idle_since(self, entry):
+        return max((self._last_active.get(sid, 0.0) for sid in entry.sessions), default=0.0)
+
+    def _enforce_budget(self, keep=None):
+        resident = sum(e.nbytes for e in self._entries.values() if e.frame is not None)
+        if resident <= self.budget_bytes:
+            return
+        candidates = sorted(
+            (k for k, e in self._entries.items() if e.frame is not None and k != keep),
+            key=lambda k: self._idle_since(self._entries[k]),
+        )
+        for k in candidates:
+            if resident <= self.budget_bytes:
+                break
+            entry = self._entries[k]
+            self._spill(entry)
+            resident -= entry.nbytes
+
+    def _spill(self, entry):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.spill_dir, suffix='.pkl')
+        os.close(fd)
+        entry.frame.to_pickle(path)
+        entry.path = path
+        entry.frame = None
+
+    def _remove_spill(self, entry):
+        if entry.path is not None:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            entry.path = None
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._remove_spill(entry)
+
+    # --- reporting ---
+    def session_usage(self, session_id):
+        """Memory held for one session; `shared_bytes` is also counted by other sessions."""
+        with self._lock:
+            datasets = resident = spilled = shared = 0
+            for entry in self._entries.values():
+                if session_id not in entry.sessions:
+                    continue
+                datasets += 1
+                if entry.frame is None:
+                    spilled += entry.nbytes
+                else:
+                    resident += entry.nbytes
+                if len(entry.sessions) > 1:
+                    shared += entry.nbytes
+            return SessionUsage(datasets, resident, spilled, shared)
+
+    def usage(self):
+        """One row per active session: datasets, resident/spilled/shared MB, idle seconds."""
+        with self._lock:
+            now = time.monotonic()
+            rows = []
+            for sid, last in self._last_active.items():
+                u = self.session_usage(sid)
+                rows.append({
+                    'Session': sid,
+                    'Datasets': u.datasets,
+                    'Resident MB': round(u.resident_bytes / 2**20, 2),
+                    'Spilled MB': round(u.spilled_bytes / 2**20, 2),
+                    'Shared MB': round(u.shared_bytes / 2**20, 2),
+                    'Idle (s)': round(now - last),
+                })
+            return pd.DataFrame(rows, columns=['Session', 'Datasets', 'Resident MB', 'Spilled MB', 'Shared MB', 'Idle (s)'])
@@ -0,0 +1,83 @@
+"""Intra-state (CGST + SGST) vs inter-state (IGST) split, shared by every marketplace."""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .constants import GST_STATE_CODES, INDIAN_STATE_MAPPING
+
+# Home state of lines whose seller GSTIN is missing or unknown (e.g. Meesho
+# reports without a `gstin` column)
+DEFAULT_HOME_STATE = 'Haryana'
+
+
+def standard_state_name(name):
+    """One state spelling as its standard name (same rules as normalize_states)."""
+    key = str(name).strip().upper()
+    return INDIAN_STATE_MAPPING.get(key, key.title())
+
+
+class TaxSplit:
+    """
+    Decides per line whether GST is intra-state (CGST + SGST) or inter-state (IGST).
+
+    A line is intra-state when the customer's state is the seller's home state:
+    the state of the GST code that starts the seller GSTIN ('06...' is Haryana).
+    `home_states` ({GSTIN: state}) overrides that per GSTIN; lines without a
+    known GSTIN use `default_home_state`. Work is per distinct GSTIN and state,
+    so a split of millions of lines is two integer gathers and a compare.
+    """
+
+    def __init__(self, default_home_state=DEFAULT_HOME_STATE, home_states=None):
+        self.default_home_state = standard_state_name(default_home_state)
+        self.home_states = {
+            str(gstin).strip().upper(): standard_state_name(state)
+            for gstin, state in (home_states or {}).items()
+        }
+
+    def tag(self):
+        """Short stable id of the settings, for cache keys."""
+        settings = repr((self.default_home_state, sorted(self.home_states.items())))
+        return hashlib.blake2b(settings.encode(), digest_size=4).hexdigest()
+
+    def home_state(self, gstin):
+        """Standard name of a seller GSTIN's home state."""
+        if gstin is None or pd.isna(gstin):
+            return self.default_home_state
+        gstin = str(gstin).strip().upper()
+        if gstin in self.home_states:
+            return self.home_states[gstin]
+        return GST_STATE_CODES.get(gstin[:2], self.default_home_state)
+
+    def intra_state(self, state_name, seller_gstins=None):
+        """
+        Boolean mask of intra-state lines.
+
+        `state_name` holds the customers' standard state names (the second
+        result of normalize_states); `seller_gstins` the sellers' GSTINs (None:
+        every line is the default home state's).
+        """
+        states = pd.Categorical(state_name)
+        state_codes = states.codes
+        if seller_gstins is None:
+            home = states.categories.get_indexer([self.default_home_state])[0]
+            return (state_codes == home) & (state_codes >= 0)
+
+        # Home state per distinct GSTIN (a missing GSTIN, code -1, takes the
+        # trailing default); -2 marks homes no customer is in
+        gstin_codes, gstins = pd.factorize(seller_gstins)
+        homes = [self.home_state(g) for g in gstins] + [self.default_home_state]
+        home_codes = states.categories.get_indexer(homes)
+        home_codes[home_codes < 0] = -2
+        return home_codes[gstin_codes] == state_codes
+
+    def split(self, tax, state_name, seller_gstins=None):
+        """
+        (IGST, intra-state tax) per line from the total tax of each line.
+
+        The intra-state tax is CGST + SGST; halve it after summing (split_paise
+        for whole paise) so the halves add back up exactly.
+        """
+        tax = np.asarray(tax)
+        intra = np.where(self.intra_state(state_name, seller_gstins), tax, 0)
+        return tax - intra, intra
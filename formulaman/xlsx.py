@@ -0,0 +1,102 @@
+"""
+Reading .xlsx exports (the first sheet).
+
+With python-calamine installed, workbooks go through its Rust parser
+(pd.read_excel(engine='calamine')), many times faster than openpyxl.
+Otherwise openpyxl reads them in read-only mode, one row at a time, so
+iter_frames hands a large sheet over in chunks without holding it whole.
+"""
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:  # openpyxl: slower, but streams
+    EXCEL_ENGINE = 'openpyxl'
+
+
+def read_xlsx(file, usecols=None, dtype=None):
+    """The first sheet of an .xlsx file, its second (template) row left out, as pd.read_excel reads it."""
+    return pd.read_excel(file, engine=EXCEL_ENGINE, skiprows=[1], usecols=usecols, dtype=dtype)
+
+
+def _header(names):
+    """Column names as pandas gives them: 'Unnamed: i' for blanks, '.1' suffixes for repeats."""
+    header = []
+    seen = {}
+    for i, name in enumerate(names):
+        if name is None or name == '':
+            name = f'Unnamed: {i}'
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        if count:
+            while f'{name}.{count}' in seen:
+                count += 1
+            name = f'{name}.{count}'
+            seen[name] = 1
+        header.append(name)
+    return header
+
+
+def _cell(value):
+    """A cell value as pandas' openpyxl reader passes it on ('' for blanks, whole numbers as int)."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _frame(rows, columns):
+    """Rows of cell values typed as read_excel types them (NA strings, numbers in text)."""
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    return TextParser(rows, names=columns).read()
+
+
+def iter_frames(file, chunksize, usecols=None):
+    """
+    Yields the first sheet of an .xlsx file (its template row left out) as
+    DataFrames of at most `chunksize` rows, each typed as read_excel types
+    a sheet without a dtype. `usecols` is a predicate picking columns by name.
+    Blank rows between values are kept as empty rows, those after the last
+    value dropped, as read_excel does. With calamine the sheet is read whole
+    (it is fast and compact) and then cut into chunks.
+    """
+    if EXCEL_ENGINE == 'calamine':
+        df = read_xlsx(file, usecols)
+        for start in range(0, max(len(df), 1), chunksize):
+            yield df.iloc[start:start + chunksize].reset_index(drop=True)
+        return
+
+    book = openpyxl.load_workbook(file, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = book.worksheets[0].iter_rows(values_only=True)
+        names = list(next(rows, ()))
+        while names and (names[-1] is None or names[-1] == ''):
+            names.pop()
+        header = _header(names)
+        keep = [i for i, name in enumerate(header) if usecols is None or usecols(name)]
+        columns = [header[i] for i in keep]
+        next(rows, None)  # the template row
+
+        chunk = []
+        blanks = 0  # blank rows not yet known to come before another value
+        yielded = False
+        for row in rows:
+            if all(value is None or value == '' for value in row):
+                blanks += 1
+                continue
+            chunk.extend([''] * len(keep) for _ in range(blanks))
+            blanks = 0
+            chunk.append([_cell(row[i]) if i < len(row) else '' for i in keep])
+            while len(chunk) >= chunksize:
+                yield _frame(chunk[:chunksize], columns)
+                chunk = chunk[chunksize:]
+                yielded = True
+        if chunk or not yielded:
+            yield _frame(chunk, columns)
+    finally:
+        book.close()
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from formulaman.loaders import ENCODING_SAMPLE_BYTES, NamedBytesIO, iter_chunks, parse_file
+
+HEADER = b"SKU,Name,Qty\nStock keeping unit,Product name,Units sold\n"
+
+
+def _csv(tail_name):
+    """A CSV whose first ENCODING_SAMPLE_BYTES are ASCII, ending in a row named `tail_name`."""
+    rows = []
+    size = len(HEADER)
+    while size <= ENCODING_SAMPLE_BYTES:
+        row = f"SKU{len(rows)},Plain name,{len(rows) % 7}\n".encode()
+        rows.append(row)
+        size += len(row)
+    rows.append(b"SKU-last," + tail_name + b",3\n")
+    return HEADER + b"".join(rows), len(rows)
+
+
+def test_latin1_past_sample_is_reparsed_not_replaced():
+    data, n = _csv("Café".encode('latin-1'))
+    df = parse_file(NamedBytesIO('orders.csv', data))
+    assert df.attrs['encoding'] == 'ISO-8859-1'
+    assert len(df) == n
+    assert df['Name'].iloc[-1] == 'Café'
+    assert not df['Name'].str.contains('�').any()
+
+
+def test_chunks_resume_in_fallback_encoding():
+    data, n = _csv("Café".encode('latin-1'))
+    chunks = list(iter_chunks(NamedBytesIO('orders.csv', data), 10_000))
+    df = pd.concat(chunks, ignore_index=True)
+    expected = parse_file(NamedBytesIO('orders.csv', data))
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+    assert chunks[0].attrs['encoding'] == 'utf-8'
+    assert chunks[-1].attrs['encoding'] == 'ISO-8859-1'
+
+
+def test_utf8_is_kept():
+    data, n = _csv("Café".encode('utf-8'))
+    df = parse_file(NamedBytesIO('orders.csv', data))
+    assert df.attrs['encoding'] == 'utf-8'
+    assert df['Name'].iloc[-1] == 'Café'
+    assert len(pd.concat(iter_chunks(NamedBytesIO('orders.csv', data), 10_000))) == n
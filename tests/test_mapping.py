@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from formulaman.constants import UNMAPPED_SKU
+from formulaman.mapping import MappingStore
+from formulaman.picklist import consolidate_picklists
+
+
+def sheet(rows):
+    return pd.DataFrame(rows, columns=['SKU', 'Color', 'Size', 'Master SKU'])
+
+
+V1 = sheet([
+    ['TEE-1', 'red', 'm', 'M-TEE-RED'],
+    ['TEE-1', 'Blue', 'M', 'M-TEE-BLUE'],
+    ['CAP', 'Black', 'Free', 'M-CAP'],
+])
+V2 = sheet([
+    [' TEE-1 ', 'RED', 'M', 'M-TEE-RED'],        # same key, cleaned: unchanged
+    ['TEE-1', 'Blue', 'M', 'M-TEE-NAVY'],        # changed
+    ['MUG', 'White', 'Free', 'M-MUG'],           # added (CAP removed)
+    ['MUG', 'White', 'Free', 'M-MUG-DUPLICATE'],  # a repeated key: the first one wins
+    [None, 'White', 'Free', 'M-BLANK'],           # blank key: left out
+])
+PICKLIST = pd.DataFrame({
+    'SKU': ['TEE-1', 'TEE-1', 'CAP', 'MUG'],
+    'Color': ['Red', 'blue', 'Black', 'white'],
+    'Size': ['M', 'm', 'Free', 'Free'],
+    'Total Quantity': [2, 3, 1, 4],
+})
+
+
+def mapped(index_or_sheet):
+    output = consolidate_picklists([('picklist', PICKLIST.copy())], index_or_sheet).output
+    return output.sort_values(list(output.columns)).reset_index(drop=True)
+
+
+def test_versions_record_added_changed_removed(tmp_path):
+    store = MappingStore(str(tmp_path / 'mapping.sqlite'))
+    assert store.current() is None and store.index() is None
+
+    v1 = store.update(V1, 'hash-1')
+    assert (v1.version, v1.rows, v1.added, v1.changed, v1.removed) == (1, 3, 3, 0, 0)
+    assert store.update(V1, 'hash-1') == v1  # the same sheet again is not a new version
+
+    v2 = store.update(V2, 'hash-2')
+    assert (v2.version, v2.rows, v2.added, v2.changed, v2.removed) == (2, 3, 1, 1, 1)
+    assert store.current() == v2
+    assert store.history()['version'].tolist() == [2, 1]
+
+
+def test_stored_mapping_maps_like_the_sheet(tmp_path):
+    path = str(tmp_path / 'mapping.sqlite')
+    store = MappingStore(path)
+    store.update(V1, 'hash-1')
+    pd.testing.assert_frame_equal(mapped(store.index()), mapped(V1))
+    store.update(V2, 'hash-2')
+    pd.testing.assert_frame_equal(mapped(store.index()), mapped(V2))
+    assert mapped(store.index())['Master SKU'].tolist() == ['M-MUG', 'M-TEE-NAVY', 'M-TEE-RED', UNMAPPED_SKU]
+    # a new process builds the same index from the database alone
+    pd.testing.assert_frame_equal(mapped(MappingStore(path).index()), mapped(V2))
+
+
+def test_missing_headers(tmp_path):
+    store = MappingStore(str(tmp_path / 'mapping.sqlite'))
+    with pytest.raises(KeyError):
+        store.update(V1.drop(columns='Master SKU'), 'hash-1')
+    assert store.current() is None
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from formulaman.constants import MASTER_COLS
+from formulaman.gstr1 import (
+    CUBE_KEYS, CUBE_VALUES, MasterMerge, channel_master_frame, compose_channel, merge_master_gstr1,
+)
+from formulaman.money import from_paise, to_paise
+
+STATES = ['Delhi', 'Haryana', 'Karnataka', 'Kerala', 'Punjab', 'Tamil Nadu']
+VALUES = MASTER_COLS[1:]
+
+
+def summary(seed, states=STATES, scale=1000):
+    """A channel's state summary (one line per state) with amounts in 1/`scale` rupees."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'State': states})
+    for col in VALUES:
+        df[col] = rng.integers(-5 * scale, 5_000 * scale, len(states)) / scale
+    df['Qty'] = rng.integers(1, 100, len(states))
+    return df
+
+
+def one_shot(frames, rounding):
+    """The expected master: every channel's lines summed per state in one pass."""
+    lines = pd.concat(frames.values(), ignore_index=True)
+    if rounding is not None:
+        for col in VALUES:
+            lines[col] = to_paise(lines[col], rounding)
+    totals = lines.groupby('State')[VALUES].sum().sort_index()
+    if rounding is not None:
+        totals = pd.DataFrame({col: from_paise(totals[col]) for col in VALUES}, index=totals.index)
+    return totals.round(2).reset_index()[MASTER_COLS]
+
+
+@pytest.mark.parametrize('rounding', [None, 'half-up', 'half-even'])
+def test_incremental_updates_match_a_one_shot_merge(rounding):
+    # thousandths make line rounding matter; unrounded float totals drift by ulps, so they get whole paise
+    scale = 100 if rounding is None else 1000
+    amazon = summary(1, scale=scale)
+    flipkart = summary(2, STATES[:3], scale)
+    meesho = summary(3, ['Goa'] + STATES[2:], scale)
+    merge = MasterMerge(rounding)
+    merge.set_channel('Amazon', amazon)
+    merge.set_channel('Flipkart', flipkart)
+    merge.set_channel('Meesho', meesho)
+    assert merge.set_channel('Amazon', amazon.copy()) is False  # unchanged: nothing to redo
+
+    # reprocess Flipkart, drop and re-add Meesho, many times over
+    for seed in range(10, 60):
+        flipkart = summary(seed, STATES[seed % 3:], scale)
+        merge.set_channel('Flipkart', flipkart)
+        merge.remove_channel('Meesho')
+        assert 'Goa' not in merge.view()['State'].tolist()  # only Meesho sells there
+        merge.set_channel('Meesho', meesho)
+
+    final = {'Amazon': amazon, 'Flipkart': flipkart, 'Meesho': meesho}
+    expected = one_shot(final, rounding)
+    pd.testing.assert_frame_equal(merge.view(), expected, check_exact=rounding is not None)
+    pd.testing.assert_frame_equal(merge_master_gstr1(final, rounding), expected, check_exact=rounding is not None)
+    assert merge.channels == ['Amazon', 'Flipkart', 'Meesho']
+
+
+def test_removing_every_channel_empties_the_view():
+    merge = MasterMerge('half-up')
+    merge.set_channel('Amazon', summary(1))
+    merge.remove_channel('Amazon')
+    merge.remove_channel('Amazon')  # not merged any more: a no-op
+    assert merge.view().empty
+    assert merge_master_gstr1({}) is None
+
+
+def test_a_channel_without_reports_merges_as_nothing():
+    cube, state_map = compose_channel([])
+    assert cube.empty and list(cube.columns) == CUBE_KEYS + CUBE_VALUES and state_map == {}
+    merge = MasterMerge('half-up')
+    merge.set_channel('Amazon', summary(1))
+    expected = merge.view()
+    merge.set_channel('Ajio', channel_master_frame(cube, state_map))
+    pd.testing.assert_frame_equal(merge.view(), expected)
@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from formulaman.metrics import Metrics, _current_rss, count
+
+
+@pytest.mark.skipif(_current_rss() is None, reason="resident memory is not readable here")
+def test_peak_memory_is_per_run():
+    metrics = Metrics(textfile=None)
+    with metrics.run('big') as big:
+        block = np.ones(300_000_000 // 8)
+        time.sleep(0.2)
+    del block
+    with metrics.run('small') as small:
+        time.sleep(0.2)
+    assert big.peak_rss - small.peak_rss > 200 * 2**20
+    assert 'formulaman_last_run_peak_rss_bytes{pipeline="small"}' in metrics.prometheus()
+
+
+def test_concurrent_runs_write_the_textfile(tmp_path):
+    path = str(tmp_path / 'formulaman.prom')
+    metrics = Metrics(textfile=path)
+    start = threading.Barrier(8)
+    errors = []
+
+    def job():
+        try:
+            start.wait()
+            for _ in range(25):
+                with metrics.run('job'):
+                    count('rows', 1)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=job) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    with open(path, encoding='utf-8') as fh:
+        text = fh.read()
+    assert 'formulaman_runs_total{pipeline="job",status="ok"} 200' in text
+    assert 'formulaman_rows_total{pipeline="job"} 200' in text
+    assert os.listdir(tmp_path) == ['formulaman.prom']  # no temporary files left behind
+
+
+def test_textfile_errors_do_not_fail_the_run(tmp_path, caplog):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    metrics = Metrics(textfile=str(blocker / 'formulaman.prom'))  # its directory is a file
+    with metrics.run('job') as run:
+        count('rows', 3)
+    assert not run.failed
+    assert metrics.last('job') is run
+    assert 'Could not write metrics' in caplog.text
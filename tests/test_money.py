@@ -0,0 +1,58 @@
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pytest
+
+from formulaman.money import from_paise, split_paise, to_paise
+
+DECIMAL_ROUNDING = {'half-up': ROUND_HALF_UP, 'half-even': ROUND_HALF_EVEN}
+
+
+def decimal_paise(thousandths, rounding):
+    """Paise of amounts given in exact thousandths of a rupee, rounded by Decimal."""
+    return [
+        int((Decimal(int(k)) / 1000).quantize(Decimal('0.01'), rounding=DECIMAL_ROUNDING[rounding]) * 100)
+        for k in thousandths
+    ]
+
+
+@pytest.mark.parametrize('rounding', ['half-up', 'half-even'])
+def test_half_paise_round_as_decimal_does(rounding):
+    # every x.xx5 from -1,000.000 to 1,000.000, which binary floats hold only approximately
+    thousandths = np.arange(-1_000_000, 1_000_001, 10) + 5
+    amounts = thousandths / 1000
+    assert to_paise(amounts, rounding).tolist() == decimal_paise(thousandths, rounding)
+
+
+@pytest.mark.parametrize('rounding', ['half-up', 'half-even'])
+def test_amounts_round_as_decimal_does(rounding):
+    thousandths = np.random.default_rng(0).integers(-10**9, 10**9, 20_000)
+    assert to_paise(thousandths / 1000, rounding).tolist() == decimal_paise(thousandths, rounding)
+
+
+def test_boundaries():
+    amounts = [1.005, 2.675, -1.005, -2.675, 0.125, -0.125, 0.135]
+    assert to_paise(amounts, 'half-up').tolist() == [101, 268, -101, -268, 13, -13, 14]
+    assert to_paise(amounts, 'half-even').tolist() == [100, 268, -100, -268, 12, -12, 14]
+
+
+def test_missing_amounts_are_zero():
+    assert to_paise([np.nan, 1.5, np.nan]).tolist() == [0, 150, 0]
+    assert from_paise(to_paise([np.nan, 12.34])).tolist() == [0.0, 12.34]
+
+
+def test_unknown_rounding_mode():
+    with pytest.raises(ValueError):
+        to_paise([1.0], 'up')
+
+
+def test_split_adds_back_up():
+    paise = np.arange(-10_001, 10_002)
+    first, second = split_paise(paise)
+    assert (first + second == paise).all()
+    assert (np.abs(first - second) <= 1).all()
+    assert (np.abs(first) >= np.abs(second)).all()  # the odd paisa goes to the first half
+    # a return splits as the mirror image of its sale
+    mirror_first, mirror_second = split_paise(-paise)
+    assert (mirror_first == -first).all() and (mirror_second == -second).all()
+    assert [part.tolist() for part in split_paise([101, -101, 0])] == [[51, -51, 0], [50, -50, 0]]
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from formulaman.cli import main
+from formulaman.taxsplit import TaxSplit
+
+HARYANA_SELLER = '06ABCDE1234F1Z5'
+DELHI_SELLER = '07FGHIJ5678K1Z2'
+
+
+def split(tax_split, states, gstins):
+    igst, intra = tax_split.split(np.full(len(states), 18.0), pd.Series(states), gstins)
+    return igst.tolist(), intra.tolist()
+
+
+def test_home_state_is_the_gstin_state_code():
+    states = ['Haryana', 'Delhi', 'Haryana', 'Delhi']
+    gstins = pd.Series([HARYANA_SELLER, HARYANA_SELLER, DELHI_SELLER, DELHI_SELLER])
+    assert split(TaxSplit(), states, gstins) == ([0, 18, 18, 0], [18, 0, 0, 18])
+
+
+def test_gstin_state_overrides_the_state_code():
+    # keys and states are cleaned like the CLI's GSTIN=STATE arguments
+    tax_split = TaxSplit(home_states={f' {DELHI_SELLER.lower()} ': 'haryana'})
+    assert tax_split.home_state(DELHI_SELLER) == 'Haryana'
+    assert tax_split.home_state(HARYANA_SELLER) == 'Haryana'
+    gstins = pd.Series([DELHI_SELLER, DELHI_SELLER])
+    assert split(tax_split, ['Haryana', 'Delhi'], gstins) == ([0, 18], [18, 0])
+    assert tax_split.tag() != TaxSplit().tag()
+
+
+def test_missing_or_unknown_gstin_uses_the_default_home_state():
+    gstins = pd.Series([None, np.nan, '99UNKNOWN', None])
+    states = ['Delhi', 'Delhi', 'Delhi', 'Haryana']
+    assert split(TaxSplit('Delhi'), states, gstins) == ([0, 0, 0, 18], [18, 18, 18, 0])
+    # no GSTIN column at all
+    assert split(TaxSplit('Delhi'), states, None) == ([0, 0, 0, 18], [18, 18, 18, 0])
+    assert split(TaxSplit(), states, None) == ([18, 18, 18, 0], [0, 0, 0, 18])
+
+
+def test_customers_of_no_known_state_are_inter_state():
+    gstins = pd.Series([HARYANA_SELLER, None])
+    assert split(TaxSplit(), [None, None], gstins) == ([18, 18], [0, 0])
+
+
+def meesho_export(tmp_path):
+    sales = tmp_path / 'export' / 'meesho' / 'sales'
+    sales.mkdir(parents=True)
+    pd.DataFrame({
+        'gstin': ['', HARYANA_SELLER, HARYANA_SELLER, DELHI_SELLER, DELHI_SELLER, None],
+        'end_customer_state_new': ['', 'Haryana', 'Delhi', 'Haryana', 'Delhi', 'Haryana'],
+        'quantity': ['', 1, 1, 1, 1, 1],
+        'total_taxable_sale_value': ['', 100, 100, 100, 100, 100],
+        'tax_amount': ['', 18, 18, 18, 18, 18],
+    }).to_csv(sales / 'sales.csv', index=False)  # the first line under the header is the template row
+    return str(tmp_path / 'export')
+
+
+def master(tmp_path, *args):
+    out_dir = str(tmp_path / 'out')
+    assert main([meesho_export(tmp_path), '--out-dir', out_dir, *args]) == 0
+    return pd.read_csv(f'{out_dir}/Master_GSTR1_Monthly.csv').set_index('State')
+
+
+def test_cli_gstin_state(tmp_path):
+    df = master(tmp_path)
+    # Haryana customers: the Haryana seller's and the GSTIN-less line are intra-state, the Delhi seller's is not
+    assert df.loc['Haryana', ['IGST', 'CGST', 'SGST']].tolist() == [18, 18, 18]
+    assert df.loc['Delhi', ['IGST', 'CGST', 'SGST']].tolist() == [18, 9, 9]
+
+    df = master(tmp_path / 'override', '--gstin-state', f'{DELHI_SELLER}=Haryana', '--home-state', 'Delhi')
+    assert df.loc['Haryana', ['IGST', 'CGST', 'SGST']].tolist() == [18, 18, 18]
+    assert df.loc['Delhi', ['IGST', 'CGST', 'SGST']].tolist() == [36, 0, 0]
+
+
+def test_cli_rejects_malformed_gstin_state(tmp_path):
+    with pytest.raises(SystemExit):
+        main([meesho_export(tmp_path), '--gstin-state', 'Haryana'])
@@ -0,0 +1,242 @@
+import datetime
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from formulaman.loaders import NamedBytesIO, _read_options, apply_schema, iter_chunks, parse_file
+
+MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+RELS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+DOC_RELS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+SCHEMA = {'gstin': 'category', 'state': 'category', 'quantity': 'number', 'value': 'number'}
+
+
+class Inline(str):
+    """A string cell written inline (t="inlineStr") instead of to the shared string table."""
+
+
+class Formula:
+    def __init__(self, formula, cached):
+        self.formula = formula
+        self.cached = cached
+
+
+def _cell(ref, value, strings):
+    """The XML of one cell; strings are added to the shared string table `strings`."""
+    if isinstance(value, Formula):
+        kind = ' t="str"' if isinstance(value.cached, str) else ''
+        return f'<c r="{ref}"{kind}><f>{escape(value.formula)}</f><v>{escape(str(value.cached))}</v></c>'
+    if isinstance(value, Inline):
+        return f'<c r="{ref}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+    if isinstance(value, str):
+        strings.append(value)
+        return f'<c r="{ref}" t="s"><v>{len(strings) - 1}</v></c>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, float) and value != value:
+        return f'<c r="{ref}" t="e"><v>#N/A</v></c>'
+    return f'<c r="{ref}"><v>{value}</v></c>'
+
+
+def _serial(day, date1904=False):
+    epoch = datetime.datetime(1904, 1, 1) if date1904 else datetime.datetime(1899, 12, 30)
+    return (day - epoch) / datetime.timedelta(days=1)
+
+
+def workbook(rows, date1904=False, layout=None):
+    """
+    A minimal .xlsx whose first sheet holds `rows`, {row number: [values]};
+    row numbers left out are absent from the sheet. Datetimes are stored as
+    serials with a date format. `layout(row number, row XML)` may rewrite a
+    row as other spreadsheet writers lay it out.
+    """
+    strings = []
+    sheet_rows = []
+    for number, values in sorted(rows.items()):
+        cells = []
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            ref = f'{chr(65 + i)}{number}'
+            if isinstance(value, datetime.datetime):
+                cells.append(f'<c r="{ref}" s="1"><v>{_serial(value, date1904)}</v></c>')
+            else:
+                cells.append(_cell(ref, value, strings))
+        row = f'<row r="{number}">{"".join(cells)}</row>'
+        sheet_rows.append(row if layout is None else layout(number, row))
+    sheet = f'<worksheet xmlns="{MAIN}"><sheetData>{"".join(sheet_rows)}</sheetData></worksheet>'
+    workbook_pr = '<workbookPr date1904="1"/>' if date1904 else '<workbookPr/>'
+    shared = ''.join(f'<si><t xml:space="preserve">{escape(s)}</t></si>' for s in strings)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr('[Content_Types].xml', (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            '<Override PartName="/xl/sharedStrings.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            '</Types>'
+        ))
+        zf.writestr('_rels/.rels', (
+            f'<Relationships xmlns="{RELS}"><Relationship Id="rId1" '
+            f'Type="{DOC_RELS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+        ))
+        zf.writestr('xl/workbook.xml', (
+            f'<workbook xmlns="{MAIN}" xmlns:r="{DOC_RELS}">{workbook_pr}'
+            '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        zf.writestr('xl/_rels/workbook.xml.rels', (
+            f'<Relationships xmlns="{RELS}">'
+            f'<Relationship Id="rId1" Type="{DOC_RELS}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{DOC_RELS}/styles" Target="styles.xml"/>'
+            f'<Relationship Id="rId3" Type="{DOC_RELS}/sharedStrings" Target="sharedStrings.xml"/>'
+            '</Relationships>'
+        ))
+        zf.writestr('xl/styles.xml', (
+            f'<styleSheet xmlns="{MAIN}">'
+            '<fonts count="1"><font/></fonts><fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+            '<borders count="1"><border/></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>'
+        ))
+        zf.writestr('xl/sharedStrings.xml', f'<sst xmlns="{MAIN}">{shared}</sst>')
+        zf.writestr('xl/worksheets/sheet1.xml', sheet)
+    return NamedBytesIO('report.xlsx', buffer.getvalue())
+
+
+def read_excel(file, schema=None):
+    """What pandas itself reads (openpyxl), typed by `schema` as loaders types it."""
+    file.seek(0)
+    return apply_schema(pd.read_excel(file, engine='openpyxl', skiprows=[1], **_read_options(schema)), schema)
+
+
+def streamed(file, chunksize, schema=None):
+    chunks = list(iter_chunks(file, chunksize, schema))
+    assert all(len(chunk) <= chunksize for chunk in chunks)
+    df = pd.concat(chunks, ignore_index=True)
+    for col, kind in (schema or {}).items():
+        if kind == 'category':  # each chunk has its own categories
+            df[col] = df[col].astype('category')
+    return df
+
+
+def assert_same(file, schema=None, chunksize=2):
+    """The file parsed whole and streamed in chunks both read as pandas reads it."""
+    expected = read_excel(file, schema)
+    file.seek(0)
+    pd.testing.assert_frame_equal(parse_file(file, schema), expected)
+    # without a schema a chunk's dtypes are its own (a chunk of blanks holds no strings), as with CSV chunks
+    pd.testing.assert_frame_equal(
+        streamed(file, chunksize, schema), expected, check_categorical=False, check_dtype=schema is not None,
+    )
+
+
+ROWS = {
+    1: ['SKU', Inline('Name'), 'Qty', 'Price', 'Shipped', 'Note', 'Total'],
+    2: ['Template row', 'read by nobody', 'n', 'n', 'b', 's', 'f'],
+    3: ['A-1', Inline('Tea & <Co>'), 3, 2.5, True, ' padded ', Formula('C3*D3', 7.5)],
+    4: ['B-2', Inline('Coffee'), 1, 10, False, 'NA', Formula('C4*D4', 10)],
+    6: ['C-3', None, 2, None, True, None, Formula('A6&"!"', 'C-3!')],
+    7: [None, None, None, None, None, None, None],
+    8: [None, Inline('only a name'), None, 4.75, None, float('nan'), None],
+    9: [None, None, None, None, None, None, None],
+}
+
+
+def test_strings_numbers_booleans_and_formulas_match_read_excel():
+    assert_same(workbook(ROWS))
+
+
+def test_values():
+    df = streamed(workbook(ROWS), 4)
+    assert df['SKU'].iloc[[0, 1, 3]].tolist() == ['A-1', 'B-2', 'C-3']
+    assert df['Name'].iloc[0] == 'Tea & <Co>'
+    assert 'Template row' not in df['SKU'].tolist()
+    # the missing sheet row 5 and the blank row 7 are kept as empty rows, the trailing row 9 is not
+    assert len(df) == 6
+    assert df['Total'].iloc[:2].tolist() == [7.5, 10]
+
+
+@pytest.mark.parametrize('date1904', [False, True])
+def test_dates_match_read_excel(date1904):
+    rows = {
+        1: ['Order Date', 'Qty'],
+        2: ['yyyy-mm-dd', 'n'],
+        3: [datetime.datetime(2024, 4, 15), 1],
+        4: [datetime.datetime(2024, 4, 16, 13, 30), 2],
+        5: [None, 3],
+        6: [datetime.datetime(2025, 1, 31, 23, 59, 59), 4],
+    }
+    file = workbook(rows, date1904=date1904)
+    assert_same(file)
+    assert streamed(file, 2)['Order Date'].iloc[1] == pd.Timestamp(2024, 4, 16, 13, 30)
+
+
+def test_header_gaps_and_repeats_match_read_excel():
+    assert_same(workbook({1: ['SKU', None, 'SKU', 'Qty'], 2: ['', '', '', ''], 3: ['a', 1, 'b', 2]}))
+
+
+def schema_rows(count):
+    rows = {1: ['gstin', 'other', 'state', 'quantity', 'value'], 2: ['Mandatory'] * 5}
+    for n in range(3, count + 3):
+        if n % 11 == 0:
+            continue  # a row missing from the sheet
+        rows[n] = [f'07AAA{n % 3}', 'ignored', ['Delhi', 'NA', 'Haryana'][n % 3], [1, '2', None][n % 3], n * 1.5]
+    rows[count + 10] = [None, 'only a column outside the schema', None, None, None]
+    return rows
+
+
+def test_schema_projection_matches_read_excel():
+    file = workbook(schema_rows(60))
+    df = parse_file(file, SCHEMA)
+    assert list(df.columns) == ['gstin', 'state', 'quantity', 'value']
+    assert isinstance(df['gstin'].dtype, pd.CategoricalDtype)
+    assert_same(file, SCHEMA, chunksize=7)
+
+
+@pytest.mark.parametrize('chunksize', [1, 64, 128, 1000, 5000])
+def test_chunks_join_up_to_the_whole_sheet(chunksize):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['gstin', 'state', 'quantity', 'value'])
+    ws.append(['Mandatory'] * 4)
+    for n in range(1000):
+        ws.append([None] * 4 if n % 97 == 0 else [f'07AAA{n % 5}', f'State {n % 7}', n % 4, n / 8])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    file = NamedBytesIO('report.xlsx', buffer.getvalue())
+
+    chunks = list(iter_chunks(file, chunksize, SCHEMA))
+    assert [len(c) for c in chunks] == [min(chunksize, 1000 - start) for start in range(0, 1000, chunksize)]
+    assert_same(file, SCHEMA, chunksize)
+
+
+def reordered(number, row):
+    """Rows past the first chunks written with other attribute orders, single quotes or no cell references."""
+    if number < 40:
+        return row
+    if number % 3 == 0:
+        return row.replace('<c r="', '<c x="')
+    return re.sub(r'<c r="(\w+)"( t="\w+")?', lambda m: f"<c{m.group(2) or ''} s='0' r='{m.group(1)}'", row)
+
+
+def test_other_cell_layouts_after_the_first_chunk():
+    file = workbook(schema_rows(200), layout=reordered)
+    assert b"s='0' r='" in file.getvalue() and b'<c x="' in file.getvalue()
+    assert_same(file, SCHEMA, chunksize=16)
+    assert_same(file)